@@ -2,7 +2,10 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from .models import Transaction, Ledger, Account, FinancialReport
+from .models import (
+    Transaction, Ledger, ReceivableBalance, PeriodClose, AccountingOutbox, Account, AccountBalance, JournalEntry,
+    JournalLine, FinancialReport,
+)
 
 
 @admin.register(Transaction)
@@ -84,6 +87,52 @@ class LedgerAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('company')
 
 
+@admin.register(ReceivableBalance)
+class ReceivableBalanceAdmin(admin.ModelAdmin):
+    list_display = ['company', 'due_date', 'amount', 'invoice_count', 'updated_at']
+    list_filter = ['company']
+    date_hierarchy = 'due_date'
+    
+    def has_change_permission(self, request, obj=None):
+        # Maintained from invoice changes; fix drift with verify_ledgers
+        return False
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('company')
+
+
+@admin.register(PeriodClose)
+class PeriodCloseAdmin(admin.ModelAdmin):
+    list_display = [
+        'company', 'year', 'month', 'period_end', 'cumulative_income',
+        'cumulative_expense', 'closed_by', 'closed_at'
+    ]
+    list_filter = ['year', 'company']
+    search_fields = ['company__company_name']
+    ordering = ['-period_end']
+    
+    def has_change_permission(self, request, obj=None):
+        # Closed periods are immutable; close months with close_accounting_periods
+        return False
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('company', 'closed_by')
+
+
+@admin.register(AccountingOutbox)
+class AccountingOutboxAdmin(admin.ModelAdmin):
+    list_display = ['source_app', 'reference_id', 'status', 'attempts', 'worker', 'created_at', 'processed_at']
+    list_filter = ['status', 'source_app']
+    search_fields = ['reference_id']
+    readonly_fields = ['created_at', 'claimed_at', 'processed_at']
+
+
 @admin.register(Account)
 class AccountAdmin(admin.ModelAdmin):
     list_display = [
@@ -92,7 +141,7 @@ class AccountAdmin(admin.ModelAdmin):
     ]
     list_filter = ['account_type', 'is_active', 'company']
     search_fields = ['name', 'account_number', 'company__company_name']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['current_balance', 'system_code', 'created_at', 'updated_at']
     ordering = ['account_number']
     
     fieldsets = (
@@ -103,7 +152,7 @@ class AccountAdmin(admin.ModelAdmin):
             'fields': ('opening_balance', 'current_balance')
         }),
         ('Additional Information', {
-            'fields': ('description', 'is_active')
+            'fields': ('description', 'is_active', 'system_code')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
@@ -115,6 +164,53 @@ class AccountAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('company')
 
 
+class JournalLineInline(admin.TabularInline):
+    model = JournalLine
+    fields = ['account', 'debit', 'credit']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+
+@admin.register(JournalEntry)
+class JournalEntryAdmin(admin.ModelAdmin):
+    list_display = ['entry_date', 'description', 'company', 'transaction', 'created_at']
+    list_filter = ['company']
+    search_fields = ['description', 'company__company_name']
+    date_hierarchy = 'entry_date'
+    inlines = [JournalLineInline]
+    
+    def has_change_permission(self, request, obj=None):
+        # Entries are posted from transactions; correct them by editing the transaction
+        return False
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('company', 'transaction')
+
+
+@admin.register(AccountBalance)
+class AccountBalanceAdmin(admin.ModelAdmin):
+    list_display = ['account', 'year', 'month', 'debit', 'credit']
+    list_filter = ['year', 'account__company']
+    search_fields = ['account__name', 'account__account_number']
+    
+    def has_change_permission(self, request, obj=None):
+        # Maintained by posting journal entries
+        return False
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('account')
+
+
 @admin.register(FinancialReport)
 class FinancialReportAdmin(admin.ModelAdmin):
     list_display = [
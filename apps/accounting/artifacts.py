@@ -0,0 +1,98 @@
+"""
+Content-addressed storage for rendered financial report files.
+
+A report's PDF or Excel file is named after a hash of everything that
+shows up in it: the statement data, the company's currency and name, the
+report's title and dates, and the renderer version. As long as the hash
+is unchanged the stored file is served as is (or answered with 304 Not
+Modified when the browser sends the hash back in If-None-Match), so a
+repeat download costs one storage read instead of a render.
+
+Bump ARTIFACT_VERSIONS when a renderer's output changes so stored files
+are re-rendered.
+"""
+import hashlib
+import json
+import logging
+
+from django.core.files.base import ContentFile
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_VERSIONS = {
+    'pdf': 'pdf-1',
+    'excel': 'excel-1',
+}
+
+ARTIFACT_FIELDS = {
+    'pdf': 'pdf_file',
+    'excel': 'excel_file',
+}
+
+ARTIFACT_TYPES = {
+    'pdf': ('pdf', 'application/pdf'),
+    'excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+
+def artifact_hash(report, report_data, company, kind):
+    """Hash of every input that shapes the rendered file"""
+    payload = {
+        'version': ARTIFACT_VERSIONS[kind],
+        'report_type': report.report_type,
+        'title': report.title,
+        'start_date': report.start_date,
+        'end_date': report.end_date,
+        'company_name': company.company_name,
+        'currency': getattr(company, 'currency_symbol', '₦'),
+        # The memo key changes with every transaction write, the figures may not
+        'data': {key: value for key, value in report_data.items() if key != 'cache_key'},
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def artifact_name(report, kind, digest):
+    extension, _ = ARTIFACT_TYPES[kind]
+    return f"{report.pk}-{digest[:32]}.{extension}"
+
+
+def stored_artifact(report, kind, digest):
+    """The report's stored file for `kind` if it was rendered from `digest`, else None"""
+    stored = getattr(report, ARTIFACT_FIELDS[kind])
+    if stored and stored.name.rsplit('/', 1)[-1] == artifact_name(report, kind, digest):
+        return stored
+    return None
+
+
+def store_artifact(report, kind, digest, content):
+    """Save rendered bytes under their hash, replacing the previous rendering"""
+    stored = getattr(report, ARTIFACT_FIELDS[kind])
+    previous = stored.name if stored else None
+    stored.save(artifact_name(report, kind, digest), ContentFile(content), save=False)
+    type(report).objects.filter(pk=report.pk).update(**{ARTIFACT_FIELDS[kind]: stored.name})
+    if previous and previous != stored.name:
+        try:
+            stored.storage.delete(previous)
+        except Exception:
+            logger.warning('Could not delete old report file %s', previous, exc_info=True)
+    return stored
+
+
+def not_modified(request, digest):
+    """304 response when the client already has the file for `digest`, else None"""
+    return get_conditional_response(request, etag=quote_etag(digest))
+
+
+def artifact_response(stored, kind, digest, filename):
+    """Serve a stored file as an attachment tagged with its hash"""
+    _, content_type = ARTIFACT_TYPES[kind]
+    stored.open('rb')
+    response = FileResponse(stored, as_attachment=True, filename=filename, content_type=content_type)
+    response['ETag'] = quote_etag(digest)
+    # The file may change with the data behind it, so browsers revalidate
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,155 @@
+"""
+Trial balance and account statements from the double-entry journal.
+
+Totals before a date come from the AccountBalance monthly rollups plus
+the journal lines of the date's own month, so the cost of a report
+depends on the number of accounts and months, not on the number of
+lines ever posted.
+"""
+import calendar
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import Q, Sum
+
+from .models import Account, AccountBalance, JournalLine
+
+
+ZERO = Decimal('0')
+
+# account_id -> (debit, credit)
+Totals = Dict[int, Tuple[Decimal, Decimal]]
+
+
+def totals_through(account_ids: Iterable[int], day: Optional[date]) -> Totals:
+    """Debits and credits posted to each account up to and including `day`"""
+    account_ids = list(account_ids)
+    if day is None or not account_ids:
+        return {}
+
+    if day.day == calendar.monthrange(day.year, day.month)[1]:
+        # Whole months only, the rollups answer alone
+        months = Q(year__lt=day.year) | Q(year=day.year, month__lte=day.month)
+        partial = None
+    else:
+        months = Q(year__lt=day.year) | Q(year=day.year, month__lt=day.month)
+        partial = (day.replace(day=1), day)
+
+    totals = {}
+    rows = (
+        AccountBalance.objects.filter(months, account_id__in=account_ids)
+        .values('account_id').annotate(debit=Sum('debit'), credit=Sum('credit'))
+    )
+    for row in rows:
+        totals[row['account_id']] = (row['debit'] or ZERO, row['credit'] or ZERO)
+
+    if partial is not None:
+        rows = (
+            JournalLine.objects.filter(account_id__in=account_ids, entry_date__range=partial)
+            .order_by().values('account_id').annotate(debit=Sum('debit'), credit=Sum('credit'))
+        )
+        for row in rows:
+            debit, credit = totals.get(row['account_id'], (ZERO, ZERO))
+            totals[row['account_id']] = (debit + (row['debit'] or ZERO), credit + (row['credit'] or ZERO))
+    return totals
+
+
+@dataclass
+class TrialBalanceRow:
+    account: Account
+    opening_balance: Decimal
+    debit: Decimal
+    credit: Decimal
+
+    @property
+    def closing_balance(self) -> Decimal:
+        return self.opening_balance + Account.signed_amount(self.account.account_type, self.debit, self.credit)
+
+    @property
+    def closing_debit(self) -> Decimal:
+        """Closing balance shown in the debit column"""
+        balance = self.closing_balance if self.account.is_debit_normal else -self.closing_balance
+        return max(balance, ZERO)
+
+    @property
+    def closing_credit(self) -> Decimal:
+        balance = -self.closing_balance if self.account.is_debit_normal else self.closing_balance
+        return max(balance, ZERO)
+
+
+@dataclass
+class TrialBalance:
+    start_date: Optional[date]
+    end_date: date
+    rows: List[TrialBalanceRow] = field(default_factory=list)
+
+    @property
+    def total_debit(self) -> Decimal:
+        return sum((row.closing_debit for row in self.rows), ZERO)
+
+    @property
+    def total_credit(self) -> Decimal:
+        return sum((row.closing_credit for row in self.rows), ZERO)
+
+    @property
+    def is_balanced(self) -> bool:
+        return self.total_debit == self.total_credit
+
+
+def trial_balance(company, end_date: date, start_date: Optional[date] = None) -> TrialBalance:
+    """
+    Balances of every account of a company at `end_date`.
+
+    With a start date each row also carries the debits and credits posted
+    in [start_date, end_date] and the opening balance before it.
+    """
+    accounts = list(Account.objects.filter(company=company).order_by('account_number'))
+    account_ids = [account.pk for account in accounts]
+    closing = totals_through(account_ids, end_date)
+    before = totals_through(account_ids, start_date - timedelta(days=1)) if start_date else {}
+
+    report = TrialBalance(start_date, end_date)
+    for account in accounts:
+        debit, credit = closing.get(account.pk, (ZERO, ZERO))
+        opening_debit, opening_credit = before.get(account.pk, (ZERO, ZERO))
+        report.rows.append(TrialBalanceRow(
+            account=account,
+            opening_balance=account.opening_balance + Account.signed_amount(
+                account.account_type, opening_debit, opening_credit
+            ),
+            debit=debit - opening_debit,
+            credit=credit - opening_credit,
+        ))
+    return report
+
+
+@dataclass
+class AccountStatement:
+    account: Account
+    start_date: date
+    end_date: date
+    opening_balance: Decimal
+    # (line, running balance after it)
+    lines: List[Tuple[JournalLine, Decimal]] = field(default_factory=list)
+
+    @property
+    def closing_balance(self) -> Decimal:
+        return self.lines[-1][1] if self.lines else self.opening_balance
+
+
+def account_statement(account: Account, start_date: date, end_date: date) -> AccountStatement:
+    """Lines posted to an account in [start_date, end_date] with a running balance"""
+    debit, credit = totals_through([account.pk], start_date - timedelta(days=1)).get(account.pk, (ZERO, ZERO))
+    balance = account.opening_balance + Account.signed_amount(account.account_type, debit, credit)
+    statement = AccountStatement(account, start_date, end_date, balance)
+
+    lines = (
+        account.journal_lines.filter(entry_date__range=(start_date, end_date))
+        .select_related('entry').order_by('entry_date', 'id')
+    )
+    for line in lines:
+        balance += Account.signed_amount(account.account_type, line.debit, line.credit)
+        statement.lines.append((line, balance))
+    return statement
@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Exists, OuterRef
+from apps.accounting.models import Account, JournalEntry, Transaction
+from apps.core.models import CompanyProfile
+
+
+class Command(BaseCommand):
+    help = 'Post journal entries for existing transactions that have none yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company',
+            type=int,
+            action='append',
+            help='Only backfill transactions of this company profile id (can be repeated)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of transactions posted per database transaction',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count the transactions that would be posted without writing anything',
+        )
+        parser.add_argument(
+            '--recompute-balances',
+            action='store_true',
+            help='Recompute every account balance from the monthly rollups afterwards',
+        )
+
+    def handle(self, *args, **options):
+        transactions = Transaction.objects.filter(is_void=False).filter(
+            ~Exists(JournalEntry.objects.filter(transaction=OuterRef('pk')))
+        )
+        accounts = Account.objects.all()
+        if options.get('company'):
+            missing = set(options['company']) - set(
+                CompanyProfile.objects.filter(pk__in=options['company']).values_list('pk', flat=True)
+            )
+            if missing:
+                raise CommandError(f"Company profile {sorted(missing)[0]} does not exist")
+            transactions = transactions.filter(company_id__in=options['company'])
+            accounts = accounts.filter(company_id__in=options['company'])
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'Would post {transactions.count()} transactions, nothing was written'))
+            return
+
+        # Each batch commits on its own, so an interrupted run simply resumes
+        # with the transactions that still have no entry
+        transactions = transactions.order_by('pk').only(
+            'id', 'company_id', 'type', 'title', 'net_amount', 'transaction_date', 'is_void'
+        )
+        posted = 0
+        last_pk = None
+        while True:
+            batch = transactions if last_pk is None else transactions.filter(pk__gt=last_pk)
+            batch = list(batch[:options['batch_size']])
+            if not batch:
+                break
+            posted += JournalEntry.post_transactions(batch, batch_size=options['batch_size'])
+            last_pk = batch[-1].pk
+            self.stdout.write(f'  posted {posted} transactions')
+
+        if options['recompute_balances']:
+            for account in accounts.iterator():
+                account.update_balance()
+
+        self.stdout.write(self.style.SUCCESS(f'Posted {posted} transactions to the journal'))
@@ -0,0 +1,68 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from apps.accounting.models import ClosedPeriodError, PeriodClose, Transaction
+from apps.core.models import CompanyProfile
+
+
+class Command(BaseCommand):
+    help = 'Close ended accounting months, storing cumulative balances for fast balance sheets'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company',
+            type=int,
+            action='append',
+            help='Only close periods of this company profile id (can be repeated)',
+        )
+        parser.add_argument(
+            '--through',
+            help='Last month to close as YYYY-MM (default: the previous month)',
+        )
+
+    def handle(self, *args, **options):
+        through = self._parse_month(options.get('through'))
+
+        companies = CompanyProfile.objects.all()
+        if options.get('company'):
+            companies = companies.filter(pk__in=options['company'])
+
+        closed = 0
+        for company in companies.iterator():
+            first_open = self._first_open_month(company)
+            if first_open is None:
+                continue
+            year, month = first_open
+            while (year, month) <= through:
+                try:
+                    PeriodClose.close(company, year, month)
+                except ClosedPeriodError as e:
+                    raise CommandError(f'Company {company.pk}: {e.messages[0]}')
+                closed += 1
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+        self.stdout.write(self.style.SUCCESS(f'Closed {closed} accounting periods'))
+
+    def _parse_month(self, value):
+        if not value:
+            today = timezone.localdate()
+            return (today.year - 1, 12) if today.month == 1 else (today.year, today.month - 1)
+        try:
+            year, month = (int(part) for part in value.split('-'))
+            date(year, month, 1)
+        except ValueError:
+            raise CommandError(f'Invalid month "{value}", expected YYYY-MM')
+        return year, month
+
+    def _first_open_month(self, company):
+        latest = PeriodClose.latest(company.pk)
+        if latest is not None:
+            return (latest.year + 1, 1) if latest.month == 12 else (latest.year, latest.month + 1)
+        first = Transaction.objects.filter(company=company).order_by('transaction_date').values_list(
+            'transaction_date', flat=True
+        ).first()
+        if first is None:
+            # Nothing to close before the company's first transaction
+            return None
+        return first.year, first.month
@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.accounting.outbox import (
+    drain_outbox_batch, purge_processed_events, requeue_stale_events, record_drain_heartbeat,
+    DRAIN_HEARTBEAT_TIMEOUT
+)
+from apps.core.jobs import default_worker_name
+
+
+class Command(BaseCommand):
+    help = 'Book queued invoices, receipts and job orders into accounting in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the outbox and exit instead of polling')
+        parser.add_argument('--batch-size', type=int, default=500, help='Outbox rows applied per batch')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when the outbox is empty')
+        parser.add_argument('--throttle', type=float, default=0.0, help='Seconds to pause between batches')
+        parser.add_argument('--max-batches', type=int, default=0, help='Exit after this many batches (0 = no limit)')
+        parser.add_argument('--max-attempts', type=int, default=5, help='Fail a row after this many attempts')
+        parser.add_argument('--purge-days', type=int, default=7, help='Delete applied rows older than this many days')
+        parser.add_argument('--stale-minutes', type=int, default=10, help='Requeue claimed rows older than this')
+        parser.add_argument('--name', default='', help='Worker name recorded on claimed rows')
+
+    def handle(self, *args, **options):
+        worker_name = options['name'] or default_worker_name()
+        self.stdout.write(f"Accounting outbox worker {worker_name} started")
+
+        purged = purge_processed_events(options['purge_days'])
+        requeued = requeue_stale_events(options['stale_minutes'], options['max_attempts'])
+        if purged or requeued:
+            self.stdout.write(f"Purged {purged} applied rows, requeued {requeued} stale rows")
+
+        batches = applied_total = 0
+        heartbeat_at = None
+        while True:
+            close_old_connections()
+            # A draining (--once) worker does not announce itself, it is about to exit
+            if not options['once'] and (
+                heartbeat_at is None or time.monotonic() - heartbeat_at > DRAIN_HEARTBEAT_TIMEOUT / 5
+            ):
+                record_drain_heartbeat(worker_name)
+                heartbeat_at = time.monotonic()
+            applied, failed = drain_outbox_batch(worker_name, options['batch_size'], options['max_attempts'])
+
+            if not applied and not failed:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            batches += 1
+            applied_total += applied
+            if failed:
+                self.stdout.write(self.style.ERROR(f"❌ {failed} outbox rows failed, {applied} applied"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"✅ Applied {applied} outbox rows"))
+
+            if options['max_batches'] and batches >= options['max_batches']:
+                break
+            if options['throttle']:
+                time.sleep(options['throttle'])
+
+        self.stdout.write(f"Applied {applied_total} outbox rows in {batches} batches")
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+from apps.accounting.models import Ledger, ReceivableBalance
+
+
+class Command(BaseCommand):
+    help = 'Rebuild monthly ledgers and the receivables rollup from their sources and report any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company',
+            type=int,
+            action='append',
+            help='Only check this company profile id (can be repeated)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drift without correcting the ledgers',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options.get('dry_run')
+        drift = Ledger.rebuild(company_ids=options.get('company'), dry_run=dry_run)
+
+        for record in drift:
+            stored = (
+                'missing' if record['stored_income'] is None
+                else f"income {record['stored_income']}, expense {record['stored_expense']}"
+            )
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Company {record['company_id']} {record['year']}/{record['month']:02d}: "
+                    f"stored {stored}; expected income {record['income']}, expense {record['expense']}"
+                )
+            )
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('All ledgers match their transactions'))
+        elif dry_run:
+            self.stdout.write(self.style.WARNING(f'{len(drift)} ledgers have drifted (dry run, nothing changed)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(drift)} drifted ledgers'))
+
+        receivable_drift = ReceivableBalance.rebuild(company_ids=options.get('company'), dry_run=dry_run)
+        for record in receivable_drift:
+            stored = (
+                'missing' if record['stored_amount'] is None
+                else f"{record['stored_amount']} on {record['stored_count']} invoices"
+            )
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Company {record['company_id']} receivables due {record['due_date']}: "
+                    f"stored {stored}; expected {record['amount']} on {record['invoice_count']} invoices"
+                )
+            )
+
+        if not receivable_drift:
+            self.stdout.write(self.style.SUCCESS('Receivables match the open invoices'))
+        elif dry_run:
+            self.stdout.write(
+                self.style.WARNING(f'{len(receivable_drift)} receivable rows have drifted (dry run, nothing changed)')
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(receivable_drift)} drifted receivable rows'))
@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("accounting", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PeriodClose",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.IntegerField()),
+                ("month", models.IntegerField()),
+                ("period_end", models.DateField()),
+                (
+                    "cumulative_income",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "cumulative_expense",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("income_transactions", models.PositiveIntegerField(default=0)),
+                ("expense_transactions", models.PositiveIntegerField(default=0)),
+                (
+                    "accounts_receivable",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "accounts_payable",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                ("closed_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "closed_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="closed_periods",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "company",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="period_closes",
+                        to="core.companyprofile",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-period_end"],
+                "indexes": [
+                    models.Index(
+                        fields=["company", "period_end"],
+                        name="accounting__company_ebb6dd_idx",
+                    )
+                ],
+                "unique_together": {("company", "year", "month")},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounting", "0003_accountingoutbox"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["company", "-transaction_date", "-created_at", "-id"],
+                name="accounting__company_487be5_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,156 @@
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0001_initial"),
+        ("accounting", "0004_transaction_keyset_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="account",
+            name="system_code",
+            field=models.CharField(blank=True, default="", max_length=20),
+        ),
+        migrations.AddConstraint(
+            model_name="account",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("system_code", ""), _negated=True),
+                fields=("company", "system_code"),
+                name="accounting_account_one_system_account_per_company",
+            ),
+        ),
+        migrations.CreateModel(
+            name="JournalEntry",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("entry_date", models.DateField()),
+                ("description", models.CharField(blank=True, max_length=255)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "company",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="journal_entries",
+                        to="core.companyprofile",
+                    ),
+                ),
+                (
+                    "transaction",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="journal_entry",
+                        to="accounting.transaction",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "journal entries",
+                "ordering": ["-entry_date", "-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["company", "entry_date"],
+                        name="accounting__company_4bb435_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="JournalLine",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("entry_date", models.DateField()),
+                (
+                    "debit",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "credit",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.RESTRICT,
+                        related_name="journal_lines",
+                        to="accounting.account",
+                    ),
+                ),
+                (
+                    "entry",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lines",
+                        to="accounting.journalentry",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["entry_date", "id"],
+                "indexes": [
+                    models.Index(
+                        fields=["account", "entry_date"],
+                        name="accounting__account_32d401_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="AccountBalance",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.IntegerField()),
+                ("month", models.IntegerField()),
+                (
+                    "debit",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "credit",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="monthly_balances",
+                        to="accounting.account",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["account", "year", "month"],
+                "unique_together": {("account", "year", "month")},
+            },
+        ),
+    ]
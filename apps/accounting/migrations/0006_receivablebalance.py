@@ -0,0 +1,77 @@
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def build_receivables(apps, schema_editor):
+    """Fill the rollup from the open invoices that already exist"""
+    ReceivableBalance = apps.get_model("accounting", "ReceivableBalance")
+    CompanyProfile = apps.get_model("core", "CompanyProfile")
+    Invoice = apps.get_model("invoices", "Invoice")
+
+    companies = dict(CompanyProfile.objects.values_list("user_id", "pk"))
+    rows = (
+        Invoice.objects.filter(status__in=["unpaid", "partial"], user_id__in=list(companies))
+        .annotate(due=Coalesce("due_date", "invoice_date"))
+        .order_by()
+        .values("user_id", "due")
+        .annotate(amount=models.Sum("balance_due"), invoice_count=models.Count("id"))
+    )
+    ReceivableBalance.objects.bulk_create(
+        [
+            ReceivableBalance(
+                company_id=companies[row["user_id"]],
+                due_date=row["due"],
+                amount=row["amount"] or 0,
+                invoice_count=row["invoice_count"],
+            )
+            for row in rows
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0001_initial"),
+        ("invoices", "0009_invoice_open_due_index"),
+        ("accounting", "0005_journal"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReceivableBalance",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("due_date", models.DateField()),
+                (
+                    "amount",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("invoice_count", models.IntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "company",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="receivable_balances",
+                        to="core.companyprofile",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["company", "due_date"],
+                "unique_together": {("company", "due_date")},
+            },
+        ),
+        migrations.RunPython(build_receivables, migrations.RunPython.noop),
+    ]
@@ -1,13 +1,41 @@
-from django.db import models
+from django.db import models, IntegrityError, transaction as db_transaction
 from django.contrib.auth import get_user_model
-from django.db.models import Sum, Q
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Exists, F, OuterRef, Sum, Q
+from django.db.models.functions import Coalesce, ExtractMonth, ExtractYear
 from django.utils import timezone
+from datetime import date, datetime, timedelta
 from decimal import Decimal
+import calendar
 import uuid
 
 User = get_user_model()
 
 
+class ClosedPeriodError(ValidationError):
+    """Raised when a write would change the figures of a closed accounting period"""
+
+
+class TransactionQuerySet(models.QuerySet):
+    def in_closed_periods(self):
+        """Transactions whose month is covered by a PeriodClose of their company"""
+        return self.filter(is_void=False).filter(Exists(PeriodClose.objects.filter(
+            company_id=OuterRef('company_id'),
+            period_end__gte=OuterRef('transaction_date'),
+        )))
+
+    def delete(self):
+        # Checked before Django's collector opens its atomic block, so a
+        # refusal leaves the surrounding transaction usable
+        closed = self.in_closed_periods().values_list('transaction_date', flat=True).first()
+        if closed is not None:
+            raise ClosedPeriodError(f"{closed.year}/{closed.month:02d} is closed. Transactions in it cannot be deleted.")
+        return super().delete()
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
 class Transaction(models.Model):
     """Main transaction model for all financial entries"""
     TRANSACTION_TYPE = [
@@ -64,11 +92,44 @@ class Transaction(models.Model):
             models.Index(fields=['company', 'transaction_date']),
             models.Index(fields=['source_app', 'reference_id']),
             models.Index(fields=['type', 'transaction_date']),
+            models.Index(fields=['company', '-transaction_date', '-created_at', '-id']),
         ]
     
+    objects = TransactionQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.title} ({self.type}) - {self.amount} {self.currency}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what this row contributed to the ledger when it was loaded
+        instance._ledger_entry = instance.ledger_entry()
+        instance._journal_key = instance.journal_key()
+        return instance
+    
+    def ledger_entry(self):
+        """(company_id, year, month, income, expense) this transaction adds to a ledger, or None"""
+        fields = self.__dict__
+        if any(name not in fields for name in ['company_id', 'transaction_date', 'type', 'net_amount', 'is_void']):
+            return None
+        if self.is_void or self.company_id is None or self.transaction_date is None:
+            return None
+        amount = Decimal(str(self.net_amount or 0))
+        income = amount if self.type == 'income' else Decimal('0')
+        expense = amount if self.type == 'expense' else Decimal('0')
+        return (self.company_id, self.transaction_date.year, self.transaction_date.month, income, expense)
+    
+    def journal_key(self):
+        """(company_id, date, type, amount) this transaction posts to the journal, or None"""
+        entry = self.ledger_entry()
+        if entry is None:
+            return None
+        transaction_date = self.transaction_date
+        if isinstance(transaction_date, datetime):
+            transaction_date = transaction_date.date()
+        return (self.company_id, transaction_date, self.type, entry[3] + entry[4])
+    
     def save(self, *args, **kwargs):
         # Calculate net amount
         self.net_amount = self.amount
@@ -77,43 +138,81 @@ class Transaction(models.Model):
         if self.discount:
             self.net_amount -= self.discount
         
-        super().save(*args, **kwargs)
+        self.check_period_open()
         
-        # Update ledger
-        self.update_ledger()
+        with db_transaction.atomic():
+            super().save(*args, **kwargs)
+            
+            # Update ledger
+            self.update_ledger()
+            self.update_journal()
+    
+    def delete(self, *args, **kwargs):
+        # Deleting a company or user cascades without coming through here,
+        # so their transactions may still go
+        entry = getattr(self, '_ledger_entry', self.ledger_entry())
+        if entry is not None:
+            closed_through = PeriodClose.closed_through(self.company_id)
+            if closed_through is not None and date(entry[1], entry[2], 1) <= closed_through:
+                raise ClosedPeriodError(f"{entry[1]}/{entry[2]:02d} is closed. Transactions in it cannot be deleted.")
+        return super().delete(*args, **kwargs)
+    
+    def check_period_open(self):
+        """
+        Keep closed periods immutable.
+
+        A new transaction dated inside a closed period is posted as an
+        adjustment on the first open day instead; editing, voiding or
+        moving a transaction into or out of a closed period is rejected.
+        """
+        closed_through = PeriodClose.closed_through(self.company_id)
+        if closed_through is None:
+            return
+        
+        new_entry = self.ledger_entry()
+        if self._state.adding:
+            if new_entry is not None:
+                self.route_to_open_period(closed_through)
+            return
+        
+        old_entry = getattr(self, '_ledger_entry', None)
+        if old_entry == new_entry:
+            return
+        for entry in (old_entry, new_entry):
+            if entry is not None and date(entry[1], entry[2], 1) <= closed_through:
+                raise ClosedPeriodError(
+                    f"{entry[1]}/{entry[2]:02d} is closed. Post an adjustment in an open period instead."
+                )
+    
+    def route_to_open_period(self, closed_through):
+        """Post a new transaction dated on or before `closed_through` as an adjustment on the next day"""
+        if closed_through is None:
+            return
+        transaction_date = self.transaction_date
+        if isinstance(transaction_date, datetime):
+            transaction_date = transaction_date.date()
+        if transaction_date <= closed_through:
+            self.transaction_date = closed_through + timedelta(days=1)
+            note = f"Adjustment for {transaction_date} (period closed)"
+            self.notes = f"{self.notes}\n{note}" if self.notes else note
     
     def update_ledger(self):
-        """Update the ledger for this transaction's month/year"""
-        if not self.is_void:
-            ledger, created = Ledger.objects.get_or_create(
-                company=self.company,
-                year=self.transaction_date.year,
-                month=self.transaction_date.month,
-                defaults={
-                    'total_income': 0,
-                    'total_expense': 0,
-                    'net_profit': 0
-                }
-            )
-            
-            # Recalculate totals for this month
-            transactions = Transaction.objects.filter(
-                company=self.company,
-                transaction_date__year=self.transaction_date.year,
-                transaction_date__month=self.transaction_date.month,
-                is_void=False
-            )
-            
-            ledger.total_income = transactions.filter(type='income').aggregate(
-                total=Sum('net_amount')
-            )['total'] or 0
-            
-            ledger.total_expense = transactions.filter(type='expense').aggregate(
-                total=Sum('net_amount')
-            )['total'] or 0
-            
-            ledger.net_profit = ledger.total_income - ledger.total_expense
-            ledger.save()
+        """Move this transaction's ledger contribution from its last saved state to the current one"""
+        old_entry = getattr(self, '_ledger_entry', None)
+        new_entry = self.ledger_entry()
+        Ledger.apply_changes(old_entry, new_entry)
+        self._ledger_entry = new_entry
+    
+    def update_journal(self):
+        """Repost this transaction's journal entry when its date, type or amount changed"""
+        new_key = self.journal_key()
+        if getattr(self, '_journal_key', None) == new_key:
+            return
+        # Deleting the old entry reverses its lines (see signals)
+        JournalEntry.objects.filter(transaction=self).delete()
+        if new_key is not None:
+            JournalEntry.post_transactions([self])
+        self._journal_key = new_key
 
 
 class Ledger(models.Model):
@@ -145,6 +244,125 @@ class Ledger(models.Model):
     def __str__(self):
         return f"{self.company.company_name} - {self.year}/{self.month:02d}"
     
+    @classmethod
+    def apply_delta(cls, company_id, year, month, income, expense):
+        """Add signed income/expense amounts to a month's ledger with a single UPDATE"""
+        if not income and not expense:
+            return
+        changes = {
+            'total_income': F('total_income') + income,
+            'total_expense': F('total_expense') + expense,
+            'net_profit': F('net_profit') + (income - expense),
+            'updated_at': timezone.now(),
+        }
+        ledgers = cls.objects.filter(company_id=company_id, year=year, month=month)
+        if ledgers.update(**changes):
+            return
+        try:
+            with db_transaction.atomic():
+                cls.objects.create(
+                    company_id=company_id,
+                    year=year,
+                    month=month,
+                    total_income=income,
+                    total_expense=expense,
+                    net_profit=income - expense,
+                )
+        except IntegrityError:
+            # Another request created the ledger first
+            ledgers.update(**changes)
+    
+    @classmethod
+    def rebuild(cls, company_ids=None, dry_run=False, batch_size=500):
+        """
+        Recompute ledgers from transactions in one grouped query.
+
+        Returns a list of drift records for every ledger whose stored totals
+        differed from the transactions. Unless dry_run is set, drifted
+        ledgers are corrected and missing ones created in bulk.
+        """
+        transactions = Transaction.objects.filter(is_void=False)
+        ledgers = cls.objects.all()
+        if company_ids is not None:
+            transactions = transactions.filter(company_id__in=company_ids)
+            ledgers = ledgers.filter(company_id__in=company_ids)
+        
+        rows = (
+            transactions
+            .annotate(year=ExtractYear('transaction_date'), month=ExtractMonth('transaction_date'))
+            .order_by()
+            .values('company_id', 'year', 'month')
+            .annotate(
+                income=Sum('net_amount', filter=Q(type='income')),
+                expense=Sum('net_amount', filter=Q(type='expense')),
+            )
+        )
+        expected = {
+            (row['company_id'], row['year'], row['month']): (row['income'] or Decimal('0'), row['expense'] or Decimal('0'))
+            for row in rows
+        }
+        
+        drift = []
+        to_update = []
+        for ledger in ledgers.iterator(chunk_size=batch_size):
+            income, expense = expected.pop((ledger.company_id, ledger.year, ledger.month), (Decimal('0'), Decimal('0')))
+            if (ledger.total_income, ledger.total_expense, ledger.net_profit) != (income, expense, income - expense):
+                drift.append({
+                    'company_id': ledger.company_id,
+                    'year': ledger.year,
+                    'month': ledger.month,
+                    'stored_income': ledger.total_income,
+                    'stored_expense': ledger.total_expense,
+                    'income': income,
+                    'expense': expense,
+                })
+                ledger.total_income = income
+                ledger.total_expense = expense
+                ledger.net_profit = income - expense
+                to_update.append(ledger)
+        
+        to_create = []
+        for (company_id, year, month), (income, expense) in expected.items():
+            drift.append({
+                'company_id': company_id,
+                'year': year,
+                'month': month,
+                'stored_income': None,
+                'stored_expense': None,
+                'income': income,
+                'expense': expense,
+            })
+            to_create.append(cls(
+                company_id=company_id,
+                year=year,
+                month=month,
+                total_income=income,
+                total_expense=expense,
+                net_profit=income - expense,
+            ))
+        
+        if not dry_run:
+            with db_transaction.atomic():
+                cls.objects.bulk_update(
+                    to_update, ['total_income', 'total_expense', 'net_profit'], batch_size=batch_size
+                )
+                cls.objects.bulk_create(to_create, batch_size=batch_size, ignore_conflicts=True)
+        return drift
+    
+    @classmethod
+    def apply_changes(cls, old_entry, new_entry):
+        """Reverse a transaction's old ledger entry and apply its new one"""
+        deltas = {}
+        for entry, sign in [(old_entry, -1), (new_entry, 1)]:
+            if entry is None:
+                continue
+            company_id, year, month, income, expense = entry
+            key = (company_id, year, month)
+            current_income, current_expense = deltas.get(key, (Decimal('0'), Decimal('0')))
+            deltas[key] = (current_income + sign * income, current_expense + sign * expense)
+        for (company_id, year, month), (income, expense) in deltas.items():
+            cls.apply_delta(company_id, year, month, income, expense)
+    
     @property
     def month_name(self):
         """Get month name"""
@@ -153,15 +371,8 @@ class Ledger(models.Model):
     
     def update_outstanding_amounts(self):
         """Update outstanding invoices and pending receipts"""
-        from apps.invoices.models import Invoice
-        from apps.receipts.models import Receipt
-        
         # Outstanding invoices
-        outstanding = Invoice.objects.filter(
-            user=self.company.user,
-            status__in=['unpaid', 'partial']
-        ).aggregate(total=Sum('balance_due'))['total'] or 0
-        self.outstanding_invoices = outstanding
+        self.outstanding_invoices = ReceivableBalance.outstanding(self.company_id)
         
         # Pending receipts (if any logic needed)
         self.pending_receipts = 0
@@ -169,6 +380,316 @@ class Ledger(models.Model):
         self.save()
 
 
+class ReceivableBalance(models.Model):
+    """
+    Open invoice balances of a company grouped by due date.
+
+    Maintained with deltas whenever an invoice (or a receipt against it)
+    is saved, so outstanding totals and aging buckets are read from a few
+    rows per company instead of the invoices. Invoices without a due date
+    are due on their invoice date.
+    """
+    OPEN_STATUSES = ['unpaid', 'partial']
+    
+    company = models.ForeignKey('core.CompanyProfile', on_delete=models.CASCADE, related_name='receivable_balances')
+    due_date = models.DateField()
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    invoice_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['company', 'due_date']
+        ordering = ['company', 'due_date']
+    
+    def __str__(self):
+        return f"{self.company_id} - due {self.due_date}: {self.amount}"
+    
+    @classmethod
+    def invoice_entry(cls, user_id, due_date, invoice_date, status, balance_due):
+        """(user_id, due_date, amount) an invoice adds to the receivables, or None when it is settled"""
+        if status not in cls.OPEN_STATUSES or user_id is None:
+            return None
+        due = due_date or invoice_date or timezone.localdate()
+        if isinstance(due, datetime):
+            due = due.date()
+        return (user_id, due, Decimal(str(balance_due or 0)))
+    
+    @classmethod
+    def apply_changes(cls, old_entry, new_entry):
+        """Reverse an invoice's old receivable entry and apply its new one"""
+        from apps.core.models import CompanyProfile
+        
+        if old_entry == new_entry:
+            return
+        deltas = {}
+        for entry, sign in [(old_entry, -1), (new_entry, 1)]:
+            if entry is None:
+                continue
+            user_id, due_date, amount = entry
+            current_amount, current_count = deltas.get((user_id, due_date), (Decimal('0'), 0))
+            deltas[(user_id, due_date)] = (current_amount + sign * amount, current_count + sign)
+        
+        companies = dict(
+            CompanyProfile.objects.filter(user_id__in={user_id for user_id, _ in deltas}).values_list('user_id', 'pk')
+        )
+        for (user_id, due_date), (amount, count) in deltas.items():
+            if user_id in companies:
+                cls.apply_delta(companies[user_id], due_date, amount, count)
+    
+    @classmethod
+    def apply_delta(cls, company_id, due_date, amount, count):
+        """Add a signed amount and invoice count to one due date with a single UPDATE"""
+        if not amount and not count:
+            return
+        changes = {
+            'amount': F('amount') + amount,
+            'invoice_count': F('invoice_count') + count,
+            'updated_at': timezone.now(),
+        }
+        balances = cls.objects.filter(company_id=company_id, due_date=due_date)
+        if balances.update(**changes):
+            return
+        try:
+            with db_transaction.atomic():
+                cls.objects.create(company_id=company_id, due_date=due_date, amount=amount, invoice_count=count)
+        except IntegrityError:
+            # Another request created the row first
+            balances.update(**changes)
+    
+    @classmethod
+    def outstanding(cls, company_id):
+        """Total open invoice balance of a company"""
+        return cls.objects.filter(company_id=company_id).aggregate(total=Sum('amount'))['total'] or Decimal('0')
+    
+    @classmethod
+    def rebuild(cls, company_ids=None, dry_run=False, batch_size=500):
+        """
+        Recompute the rollup from open invoices in one grouped query.
+
+        Returns a drift record for every (company, due date) whose stored
+        amount or count was wrong. Unless dry_run is set, the rows are
+        corrected, missing ones created and emptied ones deleted.
+        """
+        from apps.core.models import CompanyProfile
+        from apps.invoices.models import Invoice
+        
+        profiles = CompanyProfile.objects.all()
+        if company_ids is not None:
+            profiles = profiles.filter(pk__in=company_ids)
+        companies = dict(profiles.values_list('user_id', 'pk'))
+        
+        rows = (
+            Invoice.objects.filter(status__in=cls.OPEN_STATUSES, user_id__in=list(companies))
+            .annotate(due=Coalesce('due_date', 'invoice_date'))
+            .order_by()
+            .values('user_id', 'due')
+            .annotate(amount=Sum('balance_due'), invoice_count=Count('id'))
+        )
+        expected = {}
+        for row in rows:
+            key = (companies[row['user_id']], row['due'])
+            amount, count = expected.get(key, (Decimal('0'), 0))
+            expected[key] = (amount + (row['amount'] or Decimal('0')), count + row['invoice_count'])
+        
+        drift = []
+        to_update = []
+        to_delete = []
+        for balance in cls.objects.filter(company_id__in=list(companies.values())).iterator(chunk_size=batch_size):
+            amount, count = expected.pop((balance.company_id, balance.due_date), (Decimal('0'), 0))
+            if (balance.amount, balance.invoice_count) == (amount, count):
+                continue
+            drift.append({
+                'company_id': balance.company_id,
+                'due_date': balance.due_date,
+                'stored_amount': balance.amount,
+                'stored_count': balance.invoice_count,
+                'amount': amount,
+                'invoice_count': count,
+            })
+            if count == 0 and amount == 0:
+                to_delete.append(balance.pk)
+            else:
+                balance.amount = amount
+                balance.invoice_count = count
+                to_update.append(balance)
+        
+        to_create = []
+        for (company_id, due_date), (amount, count) in expected.items():
+            drift.append({
+                'company_id': company_id,
+                'due_date': due_date,
+                'stored_amount': None,
+                'stored_count': None,
+                'amount': amount,
+                'invoice_count': count,
+            })
+            to_create.append(cls(company_id=company_id, due_date=due_date, amount=amount, invoice_count=count))
+        
+        if not dry_run:
+            with db_transaction.atomic():
+                cls.objects.filter(pk__in=to_delete).delete()
+                cls.objects.bulk_update(to_update, ['amount', 'invoice_count'], batch_size=batch_size)
+                cls.objects.bulk_create(to_create, batch_size=batch_size, ignore_conflicts=True)
+        return drift
+
+
+class PeriodClose(models.Model):
+    """
+    Cumulative balances of a company at the end of a closed month.
+
+    Balance sheets start from the nearest close and only aggregate the
+    transactions after it. Closes are immutable; only the most recent one
+    may be deleted to reopen its month.
+    """
+    company = models.ForeignKey('core.CompanyProfile', on_delete=models.CASCADE, related_name='period_closes')
+    year = models.IntegerField()
+    month = models.IntegerField()
+    period_end = models.DateField()
+    
+    # Totals from the first transaction up to period_end
+    cumulative_income = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cumulative_expense = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    income_transactions = models.PositiveIntegerField(default=0)
+    expense_transactions = models.PositiveIntegerField(default=0)
+    
+    # Outstanding amounts when the period was closed
+    accounts_receivable = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    accounts_payable = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    closed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='closed_periods')
+    closed_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['company', 'year', 'month']
+        ordering = ['-period_end']
+        indexes = [
+            models.Index(fields=['company', 'period_end']),
+        ]
+    
+    def __str__(self):
+        return f"{self.company.company_name} - {self.year}/{self.month:02d} (closed)"
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ClosedPeriodError("A closed period cannot be changed.")
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        latest = PeriodClose.latest(self.company_id)
+        if latest is not None and latest.pk != self.pk:
+            raise ClosedPeriodError("Only the most recently closed period can be reopened.")
+        return super().delete(*args, **kwargs)
+    
+    @classmethod
+    def latest(cls, company_id, on_or_before=None):
+        """Most recent close of a company, optionally ending on or before a date"""
+        closes = cls.objects.filter(company_id=company_id)
+        if on_or_before is not None:
+            closes = closes.filter(period_end__lte=on_or_before)
+        return closes.order_by('-period_end').first()
+    
+    @classmethod
+    def closed_through(cls, company_id):
+        """Last day covered by a company's closed periods, or None"""
+        if company_id is None:
+            return None
+        return cls.objects.filter(company_id=company_id).order_by('-period_end').values_list(
+            'period_end', flat=True
+        ).first()
+    
+    @classmethod
+    def close(cls, company, year, month, user=None):
+        """
+        Close a month, storing cumulative balances up to its last day.
+
+        Only the transactions after the previous close are aggregated.
+        """
+        period_end = date(year, month, calendar.monthrange(year, month)[1])
+        if period_end >= timezone.localdate():
+            raise ClosedPeriodError("Only months that have ended can be closed.")
+        
+        from .receivables import outstanding_receivables
+        from .statements import outstanding_payables
+        
+        with db_transaction.atomic():
+            previous = cls.latest(company.pk)
+            if previous is not None and period_end <= previous.period_end:
+                raise ClosedPeriodError(f"{year}/{month:02d} is already closed.")
+            
+            transactions = Transaction.objects.filter(
+                company=company,
+                is_void=False,
+                transaction_date__lte=period_end,
+            )
+            if previous is not None:
+                transactions = transactions.filter(transaction_date__gt=previous.period_end)
+            totals = transactions.aggregate(
+                income=Sum('net_amount', filter=Q(type='income')),
+                expense=Sum('net_amount', filter=Q(type='expense')),
+                income_count=Count('id', filter=Q(type='income')),
+                expense_count=Count('id', filter=Q(type='expense')),
+            )
+            
+            return cls.objects.create(
+                company=company,
+                year=year,
+                month=month,
+                period_end=period_end,
+                cumulative_income=(previous.cumulative_income if previous else 0) + (totals['income'] or 0),
+                cumulative_expense=(previous.cumulative_expense if previous else 0) + (totals['expense'] or 0),
+                income_transactions=(previous.income_transactions if previous else 0) + totals['income_count'],
+                expense_transactions=(previous.expense_transactions if previous else 0) + totals['expense_count'],
+                accounts_receivable=outstanding_receivables(company),
+                accounts_payable=outstanding_payables(company),
+                closed_by=user,
+            )
+
+
+class AccountingOutbox(models.Model):
+    """
+    Documents from other apps waiting to be booked into accounting.
+
+    Rows are written by the post_save receivers in the same database
+    transaction as the document change, and applied in batches by the
+    drain_accounting_outbox command. At most one pending row exists per
+    document, and applying a row is idempotent.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    source_app = models.CharField(max_length=20)
+    reference_id = models.CharField(max_length=100)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source_app', 'reference_id'],
+                condition=Q(status='pending'),
+                name='accounting_outbox_one_pending_per_document',
+            ),
+        ]
+        verbose_name = 'Accounting Outbox Entry'
+        verbose_name_plural = 'Accounting Outbox'
+    
+    def __str__(self):
+        return f"{self.source_app} {self.reference_id} ({self.get_status_display()})"
+
+
 class Account(models.Model):
     """Chart of accounts for better financial organization"""
     ACCOUNT_TYPE_CHOICES = [
@@ -179,12 +700,24 @@ class Account(models.Model):
         ('expense', 'Expense'),
     ]
     
+    # Types whose balance grows with debits; the others grow with credits
+    DEBIT_NORMAL_TYPES = {'asset', 'expense'}
+    
+    # Accounts created per company to post transactions against:
+    # code -> (account number, name, account type)
+    SYSTEM_ACCOUNTS = {
+        'cash': ('1000', 'Cash and Bank', 'asset'),
+        'revenue': ('4000', 'Sales Revenue', 'revenue'),
+        'expense': ('5000', 'Operating Expenses', 'expense'),
+    }
+    
     company = models.ForeignKey('core.CompanyProfile', on_delete=models.CASCADE, related_name='accounts')
     name = models.CharField(max_length=255)
     account_number = models.CharField(max_length=20, unique=True)
     account_type = models.CharField(max_length=20, choices=ACCOUNT_TYPE_CHOICES)
     description = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
+    system_code = models.CharField(max_length=20, blank=True, default='')
     
     # Balance tracking
     opening_balance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
@@ -199,21 +732,282 @@ class Account(models.Model):
             models.Index(fields=['company', 'account_type']),
             models.Index(fields=['account_number']),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['company', 'system_code'],
+                condition=~Q(system_code=''),
+                name='accounting_account_one_system_account_per_company',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.account_number} - {self.name}"
     
-    def update_balance(self):
-        """Update current balance based on transactions"""
-        transactions = Transaction.objects.filter(
-            company=self.company,
-            is_void=False
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._opening_balance = instance.__dict__.get('opening_balance')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self.current_balance = self.opening_balance
+            super().save(*args, **kwargs)
+            self._opening_balance = self.opening_balance
+            return
+        
+        # current_balance is maintained with delta updates, so an edit must
+        # not write back the value loaded with the account
+        if kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'current_balance'
+            ]
+        with db_transaction.atomic():
+            super().save(*args, **kwargs)
+            old_opening = getattr(self, '_opening_balance', None)
+            if old_opening is not None and old_opening != self.opening_balance:
+                Account.apply_delta(self.pk, Decimal(self.opening_balance) - old_opening)
+            self._opening_balance = self.opening_balance
+    
+    @property
+    def is_debit_normal(self):
+        return self.account_type in self.DEBIT_NORMAL_TYPES
+    
+    @classmethod
+    def signed_amount(cls, account_type, debit, credit):
+        """Change in an account's balance from the given debits and credits"""
+        if account_type in cls.DEBIT_NORMAL_TYPES:
+            return debit - credit
+        return credit - debit
+    
+    @classmethod
+    def apply_delta(cls, account_id, amount):
+        """Add a signed amount to an account's current balance with a single UPDATE"""
+        if not amount:
+            return
+        cls.objects.filter(pk=account_id).update(
+            current_balance=F('current_balance') + amount,
+            updated_at=timezone.now(),
         )
+    
+    @classmethod
+    def system_accounts(cls, company_id):
+        """The company's posting accounts by system code, created on first use"""
+        accounts = {
+            account.system_code: account
+            for account in cls.objects.filter(company_id=company_id, system_code__in=cls.SYSTEM_ACCOUNTS)
+        }
+        for code, (number, name, account_type) in cls.SYSTEM_ACCOUNTS.items():
+            if code in accounts:
+                continue
+            try:
+                with db_transaction.atomic():
+                    accounts[code] = cls.objects.create(
+                        company_id=company_id,
+                        system_code=code,
+                        # Account numbers are unique across companies
+                        account_number=f"{number}-{company_id}",
+                        name=name,
+                        account_type=account_type,
+                    )
+            except IntegrityError:
+                # Another request created it first
+                accounts[code] = cls.objects.get(company_id=company_id, system_code=code)
+        return accounts
+    
+    def update_balance(self):
+        """Recompute the current balance from the monthly rollups"""
+        totals = self.monthly_balances.aggregate(debit=Sum('debit'), credit=Sum('credit'))
+        movement = self.signed_amount(self.account_type, totals['debit'] or Decimal('0'), totals['credit'] or Decimal('0'))
+        self.current_balance = self.opening_balance + movement
+        Account.objects.filter(pk=self.pk).update(current_balance=self.current_balance, updated_at=timezone.now())
+
+
+class JournalEntry(models.Model):
+    """A balanced set of debit and credit lines posted together"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company = models.ForeignKey('core.CompanyProfile', on_delete=models.CASCADE, related_name='journal_entries')
+    transaction = models.OneToOneField(
+        Transaction, on_delete=models.CASCADE, null=True, blank=True, related_name='journal_entry'
+    )
+    entry_date = models.DateField()
+    description = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-entry_date', '-created_at']
+        verbose_name_plural = 'journal entries'
+        indexes = [
+            models.Index(fields=['company', 'entry_date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.entry_date} - {self.description}"
+    
+    @classmethod
+    def post(cls, company_id, entry_date, description, lines, transaction=None):
+        """
+        Post one entry from (account, debit, credit) tuples.
+
+        Raises ValidationError unless debits equal credits.
+        """
+        entry = cls(company_id=company_id, entry_date=entry_date, description=description[:255], transaction=transaction)
+        journal_lines = [
+            JournalLine(account_id=getattr(account, 'pk', account), debit=Decimal(debit), credit=Decimal(credit))
+            for account, debit, credit in lines
+        ]
+        cls.post_many([(entry, journal_lines)])
+        return entry
+    
+    @classmethod
+    def post_many(cls, drafts, batch_size=1000):
+        """
+        Insert (entry, lines) pairs in bulk and apply their deltas.
+
+        Every entry is checked to balance before anything is written; the
+        inserts and the balance updates run in one database transaction.
+        """
+        all_lines = []
+        for entry, lines in drafts:
+            debit = sum((line.debit for line in lines), Decimal('0'))
+            credit = sum((line.credit for line in lines), Decimal('0'))
+            if not lines or debit != credit:
+                raise ValidationError(f"Journal entry '{entry.description}' does not balance ({debit} != {credit}).")
+            if any(line.debit < 0 or line.credit < 0 for line in lines):
+                raise ValidationError(f"Journal entry '{entry.description}' has a negative amount.")
+            for line in lines:
+                line.entry = entry
+                line.entry_date = entry.entry_date
+            all_lines.extend(lines)
+        if not all_lines:
+            return
         
-        # This is a simplified balance calculation
-        # In a real system, you'd have proper double-entry bookkeeping
-        self.current_balance = self.opening_balance
-        self.save()
+        with db_transaction.atomic():
+            cls.objects.bulk_create([entry for entry, _ in drafts], batch_size=batch_size)
+            JournalLine.objects.bulk_create(all_lines, batch_size=batch_size)
+            JournalLine.apply_lines(all_lines)
+    
+    @classmethod
+    def lines_for_transaction(cls, transaction, accounts):
+        """Debit and credit lines for a transaction, using the company's system accounts"""
+        _, _, kind, amount = transaction.journal_key()
+        if kind == 'income':
+            debit_account, credit_account = accounts['cash'], accounts['revenue']
+        else:
+            debit_account, credit_account = accounts['expense'], accounts['cash']
+        if amount < 0:
+            # A discount larger than the amount reverses the direction
+            debit_account, credit_account, amount = credit_account, debit_account, -amount
+        return [
+            JournalLine(account=debit_account, debit=amount, credit=Decimal('0')),
+            JournalLine(account=credit_account, debit=Decimal('0'), credit=amount),
+        ]
+    
+    @classmethod
+    def post_transactions(cls, transactions, batch_size=1000):
+        """Post one entry per non-void, non-zero transaction; returns the number posted"""
+        accounts_by_company = {}
+        drafts = []
+        for transaction in transactions:
+            key = transaction.journal_key()
+            if key is None or not key[3]:
+                continue
+            company_id, entry_date = key[0], key[1]
+            if company_id not in accounts_by_company:
+                accounts_by_company[company_id] = Account.system_accounts(company_id)
+            entry = cls(
+                company_id=company_id,
+                transaction=transaction,
+                entry_date=entry_date,
+                description=transaction.title[:255],
+            )
+            drafts.append((entry, cls.lines_for_transaction(transaction, accounts_by_company[company_id])))
+        cls.post_many(drafts, batch_size=batch_size)
+        return len(drafts)
+    
+    def reverse_balances(self):
+        """Take this entry's lines back out of the account balances"""
+        JournalLine.apply_lines(list(self.lines.select_related('account')), sign=-1)
+
+
+class JournalLine(models.Model):
+    """One debit or credit against an account"""
+    entry = models.ForeignKey(JournalEntry, on_delete=models.CASCADE, related_name='lines')
+    account = models.ForeignKey(Account, on_delete=models.RESTRICT, related_name='journal_lines')
+    # Copied from the entry so account statements need no join
+    entry_date = models.DateField()
+    debit = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    credit = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        ordering = ['entry_date', 'id']
+        indexes = [
+            models.Index(fields=['account', 'entry_date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.account} Dr {self.debit} Cr {self.credit}"
+    
+    @classmethod
+    def apply_lines(cls, lines, sign=1):
+        """Add (or with sign=-1 remove) lines to account balances and monthly rollups"""
+        account_types = {
+            line.account_id: line.account.account_type
+            for line in lines if cls.account.is_cached(line)
+        }
+        missing = {line.account_id for line in lines} - set(account_types)
+        if missing:
+            account_types.update(Account.objects.filter(pk__in=missing).values_list('pk', 'account_type'))
+        
+        balances = {}
+        rollups = {}
+        for line in lines:
+            debit, credit = sign * line.debit, sign * line.credit
+            account_type = account_types[line.account_id]
+            balances[line.account_id] = balances.get(line.account_id, Decimal('0')) + Account.signed_amount(
+                account_type, debit, credit
+            )
+            key = (line.account_id, line.entry_date.year, line.entry_date.month)
+            current_debit, current_credit = rollups.get(key, (Decimal('0'), Decimal('0')))
+            rollups[key] = (current_debit + debit, current_credit + credit)
+        
+        for account_id, amount in balances.items():
+            Account.apply_delta(account_id, amount)
+        for (account_id, year, month), (debit, credit) in rollups.items():
+            AccountBalance.apply_delta(account_id, year, month, debit, credit)
+
+
+class AccountBalance(models.Model):
+    """Debits and credits posted to an account in one month"""
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='monthly_balances')
+    year = models.IntegerField()
+    month = models.IntegerField()
+    debit = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    credit = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        unique_together = ['account', 'year', 'month']
+        ordering = ['account', 'year', 'month']
+    
+    def __str__(self):
+        return f"{self.account} - {self.year}/{self.month:02d}"
+    
+    @classmethod
+    def apply_delta(cls, account_id, year, month, debit, credit):
+        """Add signed debits/credits to an account's month with a single UPDATE"""
+        if not debit and not credit:
+            return
+        changes = {'debit': F('debit') + debit, 'credit': F('credit') + credit}
+        rollups = cls.objects.filter(account_id=account_id, year=year, month=month)
+        if rollups.update(**changes):
+            return
+        try:
+            with db_transaction.atomic():
+                cls.objects.create(account_id=account_id, year=year, month=month, debit=debit, credit=credit)
+        except IntegrityError:
+            # Another request created the rollup first
+            rollups.update(**changes)
 
 
 class FinancialReport(models.Model):
@@ -0,0 +1,175 @@
+"""
+Outbox between the document apps and accounting.
+
+Saving an invoice, receipt or job order only inserts a small
+AccountingOutbox row (in the same database transaction as the save).
+The `drain_accounting_outbox` management command claims pending rows in
+batches, books the missing transactions with the sync engine and applies
+the ledger deltas. Applying a row twice is harmless: documents that
+already have a transaction are skipped by the sync anti-join.
+
+The drain command records a heartbeat in the shared cache. While no
+drainer has been seen for DRAIN_HEARTBEAT_TIMEOUT seconds, documents
+are booked right after they are saved, so nothing waits in an outbox
+that no process reads.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction as db_transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from .models import AccountingOutbox, Ledger
+from .summaries import invalidate_dashboard
+from .sync import SOURCES, SyncResult, sync_source
+
+logger = logging.getLogger(__name__)
+
+DRAIN_HEARTBEAT_KEY = 'accounting_outbox_drain_heartbeat'
+DRAIN_HEARTBEAT_TIMEOUT = 300
+
+
+def record_drain_heartbeat(worker_name):
+    """Tell the web processes that a drainer is reading the outbox"""
+    cache.set(DRAIN_HEARTBEAT_KEY, worker_name, DRAIN_HEARTBEAT_TIMEOUT)
+
+
+def drainer_running():
+    return cache.get(DRAIN_HEARTBEAT_KEY) is not None
+
+
+def outbox_enabled():
+    return getattr(settings, 'ACCOUNTING_OUTBOX_ENABLED', True) and drainer_running()
+
+
+def enqueue_document(source_app, reference_id):
+    """
+    Record that a document may need an accounting transaction.
+
+    With the outbox disabled, or no drainer running, the document is
+    booked right after the surrounding transaction commits instead.
+    """
+    if not outbox_enabled():
+        db_transaction.on_commit(lambda: apply_documents({source_app: [reference_id]}))
+        return
+    # A pending row for the same document already covers this change
+    AccountingOutbox.objects.bulk_create(
+        [AccountingOutbox(source_app=source_app, reference_id=str(reference_id))],
+        ignore_conflicts=True,
+    )
+
+
+def apply_documents(ids_by_source: Dict[str, Iterable]) -> List[SyncResult]:
+    """Book the missing transactions of the given documents and update their ledgers"""
+    results = []
+    deltas = defaultdict(lambda: (Decimal('0'), Decimal('0')))
+    with db_transaction.atomic():
+        for source_app, reference_ids in ids_by_source.items():
+            source = SOURCES.get(source_app)
+            if source is None:
+                continue
+            result = sync_source(source, document_ids=list(reference_ids))
+            for key, (income, expense) in result.ledger_deltas.items():
+                deltas[key] = (deltas[key][0] + income, deltas[key][1] + expense)
+            results.append(result)
+        for (company_id, year, month), (income, expense) in deltas.items():
+            Ledger.apply_delta(company_id, year, month, income, expense)
+    for company_id in {key[0] for key in deltas}:
+        invalidate_dashboard(company_id)
+    return results
+
+
+def claim_outbox_batch(worker_name, batch_size):
+    """Atomically claim up to `batch_size` of the oldest pending rows"""
+    ids = list(
+        AccountingOutbox.objects.filter(status='pending').order_by('created_at').values_list('pk', flat=True)[:batch_size]
+    )
+    if not ids:
+        return []
+    AccountingOutbox.objects.filter(pk__in=ids, status='pending').update(
+        status='processing',
+        worker=worker_name,
+        claimed_at=timezone.now(),
+        attempts=F('attempts') + 1,
+    )
+    # Rows another worker claimed first are left to it
+    return list(AccountingOutbox.objects.filter(pk__in=ids, status='processing', worker=worker_name))
+
+
+def release_events(events, max_attempts, error=''):
+    """Put claimed rows back in the queue, or fail them after `max_attempts`"""
+    claimed = AccountingOutbox.objects.filter(pk__in=[event.pk for event in events], status='processing')
+    # A newer pending row for the same document already retries it
+    claimed.filter(Exists(AccountingOutbox.objects.filter(
+        status='pending', source_app=OuterRef('source_app'), reference_id=OuterRef('reference_id')
+    ))).delete()
+    claimed.filter(attempts__gte=max_attempts).update(status='failed', last_error=error, processed_at=timezone.now())
+    claimed.update(status='pending', worker='', last_error=error)
+
+
+def drain_outbox_batch(worker_name, batch_size=500, max_attempts=5):
+    """
+    Claim and apply one batch of outbox rows.
+
+    Returns (applied, failed) row counts. If the batch as a whole fails,
+    its rows are retried one by one so a single bad document cannot hold
+    up the others.
+    """
+    events = claim_outbox_batch(worker_name, batch_size)
+    if not events:
+        return 0, 0
+
+    try:
+        apply_documents(_group(events))
+        _mark_done(events)
+        return len(events), 0
+    except Exception:
+        logger.exception('Accounting outbox batch failed, retrying rows one by one')
+
+    applied = failed = 0
+    for event in events:
+        try:
+            apply_documents({event.source_app: [event.reference_id]})
+        except Exception as e:
+            logger.exception('Accounting outbox row %s failed', event.pk)
+            release_events([event], max_attempts, error=str(e))
+            failed += 1
+        else:
+            _mark_done([event])
+            applied += 1
+    return applied, failed
+
+
+def _group(events):
+    ids_by_source = defaultdict(list)
+    for event in events:
+        ids_by_source[event.source_app].append(event.reference_id)
+    return ids_by_source
+
+
+def _mark_done(events):
+    AccountingOutbox.objects.filter(pk__in=[event.pk for event in events]).update(
+        status='done', processed_at=timezone.now(), last_error=''
+    )
+
+
+def purge_processed_events(days):
+    """Delete rows applied more than `days` ago"""
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = AccountingOutbox.objects.filter(status='done', processed_at__lt=cutoff).delete()
+    return deleted
+
+
+def requeue_stale_events(minutes, max_attempts=5):
+    """Return rows whose worker died mid-batch to the queue"""
+    cutoff = timezone.now() - timedelta(minutes=minutes)
+    stale = list(AccountingOutbox.objects.filter(status='processing', claimed_at__lt=cutoff))
+    if stale:
+        release_events(stale, max_attempts, error='The worker was interrupted.')
+    return len(stale)
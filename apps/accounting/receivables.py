@@ -0,0 +1,55 @@
+"""
+Outstanding receivables and their aging, read from the ReceivableBalance rollup.
+
+The rollup stores open invoice balances per company and due date, so a
+summary is one aggregate over a handful of rows. Aging buckets depend on
+today's date and are computed at read time from the due dates.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from .models import ReceivableBalance
+
+
+ZERO = Decimal('0')
+
+# (key, label, minimum days overdue, maximum days overdue)
+AGING_BUCKETS = [
+    ('current', 'Current', None, 0),
+    ('days_1_30', '1-30 days', 1, 30),
+    ('days_31_60', '31-60 days', 31, 60),
+    ('days_61_90', '61-90 days', 61, 90),
+    ('days_over_90', 'Over 90 days', 91, None),
+]
+
+
+def outstanding_receivables(company) -> Decimal:
+    return ReceivableBalance.outstanding(company.pk)
+
+
+def receivables_aging(company, today: Optional[date] = None) -> Dict[str, Any]:
+    """Outstanding total, open invoice count and aging buckets of a company"""
+    today = today or timezone.localdate()
+    aggregates = {'total': Sum('amount'), 'invoice_count': Sum('invoice_count')}
+    for key, _, min_days, max_days in AGING_BUCKETS:
+        condition = Q()
+        if min_days is not None:
+            condition &= Q(due_date__lte=today - timedelta(days=min_days))
+        if max_days is not None:
+            condition &= Q(due_date__gte=today - timedelta(days=max_days))
+        aggregates[key] = Sum('amount', filter=condition)
+
+    totals = ReceivableBalance.objects.filter(company=company).aggregate(**aggregates)
+    return {
+        'as_of': today,
+        'total': totals['total'] or ZERO,
+        'invoice_count': totals['invoice_count'] or 0,
+        'buckets': [
+            {'key': key, 'label': label, 'amount': totals[key] or ZERO}
+            for key, label, _, _ in AGING_BUCKETS
+        ],
+    }
@@ -1,11 +1,13 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from .models import Transaction
+from .models import JournalEntry, PeriodClose, ReceivableBalance, Transaction
+from .outbox import enqueue_document
+from .summaries import invalidate_dashboard
+from apps.core.models import CompanyProfile
 from apps.invoices.models import Invoice
 from apps.receipts.models import Receipt
 from apps.job_orders.models import Product as JobOrder
-from apps.waybills.models import Waybill
 # from apps.expenses.models import Expense  # Commented out until Expense model is created
 from decimal import Decimal
 
@@ -14,116 +16,27 @@ User = get_user_model()
 
 @receiver(post_save, sender=Invoice)
 def sync_invoice_to_accounting(sender, instance, created, **kwargs):
-    """Sync invoice payments to accounting transactions"""
+    """Queue paid invoices for booking as accounting income"""
     if instance.status == 'paid' and instance.grand_total > 0:
-        # Check if transaction already exists
-        existing_transaction = Transaction.objects.filter(
-            source_app='invoice',
-            reference_id=str(instance.id)
-        ).first()
-        
-        if not existing_transaction:
-            # Create income transaction for paid invoice
-            Transaction.objects.create(
-                user=instance.user,
-                company=instance.user.company_profile,
-                type='income',
-                title=f"Invoice Payment - {instance.invoice_number}",
-                description=f"Payment for invoice {instance.invoice_number} from {instance.client_name}",
-                amount=instance.grand_total,
-                currency=instance.user.company_profile.currency_symbol,
-                tax=instance.total_tax,
-                discount=instance.total_discount,
-                source_app='invoice',
-                reference_id=str(instance.id),
-                reference_model='Invoice',
-                transaction_date=instance.updated_at.date(),
-                notes=f"Auto-synced from paid invoice {instance.invoice_number}"
-            )
+        enqueue_document('invoice', instance.pk)
 
 
 @receiver(post_save, sender=Receipt)
 def sync_receipt_to_accounting(sender, instance, created, **kwargs):
-    """Sync receipt payments to accounting transactions"""
+    """Queue new receipts for booking as accounting income"""
     if created and instance.amount_received > 0:
-        # Check if transaction already exists
-        existing_transaction = Transaction.objects.filter(
-            source_app='receipt',
-            reference_id=str(instance.id)
-        ).first()
-        
-        if not existing_transaction:
-            # Create income transaction for receipt
-            Transaction.objects.create(
-                user=instance.created_by,
-                company=instance.created_by.company_profile,
-                type='income',
-                title=f"Receipt Payment - {instance.receipt_no}",
-                description=f"Payment receipt {instance.receipt_no} from {instance.client_name}",
-                amount=instance.amount_received,
-                currency=instance.created_by.company_profile.currency_symbol,
-                source_app='receipt',
-                reference_id=str(instance.id),
-                reference_model='Receipt',
-                transaction_date=instance.date_received,
-                notes=f"Auto-synced from receipt {instance.receipt_no}"
-            )
+        enqueue_document('receipt', instance.pk)
 
 
 @receiver(post_save, sender=JobOrder)
 def sync_job_order_to_accounting(sender, instance, created, **kwargs):
-    """Sync job order costs to accounting transactions"""
+    """Queue approved job orders for booking as accounting expenses"""
     if instance.approval_status == 'approved' and instance.total and instance.total > 0:
-        # Check if transaction already exists
-        existing_transaction = Transaction.objects.filter(
-            source_app='job_order',
-            reference_id=str(instance.id)
-        ).first()
-        
-        if not existing_transaction:
-            # Create expense transaction for job order costs
-            Transaction.objects.create(
-                user=instance.created_by,
-                company=instance.created_by.company_profile,
-                type='expense',
-                title=f"Job Order Cost - {instance.job_order}",
-                description=f"Cost for approved job order {instance.job_order}",
-                amount=instance.total,
-                currency=instance.created_by.company_profile.currency_symbol,
-                source_app='job_order',
-                reference_id=str(instance.id),
-                reference_model='Product',
-                transaction_date=instance.actual_delivery_date or instance.date_created.date(),
-                notes=f"Auto-synced from approved job order {instance.job_order}"
-            )
-
-
-@receiver(post_save, sender=Waybill)
-def sync_waybill_to_accounting(sender, instance, created, **kwargs):
-    """Sync waybill charges to accounting transactions"""
-    if instance.status == 'delivered' and instance.total_amount > 0:
-        # Check if transaction already exists
-        existing_transaction = Transaction.objects.filter(
-            source_app='waybill',
-            reference_id=str(instance.id)
-        ).first()
-        
-        if not existing_transaction:
-            # Create income transaction for waybill charges
-            Transaction.objects.create(
-                user=instance.created_by,
-                company=instance.created_by.company_profile,
-                type='income',
-                title=f"Waybill Charges - {instance.waybill_number}",
-                description=f"Charges for delivered waybill {instance.waybill_number}",
-                amount=instance.total_amount,
-                currency=instance.created_by.company_profile.currency_symbol,
-                source_app='waybill',
-                reference_id=str(instance.id),
-                reference_model='Waybill',
-                transaction_date=instance.delivery_date or instance.created_at.date(),
-                notes=f"Auto-synced from delivered waybill {instance.waybill_number}"
-            )
+        enqueue_document('job_order', instance.pk)
+
+
+# Waybills carry no amount to book (see apps.accounting.sync), so they are
+# not queued.
 
 
 # @receiver(post_save, sender=Expense)
@@ -156,38 +69,71 @@ def sync_waybill_to_accounting(sender, instance, created, **kwargs):
 
 @receiver(post_delete, sender=Transaction)
 def handle_transaction_deletion(sender, instance, **kwargs):
-    """Handle transaction deletion by updating ledgers"""
-    if not instance.is_void:
-        # Update the ledger for the deleted transaction's month/year
-        from .models import Ledger
-        
-        ledger = Ledger.objects.filter(
-            company=instance.company,
-            year=instance.transaction_date.year,
-            month=instance.transaction_date.month
-        ).first()
-        
-        if ledger:
-            # Recalculate totals for this month
-            transactions = Transaction.objects.filter(
-                company=instance.company,
-                transaction_date__year=instance.transaction_date.year,
-                transaction_date__month=instance.transaction_date.month,
-                is_void=False
-            )
-            
-            from django.db.models import Sum
-            
-            ledger.total_income = transactions.filter(type='income').aggregate(
-                total=Sum('net_amount')
-            )['total'] or 0
-            
-            ledger.total_expense = transactions.filter(type='expense').aggregate(
-                total=Sum('net_amount')
-            )['total'] or 0
-            
-            ledger.net_profit = ledger.total_income - ledger.total_expense
-            ledger.save()
+    """Handle transaction deletion by reversing its ledger entry"""
+    from .models import Ledger
+    
+    entry = getattr(instance, '_ledger_entry', instance.ledger_entry())
+    Ledger.apply_changes(entry, None)
+
+
+@receiver(pre_delete, sender=JournalEntry)
+def reverse_journal_entry(sender, instance, **kwargs):
+    """Take a deleted journal entry's lines back out of the account balances"""
+    instance.reverse_balances()
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+def invalidate_transaction_dashboard(sender, instance, **kwargs):
+    """Drop the cached accounting dashboard and statements when a transaction changes"""
+    invalidate_dashboard(instance.company_id)
+
+
+@receiver(post_save, sender=PeriodClose)
+@receiver(post_delete, sender=PeriodClose)
+def invalidate_closed_period_statements(sender, instance, **kwargs):
+    """Balance sheets start from the latest close, so regenerate them when closes change"""
+    invalidate_dashboard(instance.company_id)
+
+
+def invoice_receivable_entry(invoice):
+    return ReceivableBalance.invoice_entry(
+        invoice.user_id, invoice.due_date, invoice.invoice_date, invoice.status, invoice.balance_due
+    )
+
+
+@receiver(pre_save, sender=Invoice)
+def remember_invoice_receivable(sender, instance, **kwargs):
+    """Read what the stored invoice contributes to receivables before it is overwritten"""
+    instance._receivable_entry = None
+    if instance.pk is None:
+        return
+    stored = Invoice.objects.filter(pk=instance.pk).values(
+        'user_id', 'due_date', 'invoice_date', 'status', 'balance_due'
+    ).first()
+    if stored is not None:
+        instance._receivable_entry = ReceivableBalance.invoice_entry(**stored)
+
+
+@receiver(post_save, sender=Invoice)
+def update_receivables_on_invoice_save(sender, instance, **kwargs):
+    """Move the invoice's open balance in the receivables rollup (receipts save their invoice too)"""
+    ReceivableBalance.apply_changes(getattr(instance, '_receivable_entry', None), invoice_receivable_entry(instance))
+    instance._receivable_entry = invoice_receivable_entry(instance)
+
+
+@receiver(post_delete, sender=Invoice)
+def update_receivables_on_invoice_delete(sender, instance, **kwargs):
+    """Take a deleted invoice's open balance out of the receivables rollup"""
+    ReceivableBalance.apply_changes(invoice_receivable_entry(instance), None)
+
+
+@receiver(post_save, sender=Invoice)
+@receiver(post_delete, sender=Invoice)
+def invalidate_invoice_dashboard(sender, instance, **kwargs):
+    """Drop the cached accounting dashboard and statements when outstanding invoices may change"""
+    for company_id in CompanyProfile.objects.filter(user_id=instance.user_id).values_list('pk', flat=True):
+        invalidate_dashboard(company_id)
 
 
 # Import signals when the app is ready
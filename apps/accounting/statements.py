@@ -0,0 +1,268 @@
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from django.db.models import Count, Q, Sum
+
+from .models import PeriodClose, Transaction
+from .receivables import outstanding_receivables
+from .summaries import add_months, statement_version
+
+
+ZERO = Decimal('0')
+
+Period = Tuple[date, date]
+
+
+@dataclass
+class IncomeStatement:
+    start_date: date
+    end_date: date
+    income: Decimal = ZERO
+    expenses: Decimal = ZERO
+    income_transactions: int = 0
+    expense_transactions: int = 0
+
+    @property
+    def net_income(self) -> Decimal:
+        return self.income - self.expenses
+
+    @property
+    def total_transactions(self) -> int:
+        return self.income_transactions + self.expense_transactions
+
+    def as_report_data(self) -> Dict[str, Any]:
+        """The JSON shape stored in FinancialReport.report_data"""
+        return {
+            'income': float(self.income),
+            'expenses': float(self.expenses),
+            'net_income': float(self.net_income),
+            'period': f"{self.start_date} to {self.end_date}",
+            'debug_info': {
+                'total_transactions': self.total_transactions,
+                'income_transactions': self.income_transactions,
+                'expense_transactions': self.expense_transactions,
+            }
+        }
+
+
+@dataclass
+class BalanceSheet:
+    as_of_date: date
+    total_income: Decimal = ZERO
+    total_expenses: Decimal = ZERO
+    accounts_receivable: Decimal = ZERO
+    accounts_payable: Decimal = ZERO
+    income_transactions: int = 0
+    expense_transactions: int = 0
+    retained_earnings: Decimal = field(init=False)
+    owner_equity: Decimal = field(init=False)
+
+    def __post_init__(self):
+        # Assets = Cash + Accounts Receivable, with cash simplified to the
+        # retained earnings; owner's equity balances the equation
+        self.retained_earnings = self.total_income - self.total_expenses
+        self.owner_equity = self.total_assets - self.total_liabilities - self.retained_earnings
+        # Negative owner's equity means accumulated losses
+        if self.owner_equity < 0:
+            self.retained_earnings = self.total_assets - self.total_liabilities
+            self.owner_equity = ZERO
+
+    @property
+    def cash(self) -> Decimal:
+        return self.total_income - self.total_expenses
+
+    @property
+    def total_assets(self) -> Decimal:
+        return self.cash + self.accounts_receivable
+
+    @property
+    def total_liabilities(self) -> Decimal:
+        return self.accounts_payable
+
+    @property
+    def balance_check(self) -> Decimal:
+        return abs(self.total_assets - (self.total_liabilities + self.owner_equity + self.retained_earnings))
+
+    def as_report_data(self) -> Dict[str, Any]:
+        """The JSON shape stored in FinancialReport.report_data"""
+        return {
+            'total_assets': float(self.total_assets),
+            'total_liabilities': float(self.total_liabilities),
+            'owner_equity': float(self.owner_equity),
+            'retained_earnings': float(self.retained_earnings),
+            'accounts_receivable': float(self.accounts_receivable),
+            'accounts_payable': float(self.accounts_payable),
+            'cash': float(self.cash),
+            'as_of_date': self.as_of_date.strftime('%Y-%m-%d'),
+            'period': f"As of {self.as_of_date.strftime('%B %d, %Y')}",
+            'balance_check': float(self.balance_check),
+            'debug_info': {
+                'total_transactions': self.income_transactions + self.expense_transactions,
+                'income_transactions': self.income_transactions,
+                'expense_transactions': self.expense_transactions,
+                'accounting_equation_balanced': self.balance_check < Decimal('0.01'),
+            }
+        }
+
+
+def monthly_periods(start_date: date, end_date: date) -> List[Period]:
+    """Calendar month columns covering start_date..end_date, clipped to the range"""
+    periods = []
+    month_start = start_date.replace(day=1)
+    while month_start <= end_date:
+        next_month = add_months(month_start, 1)
+        month_end = next_month - timedelta(days=1)
+        periods.append((max(month_start, start_date), min(month_end, end_date)))
+        month_start = next_month
+    return periods
+
+
+def comparative_periods(start_date: date, end_date: date, years: int = 2) -> List[Period]:
+    """The given period and the same period in each of the previous years, latest first"""
+    periods = []
+    for offset in range(years):
+        periods.append((_shift_year(start_date, -offset), _shift_year(end_date, -offset)))
+    return periods
+
+
+def _shift_year(day: date, years: int) -> date:
+    try:
+        return day.replace(year=day.year + years)
+    except ValueError:
+        # 29 February in a non-leap year
+        return day.replace(year=day.year + years, day=28)
+
+
+def _totals_by_period(company, periods: Sequence[Period]) -> List[Dict[str, Any]]:
+    """
+    Income/expense sums and counts for every period from one query.
+
+    Each period becomes a set of conditional aggregates over the same scan
+    of the company's transactions. A period starting at None runs from the
+    beginning of time.
+    """
+    aggregates = {}
+    overall = Q()
+    for index, (start, end) in enumerate(periods):
+        in_period = Q(transaction_date__lte=end) if start is None else Q(transaction_date__range=[start, end])
+        overall |= in_period
+        for type_ in ('income', 'expense'):
+            condition = in_period & Q(type=type_)
+            aggregates[f'{type_}_{index}'] = Sum('net_amount', filter=condition)
+            aggregates[f'{type_}_count_{index}'] = Count('id', filter=condition)
+
+    row = Transaction.objects.filter(overall, company=company, is_void=False).aggregate(**aggregates)
+    return [
+        {
+            'income': row[f'income_{index}'] or ZERO,
+            'expenses': row[f'expense_{index}'] or ZERO,
+            'income_transactions': row[f'income_count_{index}'],
+            'expense_transactions': row[f'expense_count_{index}'],
+        }
+        for index in range(len(periods))
+    ]
+
+
+def income_statements(company, periods: Sequence[Period]) -> List[IncomeStatement]:
+    """Income statements for several periods, in the order given"""
+    if not periods:
+        return []
+    totals = _totals_by_period(company, periods)
+    return [
+        IncomeStatement(start_date=start, end_date=end, **values)
+        for (start, end), values in zip(periods, totals)
+    ]
+
+
+def income_statement(company, start_date: date, end_date: date) -> IncomeStatement:
+    return income_statements(company, [(start_date, end_date)])[0]
+
+
+def outstanding_payables(company) -> Decimal:
+    try:
+        from apps.expenses.models import Expense
+    except ImportError:
+        return ZERO
+    return Expense.objects.filter(
+        user=company.user,
+        status__in=['pending', 'unpaid']
+    ).aggregate(total=Sum('amount'))['total'] or ZERO
+
+
+def balance_sheets(company, as_of_dates: Sequence[date]) -> List[BalanceSheet]:
+    """
+    Balance sheets for several dates, in the order given.
+
+    Each date starts from the nearest closed period (see PeriodClose) and
+    only aggregates the open tail after it, so the cost does not grow
+    with the company's history.
+    """
+    if not as_of_dates:
+        return []
+    closes = [PeriodClose.latest(company.pk, on_or_before=as_of) for as_of in as_of_dates]
+    tails = _totals_by_period(company, [
+        (close.period_end + timedelta(days=1) if close else None, as_of)
+        for close, as_of in zip(closes, as_of_dates)
+    ])
+
+    current = None
+    sheets = []
+    for as_of, close, tail in zip(as_of_dates, closes, tails):
+        if close is not None and close.period_end == as_of:
+            receivables, payables = close.accounts_receivable, close.accounts_payable
+        else:
+            if current is None:
+                current = (outstanding_receivables(company), outstanding_payables(company))
+            receivables, payables = current
+        sheets.append(BalanceSheet(
+            as_of_date=as_of,
+            total_income=tail['income'] + (close.cumulative_income if close else ZERO),
+            total_expenses=tail['expenses'] + (close.cumulative_expense if close else ZERO),
+            accounts_receivable=receivables,
+            accounts_payable=payables,
+            income_transactions=tail['income_transactions'] + (close.income_transactions if close else 0),
+            expense_transactions=tail['expense_transactions'] + (close.expense_transactions if close else 0),
+        ))
+    return sheets
+
+
+def balance_sheet(company, as_of_date: date) -> BalanceSheet:
+    return balance_sheets(company, [as_of_date])[0]
+
+
+def statement_cache_key(report_type: str, start_date: date, end_date: date, version: str) -> str:
+    return f'{report_type}:{start_date.isoformat()}:{end_date.isoformat()}:{version}'
+
+
+def report_statement(report, start_date: Optional[date] = None, end_date: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Statement data of a FinancialReport, memoized in report.report_data.
+
+    The stored data is reused while the company's statement version (see
+    summaries.statement_version) and the date range are unchanged;
+    otherwise the statement is generated again and saved back onto the
+    report. Returns a copy that callers may annotate freely.
+    """
+    start_date = start_date or report.start_date
+    end_date = end_date or report.end_date
+    if report.report_type not in ('income_statement', 'balance_sheet'):
+        return dict(report.report_data)
+
+    key = statement_cache_key(report.report_type, start_date, end_date, statement_version(report.company_id))
+    if report.report_data.get('cache_key') == key:
+        return dict(report.report_data)
+
+    if report.report_type == 'income_statement':
+        data = income_statement(report.company, start_date, end_date).as_report_data()
+    else:
+        data = balance_sheet(report.company, end_date).as_report_data()
+    data['cache_key'] = key
+
+    # Only the report's own period is stored; widened periods are one-offs
+    if (start_date, end_date) == (report.start_date, report.end_date):
+        report.report_data = data
+        if report.pk:
+            report.save(update_fields=['report_data'])
+    return dict(data)
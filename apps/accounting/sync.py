@@ -0,0 +1,238 @@
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from django.db import transaction as db_transaction
+from django.db.models import CharField, Exists, Max, OuterRef
+from django.db.models.functions import Cast
+
+from apps.core.models import CompanyProfile
+
+from .models import JournalEntry, Ledger, PeriodClose, Transaction
+from .summaries import invalidate_dashboard
+
+
+SYNC_BATCH_SIZE = 1000
+
+
+@dataclass
+class SyncSource:
+    """
+    A kind of document from another app that becomes an accounting transaction.
+
+    `queryset` returns the documents that should have a transaction,
+    `owner_field` is the id of the user whose company books it, and
+    `since_field` is the timestamp used for incremental runs. `build`
+    turns one `.values()` row into Transaction field values.
+    """
+    source_app: str
+    reference_model: str
+    type: str
+    queryset: Callable[[], Any]
+    fields: List[str]
+    owner_field: str
+    since_field: str
+    build: Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+@dataclass
+class SyncResult:
+    source_app: str
+    created: int = 0
+    skipped: int = 0
+    companies: set = field(default_factory=set)
+    # Signed (income, expense) added per (company_id, year, month)
+    ledger_deltas: Dict[tuple, tuple] = field(default_factory=dict)
+    # Transactions that would be created, filled in dry runs only
+    planned: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def _invoices():
+    from apps.invoices.models import Invoice
+    return Invoice.objects.filter(status='paid', grand_total__gt=0)
+
+
+def _receipts():
+    from apps.receipts.models import Receipt
+    return Receipt.objects.filter(amount_received__gt=0, created_by__isnull=False)
+
+
+def _job_orders():
+    from apps.job_orders.models import Product
+    return Product.objects.filter(approval_status='approved', total__gt=0, created_by__isnull=False)
+
+
+SOURCES = {
+    'invoice': SyncSource(
+        source_app='invoice',
+        reference_model='Invoice',
+        type='income',
+        queryset=_invoices,
+        fields=['id', 'user_id', 'invoice_number', 'client_name', 'grand_total', 'total_tax', 'total_discount', 'updated_at'],
+        owner_field='user_id',
+        since_field='updated_at',
+        build=lambda row: {
+            'title': f"Invoice Payment - {row['invoice_number']}",
+            'description': f"Payment for invoice {row['invoice_number']} from {row['client_name']}",
+            'amount': row['grand_total'],
+            'tax': row['total_tax'],
+            'discount': row['total_discount'],
+            'transaction_date': row['updated_at'].date(),
+            'notes': f"Auto-synced from paid invoice {row['invoice_number']}",
+        },
+    ),
+    'receipt': SyncSource(
+        source_app='receipt',
+        reference_model='Receipt',
+        type='income',
+        queryset=_receipts,
+        fields=['id', 'created_by_id', 'receipt_no', 'client_name', 'amount_received', 'date_received'],
+        owner_field='created_by_id',
+        since_field='updated_at',
+        build=lambda row: {
+            'title': f"Receipt Payment - {row['receipt_no']}",
+            'description': f"Payment receipt {row['receipt_no']} from {row['client_name']}",
+            'amount': row['amount_received'],
+            'transaction_date': row['date_received'],
+            'notes': f"Auto-synced from receipt {row['receipt_no']}",
+        },
+    ),
+    'job_order': SyncSource(
+        source_app='job_order',
+        reference_model='Product',
+        type='expense',
+        queryset=_job_orders,
+        fields=['id', 'created_by_id', 'job_order', 'total', 'actual_delivery_date', 'date_created'],
+        owner_field='created_by_id',
+        # auto_now, so approving an older job order moves it past the watermark
+        since_field='production_status_date',
+        build=lambda row: {
+            'title': f"Job Order Cost - {row['job_order']}",
+            'description': f"Cost for approved job order {row['job_order']}",
+            'amount': row['total'],
+            'transaction_date': row['actual_delivery_date'] or row['date_created'].date(),
+            'notes': f"Auto-synced from approved job order {row['job_order']}",
+        },
+    ),
+}
+
+
+def pending_documents(source: SyncSource, company=None, since=None, force=False, document_ids=None):
+    """Documents of a source without a transaction yet, found with one anti-join"""
+    documents = source.queryset()
+    if document_ids is not None:
+        documents = documents.filter(pk__in=document_ids)
+    if company is not None:
+        documents = documents.filter(**{source.owner_field: company.user_id})
+    if since is not None:
+        documents = documents.filter(**{f'{source.since_field}__gte': since})
+    if not force:
+        documents = documents.filter(~Exists(Transaction.objects.filter(
+            source_app=source.source_app,
+            reference_id=Cast(OuterRef('pk'), CharField()),
+        )))
+    return documents.order_by('pk').values(*source.fields)
+
+
+def _chunks(rows: Iterable[Dict[str, Any]], size: int):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def sync_source(source: SyncSource, company=None, since=None, dry_run=False, force=False,
+                batch_size: int = SYNC_BATCH_SIZE, document_ids=None) -> SyncResult:
+    """
+    Create the missing transactions of one source with bulk inserts.
+
+    Journal entries are posted in bulk with the transactions. Ledgers are
+    not touched; the result carries the ledger deltas of the new
+    transactions and sync_documents() rebuilds the ledgers at the end.
+    """
+    result = SyncResult(source.source_app)
+    rows = pending_documents(
+        source, company=company, since=since, force=force, document_ids=document_ids
+    ).iterator(chunk_size=batch_size)
+
+    for chunk in _chunks(rows, batch_size):
+        user_ids = {row[source.owner_field] for row in chunk}
+        companies = {
+            profile['user_id']: profile
+            for profile in CompanyProfile.objects.filter(user_id__in=user_ids).values('id', 'user_id', 'currency_symbol')
+        }
+        closed_through = dict(
+            PeriodClose.objects.filter(company_id__in=[profile['id'] for profile in companies.values()])
+            .values('company_id').annotate(last=Max('period_end')).values_list('company_id', 'last')
+        )
+
+        transactions = []
+        for row in chunk:
+            profile = companies.get(row[source.owner_field])
+            if profile is None:
+                result.skipped += 1
+                continue
+            values = source.build(row)
+            transaction = Transaction(
+                user_id=row[source.owner_field],
+                company_id=profile['id'],
+                type=source.type,
+                currency=profile['currency_symbol'],
+                source_app=source.source_app,
+                reference_id=str(row['id']),
+                reference_model=source.reference_model,
+                **values
+            )
+            transaction.net_amount = (
+                Decimal(transaction.amount) + (transaction.tax or 0) - (transaction.discount or 0)
+            )
+            transaction.route_to_open_period(closed_through.get(profile['id']))
+            transactions.append(transaction)
+
+        if dry_run:
+            result.planned.extend({
+                'company_id': transaction.company_id,
+                'reference_id': transaction.reference_id,
+                'title': transaction.title,
+                'amount': transaction.net_amount,
+                'transaction_date': transaction.transaction_date,
+            } for transaction in transactions)
+        else:
+            Transaction.objects.bulk_create(transactions, batch_size=batch_size)
+            JournalEntry.post_transactions(transactions, batch_size=batch_size)
+            for transaction in transactions:
+                company_id, year, month, income, expense = transaction.ledger_entry()
+                current = result.ledger_deltas.get((company_id, year, month), (Decimal('0'), Decimal('0')))
+                result.ledger_deltas[(company_id, year, month)] = (current[0] + income, current[1] + expense)
+        result.created += len(transactions)
+        result.companies.update(transaction.company_id for transaction in transactions)
+    return result
+
+
+def sync_documents(source_apps: Optional[Iterable[str]] = None, company=None, since=None, dry_run=False,
+                   force=False, batch_size: int = SYNC_BATCH_SIZE) -> List[SyncResult]:
+    """
+    Bring accounting up to date with documents from other apps.
+
+    Each source is synced with an anti-join and chunked bulk inserts, then
+    the ledgers of every company that received transactions are rebuilt
+    in one grouped query. With dry_run nothing is written and each result
+    lists the transactions that would be created.
+    """
+    sources = [SOURCES[name] for name in (source_apps or SOURCES)]
+    with db_transaction.atomic():
+        results = [
+            sync_source(source, company=company, since=since, dry_run=dry_run, force=force, batch_size=batch_size)
+            for source in sources
+        ]
+        affected = set().union(*(result.companies for result in results))
+        if affected and not dry_run:
+            Ledger.rebuild(company_ids=affected, batch_size=batch_size)
+    if not dry_run:
+        for company_id in affected:
+            invalidate_dashboard(company_id)
+    return results
@@ -0,0 +1,514 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from apps.accounts.models import User
+from apps.core.models import CompanyProfile
+from apps.core.pagination import KeysetPaginator
+
+from .journal import account_statement, trial_balance
+from .models import (
+    Account, AccountBalance, AccountingOutbox, ClosedPeriodError, FinancialReport, JournalEntry, Ledger, PeriodClose,
+    ReceivableBalance, Transaction,
+)
+from .outbox import DRAIN_HEARTBEAT_KEY, drain_outbox_batch, record_drain_heartbeat
+from .receivables import receivables_aging
+from .statements import balance_sheet, balance_sheets, income_statements, monthly_periods, report_statement
+from .summaries import dashboard_summary, monthly_series, transaction_totals
+from .sync import sync_documents
+
+
+class AccountingTestMixin:
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='accounting@example.com',
+            password='testpass123'
+        )
+        self.company = CompanyProfile.objects.create(
+            user=self.user,
+            company_name='Accounting Co',
+            email='company@example.com',
+            phone='+1234567890',
+            address='123 Test Street'
+        )
+
+    def create_transaction(self, amount, type='income', transaction_date=date(2026, 3, 10), **kwargs):
+        return Transaction.objects.create(
+            user=self.user,
+            company=self.company,
+            type=type,
+            title=kwargs.pop('title', f'{type} {amount}'),
+            amount=Decimal(amount),
+            transaction_date=transaction_date,
+            **kwargs
+        )
+
+    def ledger_totals(self, year=2026, month=3):
+        ledger = Ledger.objects.get(company=self.company, year=year, month=month)
+        return ledger.total_income, ledger.total_expense, ledger.net_profit
+
+
+class LedgerDeltaTest(AccountingTestMixin, TestCase):
+    def test_create_and_edit_apply_deltas(self):
+        """Test ledgers follow creates and edits without re-aggregating the month"""
+        self.create_transaction('100.00')
+        expense = self.create_transaction('30.00', type='expense')
+        self.assertEqual(self.ledger_totals(), (Decimal('100.00'), Decimal('30.00'), Decimal('70.00')))
+
+        expense = Transaction.objects.get(pk=expense.pk)
+        expense.amount = Decimal('45.00')
+        with CaptureQueriesContext(connection) as ctx:
+            expense.save()
+        self.assertFalse(any('SUM(' in q['sql'].upper() for q in ctx.captured_queries))
+        self.assertEqual(self.ledger_totals(), (Decimal('100.00'), Decimal('45.00'), Decimal('55.00')))
+
+    def test_date_move_void_and_delete(self):
+        """Test date moves adjust both months and voids/deletes reverse the entry"""
+        income = self.create_transaction('100.00')
+        other = self.create_transaction('40.00')
+
+        income.transaction_date = date(2026, 4, 2)
+        income.save()
+        self.assertEqual(self.ledger_totals(month=3)[0], Decimal('40.00'))
+        self.assertEqual(self.ledger_totals(month=4)[0], Decimal('100.00'))
+
+        income.is_void = True
+        income.save()
+        self.assertEqual(self.ledger_totals(month=4)[0], Decimal('0.00'))
+
+        Transaction.objects.get(pk=other.pk).delete()
+        self.assertEqual(self.ledger_totals(month=3)[0], Decimal('0.00'))
+
+    def test_rebuild_reports_and_fixes_drift(self):
+        """Test Ledger.rebuild finds and corrects drifted ledgers"""
+        self.create_transaction('100.00')
+        Ledger.objects.filter(company=self.company).update(total_income=5, net_profit=5)
+
+        drift = Ledger.rebuild(company_ids=[self.company.pk], dry_run=True)
+        self.assertEqual(len(drift), 1)
+        self.assertEqual(self.ledger_totals()[0], Decimal('5.00'))
+
+        Ledger.rebuild(company_ids=[self.company.pk])
+        self.assertEqual(self.ledger_totals(), (Decimal('100.00'), Decimal('0.00'), Decimal('100.00')))
+        self.assertEqual(Ledger.rebuild(company_ids=[self.company.pk]), [])
+
+
+class DashboardSummaryTest(AccountingTestMixin, TestCase):
+    def test_monthly_series_uses_calendar_months(self):
+        """Test the chart series covers each calendar month exactly once"""
+        self.create_transaction('100.00', transaction_date=date(2026, 1, 31))
+        self.create_transaction('25.00', type='expense', transaction_date=date(2026, 3, 1))
+        self.create_transaction('10.00', transaction_date=date(2026, 3, 31), is_void=True)
+
+        with self.assertNumQueries(1):
+            series = monthly_series(self.company, date(2026, 3, 15))
+
+        self.assertEqual(len(series), 12)
+        self.assertEqual([item['month'] for item in series[-3:]], ['Jan 2026', 'Feb 2026', 'Mar 2026'])
+        self.assertEqual(series[-3]['income'], 100.0)
+        self.assertEqual(series[-1]['profit'], -25.0)
+        self.assertEqual(series[0]['month'], 'Apr 2025')
+
+    def test_summary_cached_until_transaction_written(self):
+        """Test the dashboard summary is cached and dropped on transaction writes"""
+        today = timezone.localdate()
+        self.create_transaction('100.00', transaction_date=today)
+        self.assertEqual(dashboard_summary(self.company)['current_ledger']['total_income'], 100.0)
+
+        with self.assertNumQueries(0):
+            dashboard_summary(self.company)
+
+        self.create_transaction('50.00', transaction_date=today)
+        self.assertEqual(dashboard_summary(self.company)['current_ledger']['total_income'], 150.0)
+
+
+class StatementEngineTest(AccountingTestMixin, TestCase):
+    def test_several_periods_from_one_query(self):
+        """Test monthly income statements are computed together in one query"""
+        self.create_transaction('100.00', transaction_date=date(2026, 1, 15))
+        self.create_transaction('30.00', type='expense', transaction_date=date(2026, 2, 1))
+        self.create_transaction('20.00', transaction_date=date(2026, 2, 28))
+
+        periods = monthly_periods(date(2026, 1, 10), date(2026, 3, 5))
+        self.assertEqual(periods[0], (date(2026, 1, 10), date(2026, 1, 31)))
+        self.assertEqual(periods[-1], (date(2026, 3, 1), date(2026, 3, 5)))
+
+        with self.assertNumQueries(1):
+            statements = income_statements(self.company, periods)
+
+        self.assertEqual([s.income for s in statements], [Decimal('100.00'), Decimal('20.00'), Decimal('0')])
+        self.assertEqual(statements[1].net_income, Decimal('-10.00'))
+        self.assertEqual(statements[1].total_transactions, 2)
+
+        sheets = balance_sheets(self.company, [date(2026, 1, 31), date(2026, 2, 28)])
+        self.assertEqual([sheet.cash for sheet in sheets], [Decimal('100.00'), Decimal('90.00')])
+
+    def test_report_data_memoized_until_transactions_change(self):
+        """Test report data is reused until a transaction of the company is written"""
+        self.create_transaction('100.00')
+        report = FinancialReport.objects.create(
+            company=self.company,
+            report_type='income_statement',
+            title='Q1',
+            start_date=date(2026, 1, 1),
+            end_date=date(2026, 3, 31),
+            created_by=self.user,
+        )
+        self.assertEqual(report_statement(report)['income'], 100.0)
+
+        report = FinancialReport.objects.get(pk=report.pk)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(report_statement(report)['income'], 100.0)
+        # Only the cache may be read, no accounting or company tables
+        self.assertEqual([q['sql'] for q in ctx.captured_queries if 'django_cache' not in q['sql']], [])
+
+        self.create_transaction('50.00')
+        self.assertEqual(report_statement(report)['income'], 150.0)
+
+
+class PeriodCloseTest(AccountingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.january = self.create_transaction('100.00', transaction_date=date(2025, 1, 10))
+        self.create_transaction('40.00', type='expense', transaction_date=date(2025, 1, 20))
+        self.create_transaction('25.00', transaction_date=date(2025, 2, 5))
+        self.close = PeriodClose.close(self.company, 2025, 1)
+
+    def test_balance_sheet_starts_from_snapshot(self):
+        """Test as-of balance sheets add only the open tail to the nearest close"""
+        self.assertEqual(self.close.cumulative_income, Decimal('100.00'))
+        self.assertEqual(self.close.cumulative_expense, Decimal('40.00'))
+
+        sheet = balance_sheet(self.company, date(2025, 2, 28))
+        self.assertEqual(sheet.cash, Decimal('85.00'))
+        self.assertEqual(sheet.income_transactions, 2)
+
+        # Rows behind the close are no longer read
+        Transaction.objects.filter(pk=self.january.pk).update(net_amount=Decimal('1.00'))
+        self.assertEqual(balance_sheet(self.company, date(2025, 2, 28)).cash, Decimal('85.00'))
+
+    def test_closed_period_is_immutable(self):
+        """Test edits are rejected and backdated entries become adjustments"""
+        self.january.amount = Decimal('120.00')
+        with self.assertRaises(ClosedPeriodError):
+            self.january.save()
+        with self.assertRaises(ClosedPeriodError):
+            Transaction.objects.get(pk=self.january.pk).delete()
+        with self.assertRaises(ClosedPeriodError):
+            Transaction.objects.filter(company=self.company).delete()
+        with self.assertRaises(ClosedPeriodError):
+            self.close.save()
+        with self.assertRaises(ClosedPeriodError):
+            PeriodClose.close(self.company, 2025, 1)
+
+        late = self.create_transaction('10.00', transaction_date=date(2025, 1, 15))
+        self.assertEqual(late.transaction_date, date(2025, 2, 1))
+        self.assertIn('Adjustment for 2025-01-15', late.notes)
+        self.assertEqual(self.ledger_totals(2025, 1)[0], Decimal('100.00'))
+
+
+class DocumentSyncTest(AccountingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        from apps.job_orders.models import Product
+
+        for total in ('120.00', '80.00'):
+            Product.objects.create(
+                name='Bags',
+                total=Decimal(total),
+                created_by=self.user,
+                actual_delivery_date=date(2026, 3, 12),
+            )
+        # Approve without the post_save sync so the documents are unsynced
+        Product.objects.update(approval_status='approved')
+
+    def test_dry_run_lists_without_writing(self):
+        """Test a dry run reports the missing transactions and writes nothing"""
+        results = sync_documents(['job_order'], dry_run=True)
+        self.assertEqual(results[0].created, 2)
+        self.assertEqual(len(results[0].planned), 2)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_sync_inserts_missing_and_rebuilds_ledgers(self):
+        """Test unsynced documents are bulk inserted once and ledgers rebuilt"""
+        results = sync_documents(['job_order'])
+        self.assertEqual(results[0].created, 2)
+        self.assertEqual(Transaction.objects.filter(source_app='job_order', company=self.company).count(), 2)
+        self.assertEqual(self.ledger_totals()[1], Decimal('200.00'))
+
+        self.assertEqual(sync_documents(['job_order'])[0].created, 0)
+
+    def test_since_picks_up_late_approvals(self):
+        """Test a job order created before the watermark but approved after it is synced"""
+        from apps.job_orders.models import Product
+
+        watermark = timezone.now()
+        Product.objects.update(approval_status='pending', date_created=watermark - timedelta(days=30))
+        self.assertEqual(sync_documents(['job_order'], since=watermark, dry_run=True)[0].created, 0)
+
+        product = Product.objects.first()
+        product.approval_status = 'approved'
+        product.save()
+        self.assertEqual(sync_documents(['job_order'], since=watermark, dry_run=True)[0].created, 1)
+
+
+class AccountingOutboxTest(AccountingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        record_drain_heartbeat('test-worker')
+
+    def create_job(self):
+        from apps.job_orders.models import Product
+
+        return Product.objects.create(
+            name='Bags',
+            total=Decimal('75.00'),
+            created_by=self.user,
+            approval_status='approved',
+            actual_delivery_date=date(2026, 3, 12),
+        )
+
+    def test_books_inline_without_drainer(self):
+        """Test documents are booked on save while no drainer is running"""
+        cache.delete(DRAIN_HEARTBEAT_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_job().save()
+        self.assertFalse(AccountingOutbox.objects.exists())
+        self.assertEqual(Transaction.objects.filter(source_app='job_order').count(), 1)
+
+    def test_saves_queue_and_worker_books_once(self):
+        """Test document saves only queue work and draining books each document once"""
+        job = self.create_job()
+        job.save()
+        self.assertEqual(AccountingOutbox.objects.filter(status='pending').count(), 1)
+        self.assertFalse(Transaction.objects.exists())
+
+        self.assertEqual(drain_outbox_batch('test-worker'), (1, 0))
+        self.assertEqual(Transaction.objects.filter(source_app='job_order').count(), 1)
+        self.assertEqual(self.ledger_totals()[1], Decimal('75.00'))
+
+        job.save()
+        self.assertEqual(drain_outbox_batch('test-worker'), (1, 0))
+        self.assertEqual(Transaction.objects.filter(source_app='job_order').count(), 1)
+        self.assertEqual(self.ledger_totals()[1], Decimal('75.00'))
+        self.assertEqual(drain_outbox_batch('test-worker'), (0, 0))
+
+
+class TransactionListTest(AccountingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        for day in range(1, 8):
+            self.create_transaction('10.00', transaction_date=date(2026, 3, day))
+            self.create_transaction('4.00', type='expense', transaction_date=date(2026, 3, day))
+
+    def get_page(self, params=None):
+        request = RequestFactory().get('/accounting/transactions/', params or {})
+        transactions = Transaction.objects.filter(company=self.company, is_void=False)
+        paginator = KeysetPaginator(transactions, ['-transaction_date', '-created_at', '-id'], per_page=5)
+        return paginator.get_page(request, total_count=transactions.count())
+
+    def test_keyset_pages_cover_every_row_once(self):
+        """Test walking pages forward and back visits each row exactly once in order"""
+        seen = []
+        page = self.get_page()
+        pages = [page]
+        seen.extend(page)
+        while page.has_next:
+            page = self.get_page({'cursor': page.next_cursor})
+            pages.append(page)
+            seen.extend(page)
+
+        expected = list(Transaction.objects.filter(company=self.company).order_by('-transaction_date', '-created_at', '-id'))
+        self.assertEqual([t.pk for t in seen], [t.pk for t in expected])
+        self.assertEqual(pages[-1].end_index(), 14)
+
+        previous = self.get_page({'cursor': pages[-1].previous_cursor})
+        self.assertEqual([t.pk for t in previous], [t.pk for t in pages[-2]])
+        self.assertEqual(previous.start_index(), 6)
+
+        last = self.get_page({'cursor': 'last'})
+        self.assertEqual([t.pk for t in last], [t.pk for t in expected[-5:]])
+
+    def test_unfiltered_totals_cached_until_write(self):
+        """Test totals come from one query and the unfiltered ones are cached"""
+        transactions = Transaction.objects.filter(company=self.company, is_void=False)
+        with CaptureQueriesContext(connection) as ctx:
+            totals = transaction_totals(transactions, company=self.company)
+        # Storing the totals also writes to the shared cache table
+        self.assertEqual(len([q for q in ctx.captured_queries if 'FROM "accounting_transaction"' in q['sql']]), 1)
+        self.assertEqual((totals['total_income'], totals['total_expense'], totals['total_count']),
+                         (Decimal('70.00'), Decimal('28.00'), 14))
+
+        with self.assertNumQueries(0):
+            transaction_totals(transactions, company=self.company)
+
+        self.create_transaction('5.00')
+        self.assertEqual(transaction_totals(transactions, company=self.company)['total_count'], 15)
+
+
+class JournalTest(AccountingTestMixin, TestCase):
+    def balances(self):
+        return {
+            code: Account.objects.get(pk=account.pk).current_balance
+            for code, account in Account.system_accounts(self.company.pk).items()
+        }
+
+    def test_transactions_post_balanced_entries_with_deltas(self):
+        """Test saves, edits, voids and deletes keep account balances and rollups in step"""
+        income = self.create_transaction('100.00')
+        expense = self.create_transaction('30.00', type='expense')
+        self.assertEqual(self.balances(), {'cash': Decimal('70.00'), 'revenue': Decimal('100.00'), 'expense': Decimal('30.00')})
+
+        expense = Transaction.objects.get(pk=expense.pk)
+        expense.amount = Decimal('45.00')
+        expense.transaction_date = date(2026, 4, 1)
+        expense.save()
+        self.assertEqual(self.balances()['cash'], Decimal('55.00'))
+        cash = Account.system_accounts(self.company.pk)['cash']
+        self.assertEqual(
+            list(AccountBalance.objects.filter(account=cash).values_list('month', 'debit', 'credit')),
+            [(3, Decimal('100.00'), Decimal('0.00')), (4, Decimal('0.00'), Decimal('45.00'))],
+        )
+
+        income.is_void = True
+        income.save()
+        Transaction.objects.get(pk=expense.pk).delete()
+        self.assertEqual(self.balances(), {'cash': Decimal('0.00'), 'revenue': Decimal('0.00'), 'expense': Decimal('0.00')})
+        self.assertFalse(JournalEntry.objects.exists())
+
+    def test_trial_balance_and_statement_from_rollups(self):
+        """Test reports combine monthly rollups with the lines of partial months"""
+        self.create_transaction('100.00', transaction_date=date(2026, 1, 5))
+        self.create_transaction('60.00', transaction_date=date(2026, 2, 10))
+        self.create_transaction('25.00', type='expense', transaction_date=date(2026, 2, 20))
+
+        report = trial_balance(self.company, date(2026, 2, 15), start_date=date(2026, 2, 1))
+        self.assertTrue(report.is_balanced)
+        rows = {row.account.system_code: row for row in report.rows}
+        self.assertEqual(rows['cash'].opening_balance, Decimal('100.00'))
+        self.assertEqual(rows['cash'].closing_balance, Decimal('160.00'))
+        self.assertEqual(rows['revenue'].closing_credit, Decimal('160.00'))
+
+        cash = rows['cash'].account
+        statement = account_statement(cash, date(2026, 2, 1), date(2026, 2, 28))
+        self.assertEqual(statement.opening_balance, Decimal('100.00'))
+        self.assertEqual([balance for _, balance in statement.lines], [Decimal('160.00'), Decimal('135.00')])
+
+        Account.objects.filter(pk=cash.pk).update(current_balance=0)
+        cash.update_balance()
+        self.assertEqual(Account.objects.get(pk=cash.pk).current_balance, Decimal('135.00'))
+
+    def test_backfill_posts_unjournaled_transactions_once(self):
+        """Test the backfill command posts only transactions without an entry"""
+        from django.core.management import call_command
+
+        self.create_transaction('100.00')
+        JournalEntry.objects.all().delete()
+        self.assertEqual(self.balances()['cash'], Decimal('0.00'))
+
+        call_command('backfill_journal', batch_size=1, stdout=StringIO())
+        call_command('backfill_journal', stdout=StringIO())
+        self.assertEqual(JournalEntry.objects.count(), 1)
+        self.assertEqual(self.balances()['cash'], Decimal('100.00'))
+
+
+class ReportArtifactTest(AccountingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.create_transaction('100.00')
+        self.report = FinancialReport.objects.create(
+            company=self.company,
+            report_type='income_statement',
+            title='March',
+            start_date=date(2026, 3, 1),
+            end_date=date(2026, 3, 31),
+            created_by=self.user,
+        )
+        self.client.force_login(self.user)
+        self.url = reverse('accounting:export_report_excel', args=[self.report.pk])
+
+    def test_file_rendered_once_per_content_hash(self):
+        """Test repeat downloads reuse the stored file and honour If-None-Match"""
+        # Local files only, the default storage may be a remote (GitHub) backend
+        storages = {
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        }
+        with override_settings(MEDIA_ROOT=self.media_root, STORAGES=storages, BACKGROUND_JOBS_ENABLED=False):
+            first = self.client.get(self.url)
+            self.assertEqual(first.status_code, 200)
+            content = b''.join(first.streaming_content)
+            name = FinancialReport.objects.get(pk=self.report.pk).excel_file.name
+
+            second = self.client.get(self.url)
+            self.assertEqual(b''.join(second.streaming_content), content)
+            self.assertEqual(second['ETag'], first['ETag'])
+            self.assertEqual(FinancialReport.objects.get(pk=self.report.pk).excel_file.name, name)
+
+            cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+            self.assertEqual(cached.status_code, 304)
+
+            self.create_transaction('50.00')
+            changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+            self.assertEqual(changed.status_code, 200)
+            self.assertNotEqual(changed['ETag'], first['ETag'])
+            self.assertNotEqual(FinancialReport.objects.get(pk=self.report.pk).excel_file.name, name)
+
+
+class ReceivablesTest(AccountingTestMixin, TestCase):
+    def create_invoice(self, total, due_date):
+        from apps.invoices.models import Invoice
+
+        return Invoice.objects.create(
+            user=self.user,
+            client_name='Client',
+            shipping_fee=Decimal(total),
+            grand_total=Decimal(total),
+            balance_due=Decimal(total),
+            due_date=due_date,
+        )
+
+    def test_rollup_follows_invoices_and_receipts(self):
+        """Test invoice saves and deletes keep outstanding totals and aging buckets current"""
+        today = date(2026, 6, 30)
+        current = self.create_invoice('100.00', date(2026, 7, 15))
+        overdue = self.create_invoice('80.00', date(2026, 5, 20))
+        self.create_invoice('50.00', date(2026, 2, 1))
+
+        aging = receivables_aging(self.company, today=today)
+        self.assertEqual((aging['total'], aging['invoice_count']), (Decimal('230.00'), 3))
+        buckets = {bucket['key']: bucket['amount'] for bucket in aging['buckets']}
+        self.assertEqual(buckets['current'], Decimal('100.00'))
+        self.assertEqual(buckets['days_31_60'], Decimal('80.00'))
+        self.assertEqual(buckets['days_over_90'], Decimal('50.00'))
+
+        overdue.amount_paid = Decimal('30.00')
+        overdue.save()
+        self.assertEqual(receivables_aging(self.company, today=today)['total'], Decimal('200.00'))
+
+        current.amount_paid = Decimal('100.00')
+        current.save()
+        current.refresh_from_db()
+        self.assertEqual(current.status, 'paid')
+        overdue.delete()
+        aging = receivables_aging(self.company, today=today)
+        self.assertEqual((aging['total'], aging['invoice_count']), (Decimal('50.00'), 1))
+
+    def test_rebuild_fixes_drift(self):
+        """Test ReceivableBalance.rebuild restores the rollup from open invoices"""
+        self.create_invoice('100.00', date(2026, 7, 15))
+        ReceivableBalance.objects.update(amount=1)
+
+        self.assertEqual(len(ReceivableBalance.rebuild(company_ids=[self.company.pk])), 1)
+        self.assertEqual(ReceivableBalance.outstanding(self.company.pk), Decimal('100.00'))
+        self.assertEqual(ReceivableBalance.rebuild(company_ids=[self.company.pk]), [])
@@ -22,6 +22,7 @@ urlpatterns = [
     path('reports/generate/', views.generate_report, name='generate_report'),
     path('reports/<int:report_id>/', views.view_report, name='view_report'),
     path('reports/<int:report_id>/export-pdf/', views.export_report_pdf, name='export_report_pdf'),
+    path('reports/<int:report_id>/export-excel/', views.export_report_excel, name='export_report_excel'),
     
     # Sync and utilities
     path('sync/', views.sync_from_other_apps, name='sync_from_other_apps'),
@@ -29,4 +30,5 @@ urlpatterns = [
     # AJAX endpoints
     path('ajax/update-ledger/', views.update_ledger_ajax, name='update_ledger_ajax'),
     path('ajax/update-currency/', views.update_accounting_currency, name='update_accounting_currency'),
+    path('ajax/receivables/', views.receivables_summary, name='receivables_summary'),
 ]
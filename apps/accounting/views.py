@@ -2,7 +2,6 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse, HttpResponse
-from django.core.paginator import Paginator
 from django.db.models import Sum, Q, Count, Min, Max
 from django.utils import timezone
 from django.views.decorators.http import require_POST
@@ -15,13 +14,21 @@ import csv
 from decimal import Decimal
 import re
 
-from .models import Transaction, Ledger, Account, FinancialReport
+from .models import ClosedPeriodError, Transaction, Ledger, Account, FinancialReport
 from .forms import (
     TransactionForm, TransactionFilterForm, AccountForm, 
     FinancialReportForm, BulkTransactionForm, ReconciliationForm,
     ImportTransactionForm
 )
 from apps.core.models import CompanyProfile
+from apps.core.exports import XlsxStream, csv_response, iter_values, xlsx_response
+from apps.core.jobs import background_job
+from apps.core.pagination import KeysetPaginator
+from .artifacts import artifact_hash, artifact_response, not_modified, store_artifact, stored_artifact
+from .receivables import outstanding_receivables, receivables_aging
+from .statements import balance_sheet, income_statement, report_statement
+from .summaries import dashboard_summary, monthly_series, transaction_totals
+from .sync import sync_documents
 
 def get_currency_display(currency_symbol):
     """Convert currency symbol to display text for better compatibility"""
@@ -72,6 +79,31 @@ def clean_transaction_text(text):
     return text
 
 
+def iter_transaction_export_rows(transactions):
+    """Yield one export row per transaction, reading values() rows in chunks"""
+    type_display = dict(Transaction.TRANSACTION_TYPE)
+    source_display = dict(Transaction.SOURCE_APP_CHOICES)
+    fields = [
+        'transaction_date', 'type', 'title', 'amount', 'currency', 'tax', 'discount',
+        'net_amount', 'source_app', 'reference_id', 'notes', 'is_reconciled',
+    ]
+    for transaction in iter_values(transactions, *fields):
+        yield [
+            transaction['transaction_date'],
+            type_display.get(transaction['type'], transaction['type']),
+            clean_transaction_text(transaction['title']),
+            transaction['amount'],
+            get_currency_display(transaction['currency']),
+            transaction['tax'] or 0,
+            transaction['discount'] or 0,
+            transaction['net_amount'],
+            clean_transaction_text(source_display.get(transaction['source_app'], transaction['source_app'])),
+            clean_transaction_text(transaction['reference_id'] or ''),
+            clean_transaction_text(transaction['notes'] or ''),
+            'Yes' if transaction['is_reconciled'] else 'No',
+        ]
+
+
 def get_pdf_currency_symbol(currency_symbol, use_symbol=True):
     """Convert currency symbol to PDF-compatible format"""
     if not currency_symbol or currency_symbol.strip() == '':
@@ -147,65 +179,7 @@ def get_pdf_currency_symbol(currency_symbol, use_symbol=True):
 
 def sync_ledgers_from_transactions(company):
     """Sync ledgers from existing transactions for all months"""
-    
-    # Get date range of transactions
-    date_range = Transaction.objects.filter(
-        company=company,
-        is_void=False
-    ).aggregate(
-        min_date=Min('transaction_date'),
-        max_date=Max('transaction_date')
-    )
-    
-    if not date_range['min_date'] or not date_range['max_date']:
-        return
-    
-    # Create ledgers for each month in the range
-    current_date = date_range['min_date'].replace(day=1)
-    end_date = date_range['max_date'].replace(day=1)
-    
-    while current_date <= end_date:
-        # Check if ledger exists for this month
-        existing_ledger = Ledger.objects.filter(
-            company=company,
-            year=current_date.year,
-            month=current_date.month
-        ).first()
-        
-        if not existing_ledger:
-            # Calculate totals from transactions
-            month_transactions = Transaction.objects.filter(
-                company=company,
-                transaction_date__year=current_date.year,
-                transaction_date__month=current_date.month,
-                is_void=False
-            )
-            
-            total_income = month_transactions.filter(type='income').aggregate(
-                total=Sum('net_amount')
-            )['total'] or 0
-            
-            total_expense = month_transactions.filter(type='expense').aggregate(
-                total=Sum('net_amount')
-            )['total'] or 0
-            
-            net_profit = total_income - total_expense
-            
-            # Create ledger
-            Ledger.objects.create(
-                company=company,
-                year=current_date.year,
-                month=current_date.month,
-                total_income=total_income,
-                total_expense=total_expense,
-                net_profit=net_profit
-            )
-        
-        # Move to next month
-        if current_date.month == 12:
-            current_date = current_date.replace(year=current_date.year + 1, month=1)
-        else:
-            current_date = current_date.replace(month=current_date.month + 1)
+    return Ledger.rebuild(company_ids=[company.pk])
 
 
 @login_required
@@ -218,28 +192,14 @@ def accounting_dashboard(request):
         messages.error(request, "Company profile not found. Please set up your company profile first.")
         return redirect('core:company_profile')
     
-    # Sync ledgers from existing transactions
-    sync_ledgers_from_transactions(company)
-    
     # Get current month/year
     current_date = timezone.now()
     current_month = current_date.month
     current_year = current_date.year
     
-    # Get current month ledger
-    current_ledger = Ledger.objects.filter(
-        company=company,
-        year=current_year,
-        month=current_month
-    ).first()
-    
-    # Create a default ledger if none exists
-    if not current_ledger:
-        current_ledger = type('obj', (object,), {
-            'total_income': 0,
-            'total_expense': 0,
-            'net_profit': 0
-        })()
+    # Cached per company; ledgers are kept current by Transaction.save() and
+    # can be backfilled with the verify_ledgers command
+    summary = dashboard_summary(company)
     
     # Get recent transactions
     recent_transactions = Transaction.objects.filter(
@@ -247,115 +207,15 @@ def accounting_dashboard(request):
         is_void=False
     ).order_by('-created_at')[:10]
     
-    # Get monthly data for charts (last 12 months) - improved with real transaction data
-    monthly_data = []
-    for i in range(12):
-        date = current_date - timedelta(days=30*i)
-        
-        # Get or create ledger for this month
-        month_ledger = Ledger.objects.filter(
-            company=company,
-            year=date.year,
-            month=date.month
-        ).first()
-        
-        # If no ledger exists, calculate from actual transactions
-        if not month_ledger:
-            month_transactions = Transaction.objects.filter(
-                company=company,
-                transaction_date__year=date.year,
-                transaction_date__month=date.month,
-                is_void=False
-            )
-            
-            month_income = month_transactions.filter(type='income').aggregate(
-                total=Sum('net_amount')
-            )['total'] or 0
-            
-            month_expense = month_transactions.filter(type='expense').aggregate(
-                total=Sum('net_amount')
-            )['total'] or 0
-            
-            month_profit = month_income - month_expense
-        else:
-            month_income = float(month_ledger.total_income)
-            month_expense = float(month_ledger.total_expense)
-            month_profit = float(month_ledger.net_profit)
-        
-        monthly_data.append({
-            'month': date.strftime('%b %Y'),
-            'year': date.year,
-            'month_num': date.month,
-            'income': month_income,
-            'expense': month_expense,
-            'profit': month_profit,
-        })
-    
-    # Get outstanding invoices
-    from apps.invoices.models import Invoice
-    outstanding_invoices = Invoice.objects.filter(
-        user=user,
-        status__in=['unpaid', 'partial']
-    ).aggregate(total=Sum('balance_due'))['total'] or 0
-    
-    # Get today's transactions
-    today_transactions = Transaction.objects.filter(
-        company=company,
-        transaction_date=current_date.date(),
-        is_void=False
-    )
-    
-    today_income = today_transactions.filter(type='income').aggregate(
-        total=Sum('net_amount')
-    )['total'] or 0
-    
-    today_expense = today_transactions.filter(type='expense').aggregate(
-        total=Sum('net_amount')
-    )['total'] or 0
-    
-    # If no transactions today, use recent transactions for demonstration
-    if today_income == 0 and today_expense == 0:
-        # Get recent transactions for demonstration
-        recent_income = Transaction.objects.filter(
-            company=company,
-            type='income',
-            is_void=False
-        ).order_by('-transaction_date')[:3].aggregate(
-            total=Sum('net_amount')
-        )['total'] or 0
-        
-        recent_expense = Transaction.objects.filter(
-            company=company,
-            type='expense',
-            is_void=False
-        ).order_by('-transaction_date')[:3].aggregate(
-            total=Sum('net_amount')
-        )['total'] or 0
-        
-        today_income = recent_income
-        today_expense = recent_expense
-    
-    # Get source app breakdown - optimized
-    source_breakdown = list(Transaction.objects.filter(
-        company=company,
-        is_void=False
-    ).values('source_app').annotate(
-        total=Sum('net_amount'),
-        count=Count('id')
-    ).order_by('-total'))
-    
-    # Convert Decimal values to float for JSON serialization
-    for item in source_breakdown:
-        item['total'] = float(item['total'])
-    
+    monthly_data = summary['monthly_data']
     context = {
-        'current_ledger': current_ledger,
+        'current_ledger': summary['current_ledger'],
         'recent_transactions': recent_transactions,
-        'monthly_data': list(reversed(monthly_data)),  # Reverse for chronological order
-        'outstanding_invoices': float(outstanding_invoices),
-        'today_income': float(today_income),
-        'today_expense': float(today_expense),
-        'source_breakdown': source_breakdown,
+        'monthly_data': monthly_data,
+        'outstanding_invoices': summary['outstanding_invoices'],
+        'today_income': summary['today_income'],
+        'today_expense': summary['today_expense'],
+        'source_breakdown': summary['source_breakdown'],
         'current_month': current_month,
         'current_year': current_year,
         'has_real_data': any(item['income'] > 0 or item['expense'] > 0 for item in monthly_data),
@@ -386,8 +246,10 @@ def transaction_list(request):
         )
         
         # Apply filters
+        is_filtered = False
         if filter_form.is_valid():
             data = filter_form.cleaned_data
+            is_filtered = any(value not in (None, '') for value in data.values())
             
             if data.get('start_date'):
                 transactions = transactions.filter(transaction_date__gte=data['start_date'])
@@ -419,35 +281,20 @@ def transaction_list(request):
                 is_reconciled = data['is_reconciled'] == 'true'
                 transactions = transactions.filter(is_reconciled=is_reconciled)
         
-        # Order by date
-        transactions = transactions.order_by('-transaction_date', '-created_at')
+        # Summary totals in one query; the unfiltered list is cached per company
+        totals = transaction_totals(transactions, company=None if is_filtered else company)
         
-        # Pagination
-        paginator = Paginator(transactions, 25)
-        page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
-        
-        # Summary totals - calculate on filtered data
-        total_income = transactions.filter(type='income').aggregate(
-            total=Sum('net_amount')
-        )['total'] or 0
-        
-        total_expense = transactions.filter(type='expense').aggregate(
-            total=Sum('net_amount')
-        )['total'] or 0
-        
-        net_total = total_income - total_expense
-        
-        # Get total count for pagination info
-        total_count = transactions.count()
+        # Keyset pagination by date, so deep pages cost the same as the first
+        paginator = KeysetPaginator(transactions, ['-transaction_date', '-created_at', '-id'], per_page=25)
+        page_obj = paginator.get_page(request, total_count=totals['total_count'])
         
         context = {
             'page_obj': page_obj,
             'filter_form': filter_form,
-            'total_income': total_income,
-            'total_expense': total_expense,
-            'net_total': net_total,
-            'total_count': total_count,
+            'total_income': totals['total_income'],
+            'total_expense': totals['total_expense'],
+            'net_total': totals['net_total'],
+            'total_count': totals['total_count'],
         }
         
         return render(request, 'accounting/transactions.html', context)
@@ -504,9 +351,13 @@ def edit_transaction(request, transaction_id):
     if request.method == 'POST':
         form = TransactionForm(request.POST, instance=transaction, user=user)
         if form.is_valid():
-            form.save()
-            messages.success(request, f"Transaction '{transaction.title}' updated successfully.")
-            return redirect('accounting:transaction_list')
+            try:
+                form.save()
+            except ClosedPeriodError as e:
+                messages.error(request, e.messages[0])
+            else:
+                messages.success(request, f"Transaction '{transaction.title}' updated successfully.")
+                return redirect('accounting:transaction_list')
     else:
         form = TransactionForm(instance=transaction, user=user)
     
@@ -533,8 +384,12 @@ def delete_transaction(request, transaction_id):
     
     if request.method == 'POST':
         transaction.is_void = True
-        transaction.save()
-        messages.success(request, f"Transaction '{transaction.title}' has been voided.")
+        try:
+            transaction.save()
+        except ClosedPeriodError as e:
+            messages.error(request, e.messages[0])
+        else:
+            messages.success(request, f"Transaction '{transaction.title}' has been voided.")
         return redirect('accounting:transaction_list')
     
     context = {
@@ -638,6 +493,7 @@ def ledger_summary(request):
 
 
 @login_required
+@background_job('Accounting export')
 def export_accounting_data(request):
     """Export accounting data to CSV/Excel/PDF"""
     user = request.user
@@ -657,110 +513,32 @@ def export_accounting_data(request):
             is_void=False
         ).order_by('-transaction_date')
         
+        headers = [
+            'S/N', 'Date', 'Type', 'Title', 'Amount', 'Currency', 'Tax', 'Discount', 
+            'Net Amount', 'Source', 'Reference', 'Notes', 'Reconciled'
+        ]
+        
         if format_type == 'csv':
-            response = HttpResponse(content_type='text/csv')
-            response['Content-Disposition'] = f'attachment; filename="transactions_{timezone.now().strftime("%Y%m%d")}.csv"'
-            
-            writer = csv.writer(response)
-            writer.writerow([
-                'S/N', 'Date', 'Type', 'Title', 'Amount', 'Currency', 'Tax', 'Discount', 
-                'Net Amount', 'Source', 'Reference', 'Notes', 'Reconciled'
-            ])
+            def rows():
+                for index, transaction in enumerate(iter_transaction_export_rows(transactions), 1):
+                    yield [index] + transaction
             
-            # Use the utility function for currency conversion
-            
-            for index, transaction in enumerate(transactions, 1):
-                currency_display = get_currency_display(transaction.currency)
-                writer.writerow([
-                    index,  # Serial number
-                    transaction.transaction_date,
-                    transaction.get_type_display(),
-                    clean_transaction_text(transaction.title),
-                    transaction.amount,
-                    currency_display,
-                    transaction.tax or 0,
-                    transaction.discount or 0,
-                    transaction.net_amount,
-                    clean_transaction_text(transaction.get_source_app_display()),
-                    clean_transaction_text(transaction.reference_id or ''),
-                    clean_transaction_text(transaction.notes or ''),
-                    'Yes' if transaction.is_reconciled else 'No',
-                ])
-            
-            return response
+            return csv_response(
+                rows(), f'transactions_{timezone.now().strftime("%Y%m%d")}.csv', header=headers
+            )
         
         elif format_type == 'excel':
-            try:
-                import openpyxl
-                from openpyxl.styles import Font, PatternFill, Alignment
-                
-                # Create workbook and worksheet
-                wb = openpyxl.Workbook()
-                ws = wb.active
-                ws.title = "Transactions"
-                
-                # Use the utility function for currency conversion
-                
-                # Define headers
-                headers = [
-                    'S/N', 'Date', 'Type', 'Title', 'Amount', 'Currency', 'Tax', 'Discount', 
-                    'Net Amount', 'Source', 'Reference', 'Notes', 'Reconciled'
-                ]
-                
-                # Style for headers
-                header_font = Font(bold=True, color="FFFFFF")
-                header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-                header_alignment = Alignment(horizontal="center", vertical="center")
-                
-                # Write headers
-                for col, header in enumerate(headers, 1):
-                    cell = ws.cell(row=1, column=col, value=header)
-                    cell.font = header_font
-                    cell.fill = header_fill
-                    cell.alignment = header_alignment
-                
-                # Write data
-                for row, transaction in enumerate(transactions, 2):
-                    currency_display = get_currency_display(transaction.currency)
-                    ws.cell(row=row, column=1, value=row-1)  # Serial number
-                    ws.cell(row=row, column=2, value=transaction.transaction_date)
-                    ws.cell(row=row, column=3, value=transaction.get_type_display())
-                    ws.cell(row=row, column=4, value=clean_transaction_text(transaction.title))
-                    ws.cell(row=row, column=5, value=float(transaction.amount))
-                    ws.cell(row=row, column=6, value=currency_display)
-                    ws.cell(row=row, column=7, value=float(transaction.tax or 0))
-                    ws.cell(row=row, column=8, value=float(transaction.discount or 0))
-                    ws.cell(row=row, column=9, value=float(transaction.net_amount))
-                    ws.cell(row=row, column=10, value=clean_transaction_text(transaction.get_source_app_display()))
-                    ws.cell(row=row, column=11, value=clean_transaction_text(transaction.reference_id or ''))
-                    ws.cell(row=row, column=12, value=clean_transaction_text(transaction.notes or ''))
-                    ws.cell(row=row, column=13, value='Yes' if transaction.is_reconciled else 'No')
-                
-                # Auto-adjust column widths
-                for column in ws.columns:
-                    max_length = 0
-                    column_letter = column[0].column_letter
-                    for cell in column:
-                        try:
-                            if len(str(cell.value)) > max_length:
-                                max_length = len(str(cell.value))
-                        except:
-                            pass
-                    adjusted_width = min(max_length + 2, 50)
-                    ws.column_dimensions[column_letter].width = adjusted_width
-                
-                # Create response
-                response = HttpResponse(
-                    content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-                )
-                response['Content-Disposition'] = f'attachment; filename="transactions_{timezone.now().strftime("%Y%m%d")}.xlsx"'
-                
-                wb.save(response)
-                return response
-                
-            except ImportError:
-                messages.error(request, "Excel export requires openpyxl package. Please install it.")
-                return redirect('accounting:transaction_list')
+            def rows():
+                for index, transaction in enumerate(iter_transaction_export_rows(transactions), 1):
+                    yield [index] + [float(value) if isinstance(value, Decimal) else value for value in transaction]
+            
+            return xlsx_response(
+                rows(),
+                f'transactions_{timezone.now().strftime("%Y%m%d")}.xlsx',
+                title="Transactions",
+                header=headers,
+                widths=[8, 12, 10, 40, 14, 10, 12, 12, 14, 18, 20, 40, 12],
+            )
         
         elif format_type == 'pdf':
             try:
@@ -1231,6 +1009,27 @@ def export_accounting_data(request):
     return redirect('accounting:transaction_list')
 
 
+@login_required
+def receivables_summary(request):
+    """JSON endpoint with outstanding receivables and their aging buckets"""
+    company = getattr(request.user, 'company_profile', None)
+    if not company:
+        return JsonResponse({'success': False, 'error': 'Company profile not found'}, status=400)
+    
+    aging = receivables_aging(company)
+    return JsonResponse({
+        'success': True,
+        'as_of': aging['as_of'].isoformat(),
+        'outstanding_invoices': float(aging['total']),
+        'open_invoice_count': aging['invoice_count'],
+        'aging': [
+            {'key': bucket['key'], 'label': bucket['label'], 'amount': float(bucket['amount'])}
+            for bucket in aging['buckets']
+        ],
+        'currency_symbol': company.currency_symbol,
+    })
+
+
 @login_required
 @require_POST
 @csrf_exempt
@@ -1262,11 +1061,7 @@ def update_ledger_ajax(request):
             ledger.update_outstanding_amounts()
         
         # Get outstanding invoices
-        from apps.invoices.models import Invoice
-        outstanding_invoices = Invoice.objects.filter(
-            user=user,
-            status__in=['unpaid', 'partial']
-        ).aggregate(total=Sum('balance_due'))['total'] or 0
+        outstanding_invoices = outstanding_receivables(company)
         
         # Get today's transactions
         current_date = timezone.now()
@@ -1298,47 +1093,8 @@ def update_ledger_ajax(request):
         
         # Include chart data if requested
         if include_charts:
-            # Monthly data for charts (last 12 months) - improved with real transaction data
-            monthly_data = []
-            for i in range(12):
-                date = current_date - timedelta(days=30*i)
-                
-                # Get or create ledger for this month
-                month_ledger = Ledger.objects.filter(
-                    company=company,
-                    year=date.year,
-                    month=date.month
-                ).first()
-                
-                # If no ledger exists, calculate from actual transactions
-                if not month_ledger:
-                    month_transactions = Transaction.objects.filter(
-                        company=company,
-                        transaction_date__year=date.year,
-                        transaction_date__month=date.month,
-                        is_void=False
-                    )
-                    
-                    month_income = month_transactions.filter(type='income').aggregate(
-                        total=Sum('net_amount')
-                    )['total'] or 0
-                    
-                    month_expense = month_transactions.filter(type='expense').aggregate(
-                        total=Sum('net_amount')
-                    )['total'] or 0
-                    
-                    month_profit = month_income - month_expense
-                else:
-                    month_income = float(month_ledger.total_income)
-                    month_expense = float(month_ledger.total_expense)
-                    month_profit = float(month_ledger.net_profit)
-                
-                monthly_data.append({
-                    'month': date.strftime('%b %Y'),
-                    'income': month_income,
-                    'expense': month_expense,
-                    'profit': month_profit,
-                })
+            # Monthly data for charts (last 12 calendar months)
+            monthly_data = monthly_series(company, current_date.date())
             
             # Source breakdown data
             source_breakdown = Transaction.objects.filter(
@@ -1356,7 +1112,7 @@ def update_ledger_ajax(request):
             ).order_by('-created_at')[:10]
             
             response_data.update({
-                'monthly_data': list(reversed(monthly_data)),
+                'monthly_data': monthly_data,
                 'today_data': {
                     'income': float(today_income),
                     'expense': float(today_expense)
@@ -1399,72 +1155,9 @@ def sync_from_other_apps(request):
         return redirect('core:company_profile')
     
     if request.method == 'POST':
-        # Sync from invoices
-        from apps.invoices.models import Invoice
-        from apps.receipts.models import Receipt
-        
-        # Sync paid invoices
-        paid_invoices = Invoice.objects.filter(
-            user=user,
-            status='paid'
-        )
-        
-        synced_count = 0
-        for invoice in paid_invoices:
-            # Check if transaction already exists
-            existing_transaction = Transaction.objects.filter(
-                company=company,
-                source_app='invoice',
-                reference_id=str(invoice.id)
-            ).first()
-            
-            if not existing_transaction:
-                Transaction.objects.create(
-                    user=user,
-                    company=company,
-                    type='income',
-                    title=f"Invoice Payment - {invoice.invoice_number}",
-                    description=f"Payment for invoice {invoice.invoice_number} from {invoice.client_name}",
-                    amount=invoice.grand_total,
-                    currency=company.currency_symbol,
-                    tax=invoice.total_tax,
-                    discount=invoice.total_discount,
-                    source_app='invoice',
-                    reference_id=str(invoice.id),
-                    reference_model='Invoice',
-                    transaction_date=invoice.updated_at.date(),
-                    notes=f"Auto-synced from invoice {invoice.invoice_number}"
-                )
-                synced_count += 1
-        
-        # Sync from receipts
-        receipts = Receipt.objects.filter(
-            created_by=user
-        )
-        
-        for receipt in receipts:
-            existing_transaction = Transaction.objects.filter(
-                company=company,
-                source_app='receipt',
-                reference_id=str(receipt.id)
-            ).first()
-            
-            if not existing_transaction:
-                Transaction.objects.create(
-                    user=user,
-                    company=company,
-                    type='income',
-                    title=f"Receipt Payment - {receipt.receipt_no}",
-                    description=f"Payment receipt {receipt.receipt_no} from {receipt.client_name}",
-                    amount=receipt.amount_received,
-                    currency=company.currency_symbol,
-                    source_app='receipt',
-                    reference_id=str(receipt.id),
-                    reference_model='Receipt',
-                    transaction_date=receipt.date_received,
-                    notes=f"Auto-synced from receipt {receipt.receipt_no}"
-                )
-                synced_count += 1
+        # Paid invoices, receipts and approved job orders without a transaction
+        results = sync_documents(company=company)
+        synced_count = sum(result.created for result in results)
         
         messages.success(request, f"Successfully synced {synced_count} transactions from other apps.")
         return redirect('accounting:transaction_list')
@@ -1490,11 +1183,7 @@ def generate_report(request):
             report.created_by = user
             
             # Generate report data based on type
-            if report.report_type == 'income_statement':
-                report.report_data = generate_income_statement(company, report.start_date, report.end_date)
-            elif report.report_type == 'balance_sheet':
-                report.report_data = generate_balance_sheet(company, report.end_date)
-            
+            report.report_data = report_statement(report)
             report.save()
             
             messages.success(request, f"Report '{report.title}' generated successfully.")
@@ -1511,7 +1200,18 @@ def generate_report(request):
 
 @login_required
 def export_report_pdf(request, report_id):
-    """Export financial report as PDF"""
+    """Export financial report as PDF, reusing the stored file while its data is unchanged"""
+    return export_report_file(request, report_id, 'pdf')
+
+
+@login_required
+def export_report_excel(request, report_id):
+    """Export financial report as an Excel workbook, reusing the stored file while its data is unchanged"""
+    return export_report_file(request, report_id, 'excel')
+
+
+def export_report_file(request, report_id, kind):
+    """Serve a report's stored PDF/Excel file, rendering it only when its content hash changed"""
     user = request.user
     company = getattr(user, 'company_profile', None)
     
@@ -1522,238 +1222,252 @@ def export_report_pdf(request, report_id):
     report = get_object_or_404(FinancialReport, id=report_id, company=company)
     
     # Calculate fresh report data dynamically (same logic as view_report)
-    original_transactions_count = Transaction.objects.filter(
-        company=company,
-        transaction_date__range=[report.start_date, report.end_date],
-        is_void=False
-    ).count()
+    fresh_report_data, _ = get_fresh_report_data(company, report)
+    digest = artifact_hash(report, fresh_report_data, company, kind)
     
-    # If no transactions in original range, extend the range to include recent transactions
-    if original_transactions_count == 0:
-        latest_transaction = Transaction.objects.filter(
-            company=company,
-            is_void=False
-        ).order_by('-transaction_date').first()
-        
-        if latest_transaction:
-            adjusted_start_date = min(report.start_date, latest_transaction.transaction_date)
-            adjusted_end_date = max(report.end_date, latest_transaction.transaction_date)
-            
-            if report.report_type == 'income_statement':
-                fresh_report_data = generate_income_statement(company, adjusted_start_date, adjusted_end_date)
-            elif report.report_type == 'balance_sheet':
-                fresh_report_data = generate_balance_sheet(company, adjusted_end_date)
-            else:
-                fresh_report_data = report.report_data
-            
-            fresh_report_data['date_adjusted'] = True
-            fresh_report_data['original_period'] = f"{report.start_date} to {report.end_date}"
-            fresh_report_data['adjusted_period'] = f"{adjusted_start_date} to {adjusted_end_date}"
+    response = not_modified(request, digest)
+    if response is not None:
+        return response
+    
+    stored = stored_artifact(report, kind, digest)
+    if stored is not None:
+        try:
+            return artifact_response(stored, kind, digest, report_filename(report, kind))
+        except OSError:
+            # The file is gone from storage; render it again
+            pass
+    
+    return render_report_file(request, report, kind, fresh_report_data, digest)
+
+
+def report_filename(report, kind):
+    extension = 'pdf' if kind == 'pdf' else 'xlsx'
+    return f"{report.title}_{timezone.now().strftime('%Y%m%d')}.{extension}"
+
+
+@background_job('Financial report export')
+def render_report_file(request, report, kind, report_data, digest):
+    """Render a report file, store it under its content hash and serve it"""
+    company = report.company
+    try:
+        if kind == 'pdf':
+            content = build_report_pdf(report, company, report_data)
         else:
-            if report.report_type == 'income_statement':
-                fresh_report_data = generate_income_statement(company, report.start_date, report.end_date)
-            elif report.report_type == 'balance_sheet':
-                fresh_report_data = generate_balance_sheet(company, report.end_date)
-            else:
-                fresh_report_data = report.report_data
-            fresh_report_data['date_adjusted'] = False
-    else:
-        if report.report_type == 'income_statement':
-            fresh_report_data = generate_income_statement(company, report.start_date, report.end_date)
-        elif report.report_type == 'balance_sheet':
-            fresh_report_data = generate_balance_sheet(company, report.end_date)
+            content = build_report_excel(report, company, report_data)
+    except Exception as e:
+        messages.error(request, f"Error generating {'PDF' if kind == 'pdf' else 'Excel file'}: {str(e)}")
+        return redirect('accounting:view_report', report_id=report.id)
+    
+    stored = store_artifact(report, kind, digest, content)
+    return artifact_response(stored, kind, digest, report_filename(report, kind))
+
+
+def build_report_excel(report, company, report_data):
+    """Render a report's data as an Excel workbook and return its bytes"""
+    from io import BytesIO
+    from openpyxl.styles import Font
+    
+    currency_code = get_currency_display(getattr(company, 'currency_symbol', '₦'))
+    period = report_data.get('as_of_date') if report.report_type == 'balance_sheet' else report_data.get('period')
+    
+    stream = XlsxStream(title=report.get_report_type_display()[:31], widths=[32, 20])
+    stream.append([stream.cell(report.title, font=Font(bold=True, size=14))])
+    stream.append([f"{report.get_report_type_display()} - {company.company_name}"])
+    stream.append([f"Period: {period or f'{report.start_date} to {report.end_date}'}"])
+    stream.append([])
+    stream.append_header(['Item', f'Value ({currency_code})'])
+    for key, value in report_data.items():
+        if key in ['date_adjusted', 'original_period', 'adjusted_period', 'debug_info', 'cache_key']:
+            continue
+        label = key.replace('_', ' ').title()
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            stream.append([label, stream.cell(value, number_format='#,##0.00')])
         else:
-            fresh_report_data = report.report_data
-        fresh_report_data['date_adjusted'] = False
+            stream.append([label, str(value)])
     
+    output = BytesIO()
+    stream.workbook.save(output)
+    return output.getvalue()
+
+
+def build_report_pdf(report, company, fresh_report_data):
+    """Render a report's data as a PDF and return its bytes"""
+    from reportlab.lib.pagesizes import letter, A4
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from io import BytesIO
+    import os
+    
+    # Register fonts for better Unicode support
     try:
-        from reportlab.lib.pagesizes import letter, A4
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.units import inch
-        from reportlab.lib import colors
-        from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-        from reportlab.pdfbase import pdfmetrics
-        from reportlab.pdfbase.ttfonts import TTFont
-        from io import BytesIO
-        import os
-        
-        # Create the HttpResponse object with PDF headers
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{report.title}_{timezone.now().strftime("%Y%m%d")}.pdf"'
-        
-        # Register fonts for better Unicode support
-        try:
-            # Try to register a Unicode-compatible font if available
-            font_path = os.path.join(os.path.dirname(__file__), '..', '..', 'static', 'fonts')
-            
-            # Try to find a Unicode-compatible font
-            unicode_fonts = [
-                'DejaVuSans.ttf',
-                'Arial.ttf',
-                'arial.ttf',
-                'LiberationSans-Regular.ttf',
-                'FreeSans.ttf'
+        # Try to register a Unicode-compatible font if available
+        font_path = os.path.join(os.path.dirname(__file__), '..', '..', 'static', 'fonts')
+    
+        # Try to find a Unicode-compatible font
+        unicode_fonts = [
+            'DejaVuSans.ttf',
+            'Arial.ttf',
+            'arial.ttf',
+            'LiberationSans-Regular.ttf',
+            'FreeSans.ttf'
+        ]
+    
+        default_font = 'Helvetica'  # Default fallback
+        font_registered = False
+    
+        for font_file in unicode_fonts:
+            font_path_full = os.path.join(font_path, font_file)
+            if os.path.exists(font_path_full):
+                try:
+                    font_name = font_file.replace('.ttf', '')
+                    pdfmetrics.registerFont(TTFont(font_name, font_path_full))
+                    default_font = font_name
+                    font_registered = True
+                    break
+                except:
+                    continue
+    
+        # If no font found in static directory, try system fonts
+        if not font_registered:
+            # Try to use a system font that supports Unicode
+            system_fonts = [
+                '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+                '/System/Library/Fonts/Arial.ttf',
+                'C:/Windows/Fonts/arial.ttf',
+                'C:/Windows/Fonts/calibri.ttf'
             ]
-            
-            default_font = 'Helvetica'  # Default fallback
-            font_registered = False
-            
-            for font_file in unicode_fonts:
-                font_path_full = os.path.join(font_path, font_file)
-                if os.path.exists(font_path_full):
+    
+            for system_font in system_fonts:
+                if os.path.exists(system_font):
                     try:
-                        font_name = font_file.replace('.ttf', '')
-                        pdfmetrics.registerFont(TTFont(font_name, font_path_full))
+                        font_name = os.path.basename(system_font).replace('.ttf', '')
+                        pdfmetrics.registerFont(TTFont(font_name, system_font))
                         default_font = font_name
                         font_registered = True
                         break
                     except:
                         continue
-            
-            # If no font found in static directory, try system fonts
-            if not font_registered:
-                # Try to use a system font that supports Unicode
-                system_fonts = [
-                    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
-                    '/System/Library/Fonts/Arial.ttf',
-                    'C:/Windows/Fonts/arial.ttf',
-                    'C:/Windows/Fonts/calibri.ttf'
-                ]
-                
-                for system_font in system_fonts:
-                    if os.path.exists(system_font):
-                        try:
-                            font_name = os.path.basename(system_font).replace('.ttf', '')
-                            pdfmetrics.registerFont(TTFont(font_name, system_font))
-                            default_font = font_name
-                            font_registered = True
-                            break
-                        except:
-                            continue
-            
-            # If we registered a custom font, we need to be careful about bold variants
-            # Most TTF fonts don't automatically have bold variants in ReportLab
-            # So we'll use the regular font for everything and rely on font weight
-            if font_registered:
-                # Use the registered font name without bold suffix
-                default_font = default_font
-            else:
-                # Use Helvetica which has built-in bold variants
-                default_font = 'Helvetica'
-                            
-        except Exception as e:
-            print(f"Font registration error: {e}")
-            default_font = 'Helvetica'
-        
-        # Create the PDF object using BytesIO as its "file."
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=30)
-        
-        # Container for the 'Flowable' objects
-        elements = []
-        
-        # Get styles
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=18,
-            spaceAfter=30,
-            alignment=TA_CENTER,
-            textColor=colors.darkblue
-        )
-        
-        subtitle_style = ParagraphStyle(
-            'Subtitle',
-            parent=styles['Heading2'],
-            fontSize=14,
-            spaceAfter=20,
-            alignment=TA_CENTER,
-            textColor=colors.darkgreen
-        )
-        
-        # Add title
-        title = Paragraph(f"{report.title}", title_style)
-        elements.append(title)
-        
-        # Add subtitle
-        subtitle = Paragraph(f"{report.get_report_type_display()} - {company.company_name}", subtitle_style)
-        elements.append(subtitle)
-        
-        # Add report info with currency
-        currency_symbol = getattr(company, 'currency_symbol', '₦')
-        if report.report_type == 'balance_sheet':
-            report_info = Paragraph(f"As of: {fresh_report_data.get('as_of_date', report.end_date)}<br/>Generated on: {timezone.now().strftime('%B %d, %Y at %I:%M %p')}", styles['Normal'])
-        else:
-            report_info = Paragraph(f"Period: {fresh_report_data.get('period', f'{report.start_date} to {report.end_date}')}<br/>Generated on: {timezone.now().strftime('%B %d, %Y at %I:%M %p')}", styles['Normal'])
-        elements.append(report_info)
-        
-        # Add date adjustment notice if applicable
-        if fresh_report_data.get('date_adjusted'):
-            adjustment_notice = Paragraph(f"<b>Note:</b> Date range adjusted to include actual data. Original: {fresh_report_data['original_period']} → Adjusted: {fresh_report_data['adjusted_period']}", styles['Normal'])
-            elements.append(adjustment_notice)
-        
-        elements.append(Spacer(1, 30))
-        
-        # Generate report content based on type with fresh data
-        if report.report_type == 'income_statement':
-            elements.extend(generate_income_statement_pdf_content(fresh_report_data, currency_symbol, default_font))
-        elif report.report_type == 'balance_sheet':
-            elements.extend(generate_balance_sheet_pdf_content(fresh_report_data, currency_symbol, default_font))
+    
+        # If we registered a custom font, we need to be careful about bold variants
+        # Most TTF fonts don't automatically have bold variants in ReportLab
+        # So we'll use the regular font for everything and rely on font weight
+        if font_registered:
+            # Use the registered font name without bold suffix
+            default_font = default_font
         else:
-            # Generic report display
-            elements.append(Paragraph("Report Data:", styles['Heading3']))
-            elements.append(Spacer(1, 10))
-            
-            # Display report data as table
-            if fresh_report_data:
-                # Handle currency symbol for PDF compatibility - try symbol first, fallback to text
-                pdf_currency = get_pdf_currency_symbol(currency_symbol, use_symbol=False)
-                
-                table_data = [['Item', 'Value']]
-                for key, value in fresh_report_data.items():
-                    if key not in ['date_adjusted', 'original_period', 'adjusted_period', 'debug_info']:
-                        if isinstance(value, (int, float)):
-                            table_data.append([key.replace('_', ' ').title(), f"{pdf_currency} {value:,.2f}"])
-                        else:
-                            table_data.append([key.replace('_', ' ').title(), str(value)])
-                
-                # Determine font names based on whether we're using a custom font or built-in Helvetica
-                if default_font == 'Helvetica':
-                    header_font = 'Helvetica-Bold'
-                    bold_font = 'Helvetica-Bold'
-                else:
-                    # For custom fonts, use the regular font name (no bold variant available)
-                    header_font = default_font
-                    bold_font = default_font
-                
-                table = Table(table_data, colWidths=[3*inch, 2*inch])
-                style = TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), header_font),
-                    ('FONTSIZE', (0, 0), (-1, -1), 10),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                    ('ALIGN', (1, 1), (1, -1), 'RIGHT'),
-                ])
-                table.setStyle(style)
-                elements.append(table)
-        
-        # Build PDF
-        doc.build(elements)
-        
-        # Get the value of the BytesIO buffer and write it to the response
-        pdf = buffer.getvalue()
-        buffer.close()
-        response.write(pdf)
-        
-        return response
-        
+            # Use Helvetica which has built-in bold variants
+            default_font = 'Helvetica'
+    
     except Exception as e:
-        messages.error(request, f"Error generating PDF: {str(e)}")
-        return redirect('accounting:view_report', report_id=report.id)
+        print(f"Font registration error: {e}")
+        default_font = 'Helvetica'
+    
+    # Create the PDF object using BytesIO as its "file."
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=30)
+    
+    # Container for the 'Flowable' objects
+    elements = []
+    
+    # Get styles
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        textColor=colors.darkblue
+    )
+    
+    subtitle_style = ParagraphStyle(
+        'Subtitle',
+        parent=styles['Heading2'],
+        fontSize=14,
+        spaceAfter=20,
+        alignment=TA_CENTER,
+        textColor=colors.darkgreen
+    )
+    
+    # Add title
+    title = Paragraph(f"{report.title}", title_style)
+    elements.append(title)
+    
+    # Add subtitle
+    subtitle = Paragraph(f"{report.get_report_type_display()} - {company.company_name}", subtitle_style)
+    elements.append(subtitle)
+    
+    # Add report info with currency
+    currency_symbol = getattr(company, 'currency_symbol', '₦')
+    if report.report_type == 'balance_sheet':
+        report_info = Paragraph(f"As of: {fresh_report_data.get('as_of_date', report.end_date)}<br/>Generated on: {timezone.now().strftime('%B %d, %Y at %I:%M %p')}", styles['Normal'])
+    else:
+        report_info = Paragraph(f"Period: {fresh_report_data.get('period', f'{report.start_date} to {report.end_date}')}<br/>Generated on: {timezone.now().strftime('%B %d, %Y at %I:%M %p')}", styles['Normal'])
+    elements.append(report_info)
+    
+    # Add date adjustment notice if applicable
+    if fresh_report_data.get('date_adjusted'):
+        adjustment_notice = Paragraph(f"<b>Note:</b> Date range adjusted to include actual data. Original: {fresh_report_data['original_period']} → Adjusted: {fresh_report_data['adjusted_period']}", styles['Normal'])
+        elements.append(adjustment_notice)
+    
+    elements.append(Spacer(1, 30))
+    
+    # Generate report content based on type with fresh data
+    if report.report_type == 'income_statement':
+        elements.extend(generate_income_statement_pdf_content(fresh_report_data, currency_symbol, default_font))
+    elif report.report_type == 'balance_sheet':
+        elements.extend(generate_balance_sheet_pdf_content(fresh_report_data, currency_symbol, default_font))
+    else:
+        # Generic report display
+        elements.append(Paragraph("Report Data:", styles['Heading3']))
+        elements.append(Spacer(1, 10))
+    
+        # Display report data as table
+        if fresh_report_data:
+            # Handle currency symbol for PDF compatibility - try symbol first, fallback to text
+            pdf_currency = get_pdf_currency_symbol(currency_symbol, use_symbol=False)
+    
+            table_data = [['Item', 'Value']]
+            for key, value in fresh_report_data.items():
+                if key not in ['date_adjusted', 'original_period', 'adjusted_period', 'debug_info']:
+                    if isinstance(value, (int, float)):
+                        table_data.append([key.replace('_', ' ').title(), f"{pdf_currency} {value:,.2f}"])
+                    else:
+                        table_data.append([key.replace('_', ' ').title(), str(value)])
+    
+            # Determine font names based on whether we're using a custom font or built-in Helvetica
+            if default_font == 'Helvetica':
+                header_font = 'Helvetica-Bold'
+                bold_font = 'Helvetica-Bold'
+            else:
+                # For custom fonts, use the regular font name (no bold variant available)
+                header_font = default_font
+                bold_font = default_font
+    
+            table = Table(table_data, colWidths=[3*inch, 2*inch])
+            style = TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('FONTNAME', (0, 0), (-1, 0), header_font),
+                ('FONTSIZE', (0, 0), (-1, -1), 10),
+                ('GRID', (0, 0), (-1, -1), 1, colors.black),
+                ('ALIGN', (1, 1), (1, -1), 'RIGHT'),
+            ])
+            table.setStyle(style)
+            elements.append(table)
+    
+    # Build PDF
+    doc.build(elements)
+    
+    pdf = buffer.getvalue()
+    buffer.close()
+    return pdf
 
 
 def generate_income_statement_pdf_content(report_data, currency_symbol, default_font='Helvetica'):
@@ -1904,148 +1618,48 @@ def generate_balance_sheet_pdf_content(report_data, currency_symbol, default_fon
 
 def generate_income_statement(company, start_date, end_date):
     """Generate income statement data"""
-    # Get all transactions in the date range
-    transactions = Transaction.objects.filter(
-        company=company,
-        transaction_date__range=[start_date, end_date],
-        is_void=False
-    )
-    
-    # Calculate income (positive amounts)
-    income_transactions = transactions.filter(type='income')
-    income = income_transactions.aggregate(
-        total=Sum('net_amount')
-    )['total'] or 0
-    
-    # Calculate expenses (negative amounts)
-    expense_transactions = transactions.filter(type='expense')
-    expenses = expense_transactions.aggregate(
-        total=Sum('net_amount')
-    )['total'] or 0
-    
-    # Calculate net income
-    net_income = income - expenses
-    
-    # Debug information
-    print(f"DEBUG: Income Statement for {company.company_name}")
-    print(f"DEBUG: Date range: {start_date} to {end_date}")
-    print(f"DEBUG: Total transactions found: {transactions.count()}")
-    print(f"DEBUG: Income transactions: {income_transactions.count()}")
-    print(f"DEBUG: Expense transactions: {expense_transactions.count()}")
-    print(f"DEBUG: Total income: {income}")
-    print(f"DEBUG: Total expenses: {expenses}")
-    print(f"DEBUG: Net income: {net_income}")
-    
-    return {
-        'income': float(income),
-        'expenses': float(expenses),
-        'net_income': float(net_income),
-        'period': f"{start_date} to {end_date}",
-        'debug_info': {
-            'total_transactions': transactions.count(),
-            'income_transactions': income_transactions.count(),
-            'expense_transactions': expense_transactions.count(),
-        }
-    }
+    return income_statement(company, start_date, end_date).as_report_data()
 
 
 def generate_balance_sheet(company, as_of_date):
     """Generate balance sheet data with proper accounting equation"""
-    # Get all transactions up to the as_of_date
-    transactions = Transaction.objects.filter(
+    return balance_sheet(company, as_of_date).as_report_data()
+
+
+def get_fresh_report_data(company, report):
+    """
+    Current statement data of a report, plus the number of transactions in its period.
+
+    When the report period has no transactions it is widened to include
+    the latest transaction, and the data is flagged as date adjusted.
+    """
+    original_transactions_count = Transaction.objects.filter(
         company=company,
-        transaction_date__lte=as_of_date,
+        transaction_date__range=[report.start_date, report.end_date],
         is_void=False
-    )
-    
-    # Calculate total income and expenses
-    total_income = transactions.filter(type='income').aggregate(
-        total=Sum('net_amount')
-    )['total'] or 0
+    ).count()
     
-    total_expenses = transactions.filter(type='expense').aggregate(
-        total=Sum('net_amount')
-    )['total'] or 0
+    start_date, end_date = report.start_date, report.end_date
+    latest_transaction = None
+    if original_transactions_count == 0:
+        latest_transaction = Transaction.objects.filter(
+            company=company,
+            is_void=False
+        ).order_by('-transaction_date').first()
     
-    # Calculate retained earnings (net income)
-    retained_earnings = total_income - total_expenses
+    if latest_transaction:
+        # Extend the date range to include the latest transaction
+        start_date = min(report.start_date, latest_transaction.transaction_date)
+        end_date = max(report.end_date, latest_transaction.transaction_date)
+        fresh_report_data = report_statement(report, start_date, end_date)
+        fresh_report_data['date_adjusted'] = True
+        fresh_report_data['original_period'] = f"{report.start_date} to {report.end_date}"
+        fresh_report_data['adjusted_period'] = f"{start_date} to {end_date}"
+    else:
+        fresh_report_data = report_statement(report)
+        fresh_report_data['date_adjusted'] = False
     
-    # Get outstanding invoices as accounts receivable
-    try:
-        from apps.invoices.models import Invoice
-        accounts_receivable = Invoice.objects.filter(
-            user=company.user,
-            status__in=['unpaid', 'partial']
-        ).aggregate(total=Sum('balance_due'))['total'] or 0
-    except:
-        accounts_receivable = 0
-    
-    # FIXED: Proper balance sheet calculation
-    # Assets = Cash + Accounts Receivable + Other Assets
-    cash = retained_earnings  # Simplified: cash equals retained earnings
-    total_assets = cash + accounts_receivable
-    
-    # Liabilities = Accounts Payable + Other Liabilities
-    # For now, we'll calculate payables from outstanding expenses
-    try:
-        from apps.expenses.models import Expense
-        accounts_payable = Expense.objects.filter(
-            user=company.user,
-            status__in=['pending', 'unpaid']
-        ).aggregate(total=Sum('amount'))['total'] or 0
-    except:
-        accounts_payable = 0
-    
-    total_liabilities = accounts_payable
-    
-    # Equity = Owner's Equity + Retained Earnings
-    # For simplicity, we'll assume owner's equity is the initial investment
-    # and calculate it to balance the equation
-    owner_equity = total_assets - total_liabilities - retained_earnings
-    
-    # If owner's equity is negative, it means we have accumulated losses
-    # In this case, we should adjust retained earnings
-    if owner_equity < 0:
-        retained_earnings = total_assets - total_liabilities
-        owner_equity = 0
-    
-    # Verify the accounting equation: Assets = Liabilities + Equity
-    calculated_equity = total_liabilities + owner_equity + retained_earnings
-    balance_check = abs(total_assets - calculated_equity)
-    
-    # Debug information
-    print(f"DEBUG: Balance Sheet for {company.company_name}")
-    print(f"DEBUG: As of date: {as_of_date}")
-    print(f"DEBUG: Total transactions found: {transactions.count()}")
-    print(f"DEBUG: Total income: {total_income}")
-    print(f"DEBUG: Total expenses: {total_expenses}")
-    print(f"DEBUG: Retained earnings: {retained_earnings}")
-    print(f"DEBUG: Accounts receivable: {accounts_receivable}")
-    print(f"DEBUG: Cash: {cash}")
-    print(f"DEBUG: Total assets: {total_assets}")
-    print(f"DEBUG: Accounts payable: {accounts_payable}")
-    print(f"DEBUG: Total liabilities: {total_liabilities}")
-    print(f"DEBUG: Owner's equity: {owner_equity}")
-    print(f"DEBUG: Balance check (should be 0): {balance_check}")
-    
-    return {
-        'total_assets': float(total_assets),
-        'total_liabilities': float(total_liabilities),
-        'owner_equity': float(owner_equity),
-        'retained_earnings': float(retained_earnings),
-        'accounts_receivable': float(accounts_receivable),
-        'accounts_payable': float(accounts_payable),
-        'cash': float(cash),
-        'as_of_date': as_of_date.strftime('%Y-%m-%d'),
-        'period': f"As of {as_of_date.strftime('%B %d, %Y')}",
-        'balance_check': float(balance_check),
-        'debug_info': {
-            'total_transactions': transactions.count(),
-            'income_transactions': transactions.filter(type='income').count(),
-            'expense_transactions': transactions.filter(type='expense').count(),
-            'accounting_equation_balanced': balance_check < 0.01,  # Allow for small rounding differences
-        }
-    }
+    return fresh_report_data, original_transactions_count
 
 
 @login_required
@@ -2060,64 +1674,11 @@ def view_report(request, report_id):
     
     report = get_object_or_404(FinancialReport, id=report_id, company=company)
     
-    # Check if there are transactions in the original date range
-    original_transactions_count = Transaction.objects.filter(
-        company=company,
-        transaction_date__range=[report.start_date, report.end_date],
-        is_void=False
-    ).count()
-    
-    # If no transactions in original range, extend the range to include recent transactions
-    if original_transactions_count == 0:
-        # Get the most recent transaction date
-        latest_transaction = Transaction.objects.filter(
-            company=company,
-            is_void=False
-        ).order_by('-transaction_date').first()
-        
-        if latest_transaction:
-            # Extend the date range to include the latest transaction
-            adjusted_start_date = min(report.start_date, latest_transaction.transaction_date)
-            adjusted_end_date = max(report.end_date, latest_transaction.transaction_date)
-            
-            # Use adjusted dates for calculation
-            if report.report_type == 'income_statement':
-                fresh_report_data = generate_income_statement(company, adjusted_start_date, adjusted_end_date)
-            elif report.report_type == 'balance_sheet':
-                fresh_report_data = generate_balance_sheet(company, adjusted_end_date)
-            else:
-                fresh_report_data = report.report_data
-            
-            # Add note about date adjustment
-            fresh_report_data['date_adjusted'] = True
-            fresh_report_data['original_period'] = f"{report.start_date} to {report.end_date}"
-            fresh_report_data['adjusted_period'] = f"{adjusted_start_date} to {adjusted_end_date}"
-        else:
-            # No transactions at all, use original data
-            if report.report_type == 'income_statement':
-                fresh_report_data = generate_income_statement(company, report.start_date, report.end_date)
-            elif report.report_type == 'balance_sheet':
-                fresh_report_data = generate_balance_sheet(company, report.end_date)
-            else:
-                fresh_report_data = report.report_data
-            fresh_report_data['date_adjusted'] = False
-    else:
-        # Use original date range
-        if report.report_type == 'income_statement':
-            fresh_report_data = generate_income_statement(company, report.start_date, report.end_date)
-        elif report.report_type == 'balance_sheet':
-            fresh_report_data = generate_balance_sheet(company, report.end_date)
-        else:
-            fresh_report_data = report.report_data
-        fresh_report_data['date_adjusted'] = False
+    fresh_report_data, original_transactions_count = get_fresh_report_data(company, report)
     
     # Debug: Check if there are any transactions
     total_transactions = Transaction.objects.filter(company=company).count()
-    transactions_in_period = Transaction.objects.filter(
-        company=company,
-        transaction_date__range=[report.start_date, report.end_date],
-        is_void=False
-    ).count()
+    transactions_in_period = original_transactions_count
     
     # Debug: Get some sample transactions
     sample_transactions = Transaction.objects.filter(
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import CompanyProfile, BankAccount
+from .models import CompanyProfile, BankAccount, BackgroundJob
 
 
 @admin.register(CompanyProfile)
@@ -118,3 +118,12 @@ CompanyProfileAdmin.inlines = [BankAccountInline]
 admin.site.site_header = "Multi-Purpose App Administration"
 admin.site.site_title = "Multi-Purpose App Admin"
 admin.site.index_title = "Welcome to Multi-Purpose App Administration"
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'user', 'status', 'progress', 'attempts', 'worker', 'created_at', 'finished_at']
+    list_filter = ['status', 'name', 'created_at']
+    search_fields = ['name', 'user__email', 'message']
+    readonly_fields = ['created_at', 'started_at', 'finished_at']
+    exclude = ['upload_data', 'result_data']
@@ -0,0 +1,246 @@
+"""
+Two-tier cache backend shared by every gunicorn worker.
+
+L1 is a small in-process LRU; L2 is another configured cache that all
+processes share (the database cache table by default). Reads go through
+L1, writes and deletes go straight to L2 and update this worker's L1.
+An L1 entry is served as is for L1_TTL seconds after it was read or
+written, then read from L2 again, so a change made by one worker reaches
+every other worker within L1_TTL seconds while hot keys cost at most one
+L2 read per key per interval.
+
+L2 holds the plain values, so every cache operation is a single L2 call
+and the *_many methods stay one batched call (one query for
+get_many/delete_many on the database cache).
+
+Settings::
+
+    'default': {
+        'BACKEND': 'apps.core.cache.TwoTierCache',
+        'OPTIONS': {
+            'SHARED_ALIAS': 'shared',  # the L2 cache
+            'L1_MAX_ENTRIES': 1000,
+            'L1_TTL': 1,
+        },
+    }
+
+Hit and miss counts are kept per process and added to shared counters in
+L2 every STATS_FLUSH_INTERVAL seconds, see cache_stats().
+"""
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+STATS_PREFIX = 'cache-stats:'
+STATS_COUNTERS = ('l1_hits', 'l2_hits', 'misses', 'sets', 'deletes')
+STATS_FLUSH_INTERVAL = 10
+
+_MISSING = object()
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED_ALIAS', 'shared')
+        self._l1_max_entries = int(options.get('L1_MAX_ENTRIES', 1000))
+        self._l1_ttl = float(options.get('L1_TTL', 1))
+        # key -> (value, valid_until), valid_until on the monotonic clock
+        self._l1 = OrderedDict()
+        self._lock = Lock()
+        self._stats = dict.fromkeys(STATS_COUNTERS, 0)
+        self._stats_flushed_at = time.monotonic()
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    # L1 bookkeeping
+
+    def _l1_key(self, key, version):
+        return self.shared.make_and_validate_key(key, version=version)
+
+    def _l1_get(self, l1_key):
+        with self._lock:
+            entry = self._l1.get(l1_key)
+            if entry is None:
+                return _MISSING
+            value, valid_until = entry
+            if valid_until <= time.monotonic():
+                del self._l1[l1_key]
+                return _MISSING
+            self._l1.move_to_end(l1_key)
+            return value
+
+    def _l1_set(self, l1_key, value, timeout=None):
+        lifetime = self._l1_ttl if timeout is None else min(self._l1_ttl, timeout)
+        if lifetime <= 0:
+            self._l1_delete(l1_key)
+            return
+        with self._lock:
+            self._l1[l1_key] = (value, time.monotonic() + lifetime)
+            self._l1.move_to_end(l1_key)
+            while len(self._l1) > self._l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _l1_delete(self, l1_key):
+        with self._lock:
+            self._l1.pop(l1_key, None)
+
+    def _count(self, counter, amount=1):
+        if not amount:
+            return
+        with self._lock:
+            self._stats[counter] += amount
+            due = time.monotonic() - self._stats_flushed_at >= STATS_FLUSH_INTERVAL
+        if due:
+            self.flush_stats()
+
+    def flush_stats(self):
+        """Add this process's counts to the shared counters"""
+        with self._lock:
+            counts = {name: count for name, count in self._stats.items() if count}
+            self._stats = dict.fromkeys(STATS_COUNTERS, 0)
+            self._stats_flushed_at = time.monotonic()
+        for name, count in counts.items():
+            key = STATS_PREFIX + name
+            # Counters are best effort, a lost race only loses a few counts
+            if not self.shared.add(key, count, None):
+                try:
+                    self.shared.incr(key, count)
+                except ValueError:
+                    self.shared.set(key, count, None)
+
+    # Reads
+
+    def get(self, key, default=None, version=None):
+        l1_key = self._l1_key(key, version)
+        value = self._l1_get(l1_key)
+        if value is not _MISSING:
+            self._count('l1_hits')
+            return value
+
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._count('misses')
+            return default
+        self._count('l2_hits')
+        self._l1_set(l1_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        l1_keys = {}
+        for key in keys:
+            l1_key = self._l1_key(key, version)
+            value = self._l1_get(l1_key)
+            if value is _MISSING:
+                l1_keys[key] = l1_key
+            else:
+                found[key] = value
+        self._count('l1_hits', len(found))
+
+        if l1_keys:
+            shared_found = self.shared.get_many(list(l1_keys), version=version)
+            for key, value in shared_found.items():
+                self._l1_set(l1_keys[key], value)
+            found.update(shared_found)
+            self._count('l2_hits', len(shared_found))
+            self._count('misses', len(l1_keys) - len(shared_found))
+        return found
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    # Writes
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        self.shared.set(key, value, timeout, version=version)
+        self._l1_set(self._l1_key(key, version), value, timeout)
+        self._count('sets')
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        l1_key = self._l1_key(key, version)
+        if not self.shared.add(key, value, timeout, version=version):
+            # Whatever another worker stored is read on the next get
+            self._l1_delete(l1_key)
+            return False
+        self._l1_set(l1_key, value, timeout)
+        self._count('sets')
+        return True
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        failed = set(self.shared.set_many(data, timeout, version=version) or [])
+        for key, value in data.items():
+            if key in failed:
+                self._l1_delete(self._l1_key(key, version))
+            else:
+                self._l1_set(self._l1_key(key, version), value, timeout)
+        self._count('sets', len(data) - len(failed))
+        return list(failed)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        if timeout is not None and timeout <= 0:
+            self._l1_delete(self._l1_key(key, version))
+        return self.shared.touch(key, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        """
+        Add `delta` to the value in L2.
+
+        This is only as atomic as the shared backend's incr(): the database
+        cache reads and writes the row separately, so concurrent increments
+        from several workers can be lost there. Do not use it for counters
+        that must be exact.
+        """
+        l1_key = self._l1_key(key, version)
+        try:
+            value = self.shared.incr(key, delta, version=version)
+        except ValueError:
+            self._l1_delete(l1_key)
+            raise
+        self._l1_set(l1_key, value)
+        self._count('sets')
+        return value
+
+    def delete(self, key, version=None):
+        self._l1_delete(self._l1_key(key, version))
+        self._count('deletes')
+        return self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        for key in keys:
+            self._l1_delete(self._l1_key(key, version))
+        self._count('deletes', len(keys))
+        self.shared.delete_many(keys, version=version)
+
+    def clear(self):
+        self.shared.clear()
+        with self._lock:
+            self._l1.clear()
+
+    def _timeout(self, timeout):
+        # Our own TIMEOUT setting, since the shared cache has its own default
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
+
+
+def cache_stats(alias='default'):
+    """Hit and miss counts of every process, for scraping"""
+    backend = caches[alias]
+    if not isinstance(backend, TwoTierCache):
+        return {}
+    backend.flush_stats()
+    counts = backend.shared.get_many([STATS_PREFIX + name for name in STATS_COUNTERS])
+    return {name: counts.get(STATS_PREFIX + name, 0) for name in STATS_COUNTERS}
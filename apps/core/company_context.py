@@ -0,0 +1,98 @@
+"""
+The company context of a request: profile, currency, logo and signature
+URLs and default bank account.
+
+It is built once per user object, which lives for one request, so the
+context processors and the document views share it instead of each
+fetching the profile and bank account and building the media URLs again.
+"""
+from django.core.exceptions import ObjectDoesNotExist
+
+from .models import BankAccount
+from .utils import get_media_url_with_cache_bust
+
+
+DEFAULT_CURRENCY_SYMBOL = '$'
+DEFAULT_CURRENCY_CODE = 'USD'
+
+
+class CompanyContext:
+    def __init__(self, user):
+        self.user = user
+        self._memo = {}
+
+    def _memoized(self, key, compute):
+        # Keyed on what the value depends on, so a profile saved during
+        # the request is picked up
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+
+    @property
+    def company_profile(self):
+        if not self.user.is_authenticated:
+            return None
+        # Django caches the profile, or its absence, on the user
+        try:
+            return self.user.company_profile
+        except ObjectDoesNotExist:
+            return None
+
+    @property
+    def currency_symbol(self):
+        profile = self.company_profile
+        return profile.currency_symbol if profile else DEFAULT_CURRENCY_SYMBOL
+
+    @property
+    def currency_code(self):
+        profile = self.company_profile
+        return profile.currency_code if profile else DEFAULT_CURRENCY_CODE
+
+    def media_url(self, field_name, cache_bust=False):
+        """URL of the profile's logo or signature, or None"""
+        profile = self.company_profile
+        media_field = getattr(profile, field_name, None) if profile else None
+        if not media_field:
+            return None
+        if not cache_bust:
+            return media_field.url
+        return self._memoized(
+            (field_name, media_field.name), lambda: get_media_url_with_cache_bust(media_field)
+        )
+
+    @property
+    def logo_url(self):
+        return self.media_url('logo')
+
+    @property
+    def signature_url(self):
+        return self.media_url('signature')
+
+    @property
+    def default_bank_account(self):
+        """The default bank account, else the first one, else None"""
+        profile = self.company_profile
+        if profile is None:
+            return None
+        return self._memoized(
+            ('bank_account', profile.pk),
+            lambda: BankAccount.objects.filter(company=profile).order_by('-is_default', 'pk').first(),
+        )
+
+    def as_dict(self):
+        """The template variables of get_company_context"""
+        return {
+            'company_profile': self.company_profile,
+            'company_logo': self.media_url('logo', cache_bust=True),
+            'company_signature': self.media_url('signature', cache_bust=True),
+            'currency_symbol': self.currency_symbol,
+            'currency_code': self.currency_code,
+        }
+
+
+def company_context_for(user):
+    """The user's CompanyContext, built on first use"""
+    context = user.__dict__.get('_company_context')
+    if context is None:
+        context = user.__dict__['_company_context'] = CompanyContext(user)
+    return context
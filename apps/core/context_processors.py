@@ -1,3 +1,4 @@
+from .company_context import company_context_for
 from .models import CompanyProfile
 from .utils import get_company_context
 
@@ -12,16 +13,7 @@ def company_context(request):
     Returns:
         dict: Context data for templates
     """
-    if request.user.is_authenticated:
-        return get_company_context(request.user)
-    
-    return {
-        'company_profile': None,
-        'company_logo': None,
-        'company_signature': None,
-        'currency_symbol': '$',
-        'currency_code': 'USD',
-    }
+    return get_company_context(request.user)
 
 
 def app_settings(request):
@@ -238,16 +230,9 @@ def currency_context(request):
     """
     Context processor to make currency information available globally
     """
-    if request.user.is_authenticated:
-        company_context = get_company_context(request.user)
-        return {
-            'user_currency_symbol': company_context['currency_symbol'],
-            'user_currency_code': company_context['currency_code'],
-            'company_profile': company_context['company_profile'],
-        }
-    else:
-        return {
-            'user_currency_symbol': '$',
-            'user_currency_code': 'USD',
-            'company_profile': None,
-        }
+    company_context = company_context_for(request.user)
+    return {
+        'user_currency_symbol': company_context.currency_symbol,
+        'user_currency_code': company_context.currency_code,
+        'company_profile': company_context.company_profile,
+    }
@@ -0,0 +1,126 @@
+"""
+Streaming export helpers shared by the CSV/Excel list exports.
+
+Rows are read with values().iterator(), so querysets are never cached in
+full. CSV files are written through a StreamingHttpResponse and reach the
+client as soon as the first chunk is read; XLSX files use openpyxl's
+write-only mode and are spooled to a temporary file before being streamed.
+Memory use stays flat whatever the row count.
+"""
+import csv
+import tempfile
+
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def export_chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+def iter_values(queryset, *fields, chunk_size=None):
+    """Yield queryset rows as dicts, fetching them from the database in chunks"""
+    return queryset.values(*fields).iterator(chunk_size=chunk_size or export_chunk_size())
+
+
+class Echo:
+    """File-like object whose write() hands the line back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+def csv_response(rows, filename, header=None):
+    """Stream an iterable of rows as a CSV attachment"""
+    def generate():
+        writer = csv.writer(Echo())
+        if header:
+            yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(generate(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+class XlsxStream:
+    """
+    Write-only workbook with a single sheet.
+
+    Rows must be appended top to bottom and column widths set before the
+    first row. Use cell() for styled values and response() to send the file.
+    """
+
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    header_alignment = Alignment(horizontal="center", vertical="center")
+
+    def __init__(self, title='Sheet1', widths=None):
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet(title)
+        self.rows_written = 0
+        if widths:
+            self.set_widths(widths)
+
+    def set_widths(self, widths):
+        for index, width in enumerate(widths, 1):
+            self.sheet.column_dimensions[get_column_letter(index)].width = width
+
+    def cell(self, value, font=None, fill=None, alignment=None, border=None, number_format=None):
+        cell = WriteOnlyCell(self.sheet, value=value)
+        if font is not None:
+            cell.font = font
+        if fill is not None:
+            cell.fill = fill
+        if alignment is not None:
+            cell.alignment = alignment
+        if border is not None:
+            cell.border = border
+        if number_format is not None:
+            cell.number_format = number_format
+        return cell
+
+    def append(self, row):
+        self.sheet.append(row)
+        self.rows_written += 1
+
+    def append_header(self, headers, font=None, fill=None, alignment=None, border=None):
+        self.append([
+            self.cell(
+                header,
+                font=font or self.header_font,
+                fill=fill or self.header_fill,
+                alignment=alignment or self.header_alignment,
+                border=border,
+            )
+            for header in headers
+        ])
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def response(self, filename):
+        """Save the workbook to a temporary file and stream it as an attachment"""
+        output = tempfile.TemporaryFile()
+        self.workbook.save(output)
+        output.seek(0)
+        return FileResponse(
+            output, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE
+        )
+
+
+def xlsx_response(rows, filename, title='Sheet1', header=None, widths=None):
+    """Write an iterable of rows to a write-only XLSX file and stream it"""
+    workbook = XlsxStream(title, widths=widths)
+    if header:
+        workbook.append_header(header)
+    workbook.extend(rows)
+    return workbook.response(filename)
@@ -0,0 +1,264 @@
+"""
+Database-backed background jobs.
+
+Heavy views (imports, exports, report rendering) are decorated with
+@background_job. When a user hits such a view, the request is captured
+into a BackgroundJob row and the user is sent to a status page right
+away. The `run_jobs` management command replays the captured request in
+a separate worker process and stores the resulting file (or redirect)
+on the job, which the user then downloads when it is ready.
+
+Workers leave a heartbeat in the shared cache. Without a live worker
+(e.g. plain `runserver`) the views run inside the request as before,
+so nothing is queued that no one would pick up.
+"""
+import logging
+import os
+import re
+import socket
+import traceback
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.messages.storage.base import BaseStorage
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import JsonResponse
+from django.shortcuts import redirect
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from apps.rbac.middleware import RBACMiddleware
+
+from .models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+WORKER_HEARTBEAT_KEY = 'background_jobs_worker_heartbeat'
+# A worker refreshes its heartbeat between jobs, so a single job running
+# longer than this makes new requests run inline until it finishes
+WORKER_HEARTBEAT_TIMEOUT = 300
+
+
+class JobMessageStorage(BaseStorage):
+    """Message storage that keeps messages in memory for the worker to collect"""
+
+    def _get(self, *args, **kwargs):
+        return [], True
+
+    def _store(self, messages, response, *args, **kwargs):
+        return []
+
+
+def record_worker_heartbeat(worker_name):
+    """Tell the web processes that a worker is polling the queue"""
+    cache.set(WORKER_HEARTBEAT_KEY, worker_name, WORKER_HEARTBEAT_TIMEOUT)
+
+
+def worker_running():
+    return cache.get(WORKER_HEARTBEAT_KEY) is not None
+
+
+def jobs_enabled():
+    return getattr(settings, 'BACKGROUND_JOBS_ENABLED', True) and worker_running()
+
+
+def wants_json(request):
+    return (
+        request.headers.get('x-requested-with') == 'XMLHttpRequest'
+        or 'application/json' in request.headers.get('accept', '')
+    )
+
+
+def background_job(name, methods=('GET',)):
+    """
+    Run the decorated view in the background job worker.
+
+    Requests using one of `methods` are queued and answered immediately with
+    the job status page (or JSON for AJAX callers). The worker calls the same
+    view with the captured request, so the view itself stays unchanged.
+    When no worker is running the view is called directly.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if (
+                not jobs_enabled()
+                or getattr(request, 'background_job', None) is not None
+                or request.method not in methods
+                or not request.user.is_authenticated
+            ):
+                return view_func(request, *args, **kwargs)
+
+            job = enqueue_request(request, name)
+            if wants_json(request):
+                return JsonResponse(job_payload(job), status=202)
+            return redirect('core:job_detail', pk=job.pk)
+        return wrapper
+    return decorator
+
+
+def enqueue_request(request, name):
+    """Capture the current request into a pending BackgroundJob"""
+    post = {key: request.POST.getlist(key) for key in request.POST if key != 'csrfmiddlewaretoken'}
+    request_data = {
+        'method': request.method,
+        'path': request.path,
+        'GET': {key: request.GET.getlist(key) for key in request.GET},
+        'POST': post,
+    }
+
+    upload_data = None
+    if request.FILES:
+        # Only a single uploaded file is carried over to the worker
+        field_name, uploaded = next(iter(request.FILES.items()))
+        request_data['upload'] = {
+            'field': field_name,
+            'name': uploaded.name,
+            'content_type': uploaded.content_type or 'application/octet-stream',
+        }
+        upload_data = uploaded.read()
+
+    return BackgroundJob.objects.create(
+        user=request.user,
+        name=name,
+        request_data=request_data,
+        upload_data=upload_data,
+    )
+
+
+def job_payload(job):
+    """JSON representation used by the status endpoint"""
+    return {
+        'success': job.status != 'failed',
+        'job_id': job.pk,
+        'name': job.name,
+        'status': job.status,
+        'progress': job.progress,
+        'message': job.message,
+        'status_url': reverse('core:job_status', args=[job.pk]),
+        'detail_url': reverse('core:job_detail', args=[job.pk]),
+        'download_url': reverse('core:job_download', args=[job.pk]) if job.has_file else None,
+        'result_url': job.result_url or None,
+    }
+
+
+def claim_next_job(worker_name):
+    """Atomically claim the oldest pending job, or return None"""
+    for job_id in BackgroundJob.objects.filter(status='pending').order_by('created_at').values_list('pk', flat=True)[:10]:
+        claimed = BackgroundJob.objects.filter(pk=job_id, status='pending').update(
+            status='running',
+            worker=worker_name,
+            started_at=timezone.now(),
+        )
+        if claimed:
+            return BackgroundJob.objects.select_related('user').get(pk=job_id)
+    return None
+
+
+def build_request(job):
+    """Rebuild the captured request for the worker"""
+    data = job.request_data
+    factory = RequestFactory()
+    path = data.get('path', '/')
+
+    if data.get('method') == 'POST':
+        post = dict(data.get('POST', {}))
+        upload = data.get('upload')
+        if upload and job.upload_data is not None:
+            post[upload['field']] = SimpleUploadedFile(
+                upload['name'], bytes(job.upload_data), content_type=upload['content_type']
+            )
+        request = factory.post(path, data=post)
+    else:
+        request = factory.get(path, data=data.get('GET', {}))
+
+    request.user = job.user
+    request.background_job = job
+    request.session = {}
+    request._messages = JobMessageStorage(request)
+    return request
+
+
+def call_view(request):
+    match = resolve(request.path)
+    return match.func(request, *match.args, **match.kwargs)
+
+
+def run_job(job):
+    """Replay a claimed job's request and store its outcome"""
+    job.attempts += 1
+    try:
+        request = build_request(job)
+        # The rebuilt request skips the middleware stack: user and messages
+        # are set above, RBACMiddleware adds the company and permission context
+        response = RBACMiddleware(call_view)(request)
+        store_response(job, request, response)
+    except Exception as e:
+        logger.exception('Background job %s failed', job.pk)
+        job.status = 'failed'
+        job.message = str(e) or traceback.format_exc(limit=1)
+
+    job.finished_at = timezone.now()
+    job.upload_data = None
+    job.save()
+    return job
+
+
+def store_response(job, request, response):
+    """Translate the view's response into a job result"""
+    collected = list(request._messages._queued_messages)
+    text = '\n'.join(str(message) for message in collected)
+    has_error = any(message.level >= messages.ERROR for message in collected)
+
+    if getattr(response, 'streaming', False):
+        content = b''.join(response.streaming_content)
+    else:
+        content = response.content
+
+    disposition = response.get('Content-Disposition', '')
+    if response.status_code == 200 and 'attachment' in disposition:
+        match = re.search(r'filename="?([^";]+)"?', disposition)
+        job.result_data = content
+        job.result_name = match.group(1) if match else f'{job.name}.bin'
+        job.result_content_type = response.get('Content-Type', 'application/octet-stream')
+        job.status = 'completed'
+        job.progress = 100
+        job.message = text
+    elif 300 <= response.status_code < 400:
+        job.result_url = response.get('Location', '')
+        job.status = 'failed' if has_error else 'completed'
+        job.progress = 100
+        job.message = text
+    else:
+        job.status = 'failed'
+        job.message = text or 'The job finished without producing a file.'
+
+
+def purge_finished_jobs(days):
+    """Delete finished jobs (and their stored files) older than `days`"""
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = BackgroundJob.objects.filter(
+        status__in=['completed', 'failed'], finished_at__lt=cutoff
+    ).delete()
+    return deleted
+
+
+def requeue_stale_jobs(minutes, max_attempts=3):
+    """Put jobs whose worker died mid-run back in the queue (or fail them)"""
+    cutoff = timezone.now() - timedelta(minutes=minutes)
+    stale = BackgroundJob.objects.filter(status='running', started_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=max_attempts).update(
+        status='failed',
+        message='The job was interrupted too many times.',
+        finished_at=timezone.now(),
+    )
+    requeued = stale.filter(attempts__lt=max_attempts).update(status='pending', worker='')
+    return requeued, failed
+
+
+def default_worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
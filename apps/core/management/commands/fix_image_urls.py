@@ -106,6 +106,24 @@ class Command(BaseCommand):
                     if verbose:
                         self.stdout.write(f"  ✅ Signature exists: {profile.signature.name}")
             
+            # Check the fingerprints that version the logo and signature URLs
+            missing_fingerprints = []
+            for field_name in profile.MEDIA_FIELDS:
+                if getattr(profile, field_name) and not getattr(profile, f'{field_name}_fingerprint'):
+                    missing_fingerprints.append(f'{field_name}_fingerprint')
+                    self.stdout.write(
+                        self.style.WARNING(f"  ❌ Missing {field_name} fingerprint: {profile.company_name}")
+                    )
+                    issues_found += 1
+                    profile_issues += 1
+            
+            if not check_only:
+                # Files copied back into storage above may differ from before
+                updated = profile.update_media_fingerprints(force=profile_issues > 0)
+                issues_fixed += len(set(updated) & set(missing_fingerprints))
+                if updated:
+                    self.stdout.write(f"  ✅ Updated {', '.join(updated)}: {profile.company_name}")
+            
             if profile_issues == 0 and verbose:
                 self.stdout.write(f"  ✅ Company {profile.company_name}: No issues")
         
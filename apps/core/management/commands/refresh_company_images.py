@@ -7,6 +7,13 @@ import os
 class Command(BaseCommand):
     help = 'Refresh company images and clear any cached URLs'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Recompute image fingerprints even where one is already stored',
+        )
+
     def handle(self, *args, **options):
         self.stdout.write("Refreshing company images...")
         
@@ -16,7 +23,12 @@ class Command(BaseCommand):
         
         # Update company profiles to trigger URL regeneration
         updated_count = 0
+        fingerprinted_count = 0
         for company_profile in CompanyProfile.objects.all():
+            # Backfill the fingerprints that version the image URLs
+            if company_profile.update_media_fingerprints(force=options['force']):
+                fingerprinted_count += 1
+
             if company_profile.logo:
                 # Force URL regeneration by accessing the URL
                 try:
@@ -35,4 +47,5 @@ class Command(BaseCommand):
                     self.stdout.write(self.style.WARNING(f"⚠️  Company '{company_profile.company_name}' signature error: {e}"))
         
         self.stdout.write(self.style.SUCCESS(f"✅ Refreshed {updated_count} company images"))
+        self.stdout.write(self.style.SUCCESS(f"✅ Updated image fingerprints of {fingerprinted_count} companies"))
         self.stdout.write("🎉 Company images have been refreshed! They should now display correctly across all apps.")
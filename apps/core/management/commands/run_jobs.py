@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.core.jobs import (
+    claim_next_job, run_job, purge_finished_jobs, requeue_stale_jobs, default_worker_name,
+    record_worker_heartbeat, WORKER_HEARTBEAT_TIMEOUT
+)
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (imports, exports and report generation)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the queue and exit instead of polling')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--max-jobs', type=int, default=0, help='Exit after running this many jobs (0 = no limit)')
+        parser.add_argument('--purge-days', type=int, default=7, help='Delete finished jobs older than this many days')
+        parser.add_argument('--stale-minutes', type=int, default=30, help='Requeue running jobs older than this')
+        parser.add_argument('--name', default='', help='Worker name recorded on claimed jobs')
+
+    def handle(self, *args, **options):
+        worker_name = options['name'] or default_worker_name()
+        self.stdout.write(f"Background job worker {worker_name} started")
+
+        purged = purge_finished_jobs(options['purge_days'])
+        requeued, failed = requeue_stale_jobs(options['stale_minutes'])
+        if purged or requeued or failed:
+            self.stdout.write(f"Purged {purged} old jobs, requeued {requeued}, failed {failed} stale jobs")
+
+        processed = 0
+        heartbeat_at = None
+        while True:
+            close_old_connections()
+            # A draining (--once) worker does not announce itself, it is about to exit
+            if not options['once'] and (
+                heartbeat_at is None or time.monotonic() - heartbeat_at > WORKER_HEARTBEAT_TIMEOUT / 5
+            ):
+                record_worker_heartbeat(worker_name)
+                heartbeat_at = time.monotonic()
+            job = claim_next_job(worker_name)
+
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            started = time.monotonic()
+            job = run_job(job)
+            processed += 1
+            elapsed = time.monotonic() - started
+
+            if job.status == 'completed':
+                self.stdout.write(self.style.SUCCESS(f"✅ Job {job.pk} ({job.name}) completed in {elapsed:.1f}s"))
+            else:
+                self.stdout.write(self.style.ERROR(f"❌ Job {job.pk} ({job.name}) failed: {job.message}"))
+
+            if options['max_jobs'] and processed >= options['max_jobs']:
+                break
+
+        self.stdout.write(f"Processed {processed} jobs")
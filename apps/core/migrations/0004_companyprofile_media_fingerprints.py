@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_backgroundjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="companyprofile",
+            name="logo_fingerprint",
+            field=models.CharField(blank=True, default="", max_length=16),
+        ),
+        migrations.AddField(
+            model_name="companyprofile",
+            name="signature_fingerprint",
+            field=models.CharField(blank=True, default="", max_length=16),
+        ),
+    ]
@@ -7,6 +7,7 @@ from PIL import Image
 from io import BytesIO
 from django.core.files.base import ContentFile
 from django.conf import settings
+from .utils import media_fingerprint
 try:
     from num2words import num2words
 except ImportError:
@@ -43,6 +44,9 @@ class CompanyProfile(models.Model):
     # File uploads
     logo = models.ImageField(upload_to=company_logo_upload_path, blank=True, null=True)
     signature = models.ImageField(upload_to=company_signature_upload_path, blank=True, null=True)
+    # Content hashes of the files, used to version their URLs
+    logo_fingerprint = models.CharField(max_length=16, blank=True, default='')
+    signature_fingerprint = models.CharField(max_length=16, blank=True, default='')
     
     # Financial defaults
     default_tax = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)
@@ -60,6 +64,8 @@ class CompanyProfile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    MEDIA_FIELDS = ('logo', 'signature')
+
     class Meta:
         verbose_name = 'Company Profile'
         verbose_name_plural = 'Company Profiles'
@@ -88,15 +94,40 @@ class CompanyProfile(models.Model):
             # Skip deletion for cloud storage backends
             pass
 
+    def update_media_fingerprints(self, force=False):
+        """Fill in missing (or, with force, all) file fingerprints; returns the fields updated"""
+        updated = {}
+        for field_name in self.MEDIA_FIELDS:
+            fingerprint_field = f'{field_name}_fingerprint'
+            if getattr(self, fingerprint_field) and not force:
+                continue
+            fingerprint = media_fingerprint(getattr(self, field_name))
+            if fingerprint != getattr(self, fingerprint_field):
+                setattr(self, fingerprint_field, fingerprint)
+                updated[fingerprint_field] = fingerprint
+        if updated:
+            # Skip save(), which would redo the logo conversion
+            CompanyProfile.objects.filter(pk=self.pk).update(**updated)
+        return list(updated)
+
     def save(self, *args, **kwargs):
         # Track if a new logo is being uploaded
         new_logo = False
-        if self.pk:
-            old = CompanyProfile.objects.filter(pk=self.pk).first()
-            if old and old.logo != self.logo:
+        old = CompanyProfile.objects.filter(pk=self.pk).first() if self.pk else None
+        if old:
+            if old.logo != self.logo:
                 new_logo = True
         elif self.logo:
             new_logo = True
+
+        # Fingerprint new files while an upload can still be read from memory
+        update_fields = kwargs.get('update_fields')
+        for field_name in self.MEDIA_FIELDS:
+            field_file = getattr(self, field_name)
+            if old is None or getattr(old, field_name) != field_file:
+                setattr(self, f'{field_name}_fingerprint', media_fingerprint(field_file))
+                if update_fields is not None and field_name in update_fields:
+                    kwargs['update_fields'] = update_fields = [*update_fields, f'{field_name}_fingerprint']
         super().save(*args, **kwargs)
         # Auto-convert logo to PNG if needed (only for local storage)
         if self.logo and new_logo:
@@ -116,7 +147,8 @@ class CompanyProfile(models.Model):
                             img.save(png_io, format='PNG')
                             png_name = os.path.splitext(self.logo.name)[0] + '.png'
                             self.logo.save(png_name, ContentFile(png_io.getvalue()), save=False)
-                            super().save(update_fields=['logo'])
+                            self.logo_fingerprint = media_fingerprint(self.logo)
+                            super().save(update_fields=['logo', 'logo_fingerprint'])
                             # Remove the old file if it exists and is not PNG
                             if ext != '.png' and os.path.exists(logo_path):
                                 os.remove(logo_path)
@@ -192,3 +224,64 @@ class BankAccount(models.Model):
         if self.is_default:
             BankAccount.objects.filter(company=self.company, is_default=True).update(is_default=False)
         super().save(*args, **kwargs)
+
+
+class BackgroundJob(models.Model):
+    """Database-backed job queue entry for work moved off the request thread"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='background_jobs')
+    name = models.CharField(max_length=100)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    progress = models.PositiveSmallIntegerField(default=0)
+    message = models.TextField(blank=True)
+
+    # Captured request that the worker replays
+    request_data = models.JSONField(default=dict, blank=True)
+    upload_data = models.BinaryField(null=True, blank=True)
+
+    # Result: either a downloadable file or a page to continue to
+    result_data = models.BinaryField(null=True, blank=True)
+    result_name = models.CharField(max_length=255, blank=True)
+    result_content_type = models.CharField(max_length=100, blank=True)
+    result_url = models.CharField(max_length=500, blank=True)
+
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['user', '-created_at']),
+        ]
+        verbose_name = 'Background Job'
+        verbose_name_plural = 'Background Jobs'
+
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
+
+    @property
+    def has_file(self):
+        return self.status == 'completed' and bool(self.result_name)
+
+    def set_progress(self, progress, message=None):
+        """Record progress (0-100) without touching the rest of the row"""
+        self.progress = max(0, min(100, int(progress)))
+        fields = {'progress': self.progress}
+        if message is not None:
+            self.message = message
+            fields['message'] = message
+        BackgroundJob.objects.filter(pk=self.pk).update(**fields)
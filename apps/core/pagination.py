@@ -0,0 +1,170 @@
+"""
+Keyset (seek) pagination for long list views.
+
+OFFSET pagination makes the database walk past every earlier row, so deep
+pages get slower as a table grows. KeysetPaginator instead remembers the
+ordering values of the last row shown and asks for the rows after it,
+which an index on the ordering columns answers directly.
+
+Usage:
+    paginator = KeysetPaginator(queryset, ['-transaction_date', '-created_at', '-id'], per_page=25)
+    page_obj = paginator.get_page(request, total_count=totals['total_count'])
+
+The ordering must end with a unique, non-null column (usually the primary
+key). Templates can include "partials/keyset_pagination.html".
+"""
+import base64
+import json
+from typing import Any, List, Optional, Sequence
+
+from django.db.models import Q
+
+
+class KeysetPage:
+    """One page of results plus the cursors of its neighbours"""
+
+    def __init__(self, paginator, object_list, start_index, has_previous, has_next, total_count=None):
+        self.paginator = paginator
+        self.object_list = object_list
+        self.has_previous = has_previous
+        self.has_next = has_next
+        self.total_count = total_count
+        self._start_index = start_index
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_previous or self.has_next
+
+    def start_index(self):
+        """1-based position of the first row, as with Django's Page"""
+        return self._start_index if self.object_list else 0
+
+    def end_index(self):
+        return self._start_index + len(self.object_list) - 1 if self.object_list else 0
+
+    @property
+    def next_cursor(self):
+        if not self.has_next:
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1], 'next', self.end_index() + 1)
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous:
+            return None
+        return self.paginator.encode_cursor(self.object_list[0], 'prev', self._start_index - 1)
+
+    def _querystring(self, cursor):
+        params = self.paginator.params.copy()
+        params.pop(self.paginator.cursor_param, None)
+        params.pop('page', None)
+        if cursor is not None:
+            params[self.paginator.cursor_param] = cursor
+        return params.urlencode()
+
+    @property
+    def first_querystring(self):
+        return self._querystring(None)
+
+    @property
+    def last_querystring(self):
+        return self._querystring(self.paginator.LAST)
+
+    @property
+    def next_querystring(self):
+        return self._querystring(self.next_cursor)
+
+    @property
+    def previous_querystring(self):
+        return self._querystring(self.previous_cursor)
+
+
+class KeysetPaginator:
+    """Paginate a queryset by the values of its ordering columns instead of OFFSET"""
+
+    LAST = 'last'
+
+    def __init__(self, queryset, ordering: Sequence[str], per_page: int = 25, cursor_param: str = 'cursor'):
+        self.ordering = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+        self.queryset = queryset.order_by(*ordering)
+        self.per_page = per_page
+        self.cursor_param = cursor_param
+        self.params = None
+
+    def encode_cursor(self, obj, direction: str, position: int) -> str:
+        values = [getattr(obj, name) for name, _ in self.ordering]
+        data = {
+            'd': direction,
+            'p': position,
+            'v': [value.isoformat() if hasattr(value, 'isoformat') else str(value) for value in values],
+        }
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor: str) -> Optional[dict]:
+        """Cursor data with values converted back to Python, or None if the cursor is invalid"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            model = self.queryset.model
+            data['v'] = [
+                model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(self.ordering, data['v'])
+            ]
+            if data['d'] not in ('next', 'prev') or len(data['v']) != len(self.ordering):
+                return None
+            data['p'] = max(1, int(data['p']))
+            return data
+        except Exception:
+            return None
+
+    def _seek(self, values: List[Any], backwards: bool) -> Q:
+        """Rows strictly after (or before) the given ordering values"""
+        condition = Q()
+        for index, (name, descending) in enumerate(self.ordering):
+            lookup = 'lt' if descending != backwards else 'gt'
+            branch = Q(**{f'{name}__{lookup}': values[index]})
+            for previous, (previous_name, _) in enumerate(self.ordering[:index]):
+                branch &= Q(**{previous_name: values[previous]})
+            condition |= branch
+        return condition
+
+    def _reversed(self):
+        return [f'{"" if descending else "-"}{name}' for name, descending in self.ordering]
+
+    def get_page(self, request, total_count: Optional[int] = None) -> KeysetPage:
+        """
+        Page selected by the request's cursor parameter.
+
+        `total_count` is only needed for the "last page" link and the
+        row numbers shown on it.
+        """
+        self.params = request.GET.copy()
+        cursor = request.GET.get(self.cursor_param)
+        size = self.per_page
+
+        if cursor == self.LAST and total_count is not None:
+            rows = list(self.queryset.order_by(*self._reversed())[:size])
+            rows.reverse()
+            start = max(1, total_count - len(rows) + 1)
+            return KeysetPage(self, rows, start, start > 1, False, total_count)
+
+        data = self.decode_cursor(cursor) if cursor else None
+        if data is None:
+            rows = list(self.queryset[:size + 1])
+            return KeysetPage(self, rows[:size], 1, False, len(rows) > size, total_count)
+
+        if data['d'] == 'next':
+            rows = list(self.queryset.filter(self._seek(data['v'], backwards=False))[:size + 1])
+            return KeysetPage(self, rows[:size], data['p'], True, len(rows) > size, total_count)
+
+        rows = list(self.queryset.filter(self._seek(data['v'], backwards=True)).order_by(*self._reversed())[:size + 1])
+        has_previous = len(rows) > size
+        rows = rows[:size]
+        rows.reverse()
+        start = max(1, data['p'] - len(rows) + 1)
+        return KeysetPage(self, rows, start, has_previous, True, total_count)
@@ -1,13 +1,23 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, RequestFactory, override_settings
 from apps.accounts.models import User
 from django.urls import reverse
+from django.http import HttpResponse
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.exceptions import ValidationError
+import hashlib
+from unittest import mock
+from django.core.cache import cache
 import json
 
-from .models import CompanyProfile, BankAccount
+from .models import CompanyProfile, BankAccount, BackgroundJob
+from .cache import TwoTierCache, cache_stats
+from .company_context import company_context_for
+from .context_processors import company_context, currency_context
+from .jobs import build_request, claim_next_job, record_worker_heartbeat, run_job
 from .forms import CompanyProfileForm, BankAccountForm
-from .utils import generate_auto_number, get_currency_info, format_currency
+from .utils import (
+    generate_auto_number, get_currency_info, format_currency, get_media_url_with_cache_bust, media_fingerprint
+)
 
 
 class CompanyProfileModelTest(TestCase):
@@ -374,3 +384,219 @@ class APITest(TestCase):
         # Check if profile was updated
         self.company_profile.refresh_from_db()
         self.assertEqual(self.company_profile.currency_code, 'EUR')
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class BackgroundJobTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(
+            email='jobs@example.com',
+            password='testpass123'
+        )
+        CompanyProfile.objects.create(
+            user=self.user,
+            company_name='Test Company',
+            email='company@test.com',
+            phone='+1234567890',
+            address='123 Test Street'
+        )
+        self.client.login(email='jobs@example.com', password='testpass123')
+        record_worker_heartbeat('test-worker')
+
+    def test_runs_inline_without_worker(self):
+        """Test nothing is queued while no worker is running"""
+        cache.delete('background_jobs_worker_heartbeat')
+        response = self.client.get(
+            reverse('accounting:export_data'), {'type': 'transactions', 'format': 'csv'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment', response['Content-Disposition'])
+        self.assertFalse(BackgroundJob.objects.exists())
+
+    def test_replayed_request_has_company_context(self):
+        """Test the worker gives the view the context the middleware would add"""
+        seen = {}
+
+        def view(request):
+            seen['company'] = request.user_company
+            seen['can_view'] = request.user.has_rbac_permission('accounting.view_transaction')
+            response = HttpResponse(b'data', content_type='text/csv')
+            response['Content-Disposition'] = 'attachment; filename="data.csv"'
+            return response
+
+        BackgroundJob.objects.create(
+            user=self.user, name='Export', request_data={'method': 'GET', 'path': '/accounting/export/'}
+        )
+        with mock.patch('apps.core.jobs.call_view', view):
+            job = run_job(claim_next_job('test-worker'))
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(seen['company'], self.user.company_profile)
+        self.assertFalse(seen['can_view'])
+
+    def test_export_is_queued_and_downloadable(self):
+        """Test a heavy export is queued, run by the worker and then downloaded"""
+        response = self.client.get(
+            reverse('accounting:export_data'), {'type': 'transactions', 'format': 'csv'}
+        )
+        job = BackgroundJob.objects.get(user=self.user)
+        self.assertRedirects(response, reverse('core:job_detail', args=[job.pk]), fetch_redirect_response=False)
+        self.assertEqual(job.status, 'pending')
+
+        detail = self.client.get(reverse('core:job_detail', args=[job.pk]))
+        self.assertContains(detail, 'Accounting export')
+
+        status = self.client.get(reverse('core:job_status', args=[job.pk])).json()
+        self.assertIsNone(status['download_url'])
+
+        job = run_job(claim_next_job('test-worker'))
+        self.assertEqual(job.status, 'completed')
+        self.assertTrue(job.result_name.endswith('.csv'))
+
+        download = self.client.get(reverse('core:job_download', args=[job.pk]))
+        self.assertEqual(download.status_code, 200)
+        self.assertIn(b'S/N', download.content)
+
+    def test_jobs_are_private(self):
+        """Test users cannot see other users' jobs"""
+        other = User.objects.create_user(email='other@example.com', password='testpass123')
+        job = BackgroundJob.objects.create(user=other, name='Other export')
+        response = self.client.get(reverse('core:job_status', args=[job.pk]))
+        self.assertEqual(response.status_code, 404)
+
+
+class CompanyContextTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='context@example.com',
+            password='testpass123'
+        )
+        self.company = CompanyProfile.objects.create(
+            user=self.user,
+            company_name='Test Company',
+            email='company@test.com',
+            phone='+1234567890',
+            address='123 Test Street',
+            currency_code='NGN',
+            currency_symbol='₦'
+        )
+
+    def test_context_processors_share_one_lookup(self):
+        """Test the company profile is fetched once per request"""
+        request = RequestFactory().get('/')
+        request.user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            context = company_context(request)
+            currency = currency_context(request)
+        self.assertEqual(context['company_profile'], self.company)
+        self.assertEqual(context['currency_symbol'], '₦')
+        self.assertEqual(currency['user_currency_code'], 'NGN')
+
+    def test_default_bank_account(self):
+        """Test the default bank account falls back to the first one"""
+        first = BankAccount.objects.create(
+            company=self.company, bank_name='First Bank', account_name='Test', account_number='001'
+        )
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(company_context_for(user).default_bank_account, first)
+
+        default = BankAccount.objects.create(
+            company=self.company, bank_name='Second Bank', account_name='Test',
+            account_number='002', is_default=True
+        )
+        context = company_context_for(User.objects.get(pk=self.user.pk))
+        self.assertEqual(context.default_bank_account, default)
+        with self.assertNumQueries(0):
+            self.assertEqual(context.default_bank_account, default)
+
+
+class TwoTierCacheTest(TestCase):
+    def make_worker(self, l1_ttl=0):
+        return TwoTierCache('', {'OPTIONS': {'SHARED_ALIAS': 'shared', 'L1_TTL': l1_ttl}})
+
+    def test_invalidation_reaches_other_workers(self):
+        """Test a set or delete in one worker is seen by another"""
+        first, second = self.make_worker(), self.make_worker()
+        first.set('inventory_list_cache', ['a'])
+        self.assertEqual(second.get('inventory_list_cache'), ['a'])
+
+        first.set('inventory_list_cache', ['b'])
+        self.assertEqual(second.get('inventory_list_cache'), ['b'])
+
+        first.delete('inventory_list_cache')
+        self.assertIsNone(second.get('inventory_list_cache'))
+        self.assertTrue(second.add('inventory_list_cache', ['c']))
+        self.assertFalse(first.add('inventory_list_cache', ['d']))
+        self.assertEqual(first.get('inventory_list_cache'), ['c'])
+
+    def test_hot_keys_are_served_from_memory(self):
+        """Test repeated reads within the L1 interval skip the shared cache"""
+        worker = self.make_worker(l1_ttl=60)
+        worker.set('company_profile_1', {'name': 'Test'})
+        with self.assertNumQueries(0):
+            self.assertEqual(worker.get('company_profile_1'), {'name': 'Test'})
+
+    def test_many_operations_are_batched(self):
+        """Test get_many and delete_many cost one shared query whatever the number of keys"""
+        first, second = self.make_worker(), self.make_worker()
+        first.set_many({f'inventory_item_{i}': i for i in range(20)})
+        with self.assertNumQueries(1):
+            self.assertEqual(len(second.get_many([f'inventory_item_{i}' for i in range(25)])), 20)
+        with self.assertNumQueries(1):
+            first.delete_many([f'inventory_item_{i}' for i in range(20)])
+        self.assertEqual(second.get_many(['inventory_item_1']), {})
+
+    def test_incr_updates_the_shared_value(self):
+        """Test increments are applied to the shared value, not a stale local copy"""
+        first, second = self.make_worker(l1_ttl=60), self.make_worker(l1_ttl=60)
+        first.set('counter', 1)
+        self.assertEqual(second.incr('counter'), 2)
+        self.assertEqual(first.incr('counter', 5), 7)
+        with self.assertRaises(ValueError):
+            first.incr('missing')
+
+    def test_stats_are_counted(self):
+        """Test hits and misses are added to the shared counters"""
+        worker = self.make_worker(l1_ttl=60)
+        worker.get('missing')
+        worker.set('present', 1)
+        worker.get('present')
+        worker.flush_stats()
+        stats = cache_stats()
+        self.assertGreaterEqual(stats['misses'], 1)
+        self.assertGreaterEqual(stats['l1_hits'], 1)
+        self.assertGreaterEqual(stats['sets'], 1)
+
+
+class MediaFingerprintTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='media@example.com',
+            password='testpass123'
+        )
+        self.profile = CompanyProfile(
+            user=self.user,
+            company_name='Test Company',
+            email='company@test.com',
+            phone='+1234567890',
+            address='123 Test Street'
+        )
+
+    def test_upload_fingerprint(self):
+        """Test a new upload is hashed without consuming it"""
+        content = b'logo image bytes'
+        self.profile.logo = SimpleUploadedFile('logo.png', content, content_type='image/png')
+        fingerprint = media_fingerprint(self.profile.logo)
+        self.assertEqual(fingerprint, hashlib.sha256(content).hexdigest()[:16])
+        self.assertEqual(self.profile.logo.file.read(), content)
+
+    def test_url_is_stable(self):
+        """Test the media URL only changes with the fingerprint"""
+        self.profile.logo.name = 'company/logos/1/logo.png'
+        self.profile.logo_fingerprint = 'abc123'
+        url = get_media_url_with_cache_bust(self.profile.logo)
+        self.assertTrue(url.endswith('v=abc123'))
+        self.assertEqual(get_media_url_with_cache_bust(self.profile.logo), url)
+
+        self.profile.logo_fingerprint = 'def456'
+        self.assertTrue(get_media_url_with_cache_bust(self.profile.logo).endswith('v=def456'))
@@ -13,4 +13,8 @@ urlpatterns = [
     path('bank-accounts/<int:pk>/set-default/', views.set_default_bank_account, name='set_default_bank_account'),
     path('update-currency/', views.update_currency, name='update_currency'),
     path('clear-company-image/', views.clear_company_image, name='clear_company_image'),
+    path('jobs/<int:pk>/', views.job_detail, name='job_detail'),
+    path('jobs/<int:pk>/status/', views.job_status, name='job_status'),
+    path('jobs/<int:pk>/download/', views.job_download, name='job_download'),
+    path('cache-stats/', views.cache_stats_view, name='cache_stats'),
 ]
@@ -1,3 +1,4 @@
+import hashlib
 import re
 from datetime import datetime
 from django.db import models
@@ -238,23 +239,8 @@ def get_company_context(user):
     Returns:
         dict: Company context data
     """
-    try:
-        company_profile = user.company_profile
-        return {
-            'company_profile': company_profile,
-            'company_logo': get_media_url_with_cache_bust(company_profile.logo),
-            'company_signature': get_media_url_with_cache_bust(company_profile.signature),
-            'currency_symbol': company_profile.currency_symbol,
-            'currency_code': company_profile.currency_code,
-        }
-    except Exception:
-        return {
-            'company_profile': None,
-            'company_logo': None,
-            'company_signature': None,
-            'currency_symbol': '$',
-            'currency_code': 'USD',
-        }
+    from .company_context import company_context_for
+    return company_context_for(user).as_dict()
 
 def get_safe_media_url(media_field):
     """Safely get media URL, return None if file doesn't exist"""
@@ -274,21 +260,47 @@ def get_safe_media_url(media_field):
         return None
 
 
+def media_fingerprint(media_field):
+    """
+    Short content hash of an uploaded or stored file, '' if it can't be read
+
+    Computed once when the file is saved and kept next to the file name,
+    so media URLs only change when the file does.
+    """
+    if not media_field:
+        return ''
+    
+    digest = hashlib.sha256()
+    try:
+        if not media_field._committed:
+            # A new upload, hash it before the storage consumes it
+            for chunk in media_field.file.chunks():
+                digest.update(chunk)
+            media_field.file.seek(0)
+        else:
+            with media_field.storage.open(media_field.name, 'rb') as stored:
+                for chunk in stored.chunks():
+                    digest.update(chunk)
+    except Exception:
+        return ''
+    return digest.hexdigest()[:16]
+
+
 def get_media_url_with_cache_bust(media_field):
-    """Get media URL with cache-busting parameter to ensure updates are visible"""
+    """Get media URL versioned by the file's fingerprint so updates are visible"""
     if not media_field:
         return None
     
     try:
         if hasattr(media_field, 'name') and media_field.name:
             base_url = media_field.url
-            # Add cache-busting parameter using file modification time or current timestamp
-            if hasattr(media_field, 'modified_time'):
+            # Fingerprint stored next to the file, e.g. CompanyProfile.logo_fingerprint
+            cache_bust = getattr(media_field.instance, f'{media_field.field.name}_fingerprint', '')
+            if not cache_bust and hasattr(media_field, 'modified_time'):
                 cache_bust = int(media_field.modified_time.timestamp())
-            else:
-                # Use current timestamp as fallback
-                import time
-                cache_bust = int(time.time())
+            if not cache_bust:
+                # Without a fingerprint the plain URL is the most stable one
+                return base_url
             
             # Add cache-busting parameter
             separator = '&' if '?' in base_url else '?'
@@ -1,12 +1,15 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse, Http404
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
+from django.views.static import serve
 import json
 
-from .models import CompanyProfile, BankAccount
+from .models import CompanyProfile, BankAccount, BackgroundJob
+from .cache import cache_stats
+from .jobs import job_payload
 from .forms import CompanyProfileForm, BankAccountForm
 from .utils import get_currency_info
 # Removed RBAC decorators - using simple login_required instead
@@ -370,3 +373,55 @@ def update_currency(request):
         print(f"Currency update error: {str(e)}")
         print(f"Traceback: {traceback.format_exc()}")
         return JsonResponse({'success': False, 'error': f'Failed to update currency: {str(e)}'})
+
+
+@login_required
+def job_detail(request, pk):
+    """Status page for a background job; polls until the result is ready"""
+    job = get_object_or_404(
+        BackgroundJob.objects.defer('result_data', 'upload_data'), pk=pk, user=request.user
+    )
+    context = {
+        'job': job,
+        'job_json': json.dumps(job_payload(job)),
+    }
+    return render(request, 'core/job_detail.html', context)
+
+
+@login_required
+def job_status(request, pk):
+    """JSON status of a background job"""
+    job = get_object_or_404(
+        BackgroundJob.objects.defer('result_data', 'upload_data'), pk=pk, user=request.user
+    )
+    return JsonResponse(job_payload(job))
+
+
+@login_required
+def job_download(request, pk):
+    """Download the file produced by a finished background job"""
+    job = get_object_or_404(BackgroundJob, pk=pk, user=request.user)
+    if not job.has_file:
+        if job.is_finished:
+            raise Http404('This job did not produce a file.')
+        return JsonResponse(job_payload(job), status=409)
+
+    response = HttpResponse(bytes(job.result_data), content_type=job.result_content_type)
+    response['Content-Disposition'] = f'attachment; filename="{job.result_name}"'
+    return response
+
+
+@login_required
+def cache_stats_view(request):
+    """Cache hit and miss counts of all workers, for monitoring"""
+    if not request.user.is_superuser:
+        raise Http404
+    return JsonResponse(cache_stats())
+
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    """Serve a media file; fingerprinted URLs never change, so they are cached for good"""
+    response = serve(request, path, document_root=document_root, show_indexes=show_indexes)
+    if request.GET.get('v'):
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
@@ -303,22 +303,37 @@ class InventoryItemForm(forms.ModelForm):
                 dynamic_data[layout_field] = value
         
         # Set the dynamic data
+        old_data = instance.data or {}
         instance.data = dynamic_data
         
         if commit:
-            # Save the instance
-            instance.save()
-            
-            # Calculate totals if the model supports it
-            if hasattr(instance, 'calculate_totals'):
-                instance.calculate_totals()
-            
-            # Trigger updates across all documents and templates
-            if hasattr(instance, 'update_all_documents'):
-                instance.update_all_documents()
+            # Save the item, its totals and status, the related documents and
+            # the log together, in one transaction
+            from .managers import InventoryItemUpdate
+            update = InventoryItemUpdate(instance, user=self.user)
+            if instance._state.adding:
+                update.add_log('create', f'Created item: {instance.product_name}')
+            else:
+                changes = self._describe_changes(old_data, dynamic_data)
+                if changes:
+                    update.add_log('update', f'Updated: {", ".join(changes)}')
+            update.commit()
+            self._save_m2m()
         
         return instance
 
+    def _describe_changes(self, old_data, new_data):
+        """Human readable list of the changed product name and data values"""
+        changes = []
+        old_name = self.initial.get('product_name')
+        if old_name != self.instance.product_name:
+            changes.append(f'Product name: {old_name} → {self.instance.product_name}')
+        for key, new_value in new_data.items():
+            old_value = old_data.get(key)
+            if old_value != new_value:
+                changes.append(f'{key}: {old_value} → {new_value}')
+        return changes
+
 
 class InventoryCustomFieldForm(forms.ModelForm):
     """Form for creating and editing custom fields"""
@@ -0,0 +1,224 @@
+import ast
+import math
+import re
+from dataclasses import dataclass
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+PLACEHOLDER_RE = re.compile(r'\{([^{}]+)\}')
+
+CURRENCY_RE = re.compile(r'[₦$€£¥₹₿₤₩₪₫₭₮₯₰₱₲₳₴₵₶₷₸₹₺₻₼₽₾₿]')
+UNIT_WORDS_RE = re.compile(r'\b(each|pcs|pieces|units|items|nos|qty|quantity)\b', re.IGNORECASE)
+PRICE_WORDS_RE = re.compile(r'\b(price|cost|amount|value|total)\b', re.IGNORECASE)
+PARENTHESES_RE = re.compile(r'\([^)]*\)')
+NON_NUMERIC_RE = re.compile(r'[^\d.-]')
+
+ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant, ast.Name, ast.Load,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Pow, ast.UAdd, ast.USub,
+)
+
+# Compiled rules per (layout id, layout updated_at)
+_layout_rules_cache: Dict[Tuple[int, Any], List['CompiledRule']] = {}
+LAYOUT_RULES_CACHE_SIZE = 1024
+
+
+class FormulaError(ValueError):
+    """Raised when a calculation formula uses anything but basic arithmetic"""
+
+
+def parse_number(value) -> Optional[float]:
+    """Extract numeric value from mixed input with enhanced sanitization"""
+    if value is None or value == '':
+        return None
+
+    if isinstance(value, (int, float, Decimal)):
+        return float(value)
+
+    return _parse_number_text(str(value))
+
+
+@lru_cache(maxsize=4096)
+def _parse_number_text(value: str) -> Optional[float]:
+    value_str = value.strip()
+
+    # Remove currency symbols, unit/price words and parenthesised notes
+    value_str = CURRENCY_RE.sub('', value_str)
+    value_str = UNIT_WORDS_RE.sub('', value_str)
+    value_str = PRICE_WORDS_RE.sub('', value_str)
+    value_str = PARENTHESES_RE.sub('', value_str)
+
+    # Keep only numbers, decimals, and minus signs
+    value_str = NON_NUMERIC_RE.sub('', value_str)
+
+    # Handle multiple decimal points (keep only the first one)
+    parts = value_str.split('.')
+    if len(parts) > 2:
+        value_str = parts[0] + '.' + ''.join(parts[1:])
+
+    try:
+        result = float(value_str) if value_str else None
+        # Validate reasonable range
+        if result is not None and (result < -999999999 or result > 999999999):
+            return None
+        return result
+    except ValueError:
+        return None
+
+
+class CompiledFormula:
+    """
+    A calculation formula such as "{quantity} * {unit_price} * 1.075".
+
+    The formula is parsed once, checked to contain only numbers, field
+    placeholders and arithmetic operators, and compiled to bytecode. The
+    same code evaluates plain floats or whole NumPy arrays/pandas Series.
+
+    Numbers are evaluated as floats, so an oversized power such as
+    9 ** 9 ** 9 raises OverflowError instead of building a huge integer.
+    """
+
+    def __init__(self, formula: str):
+        self.formula = formula
+        self.fields: List[str] = []
+
+        def placeholder(match):
+            name = match.group(1)
+            if name not in self.fields:
+                self.fields.append(name)
+            return f'_f{self.fields.index(name)}'
+
+        expression = PLACEHOLDER_RE.sub(placeholder, formula).strip()
+        if not expression:
+            raise FormulaError('Formula is empty')
+        try:
+            tree = ast.parse(expression, mode='eval')
+        except SyntaxError as e:
+            raise FormulaError(f'Invalid formula: {formula}') from e
+
+        names = {f'_f{index}' for index in range(len(self.fields))}
+        for node in ast.walk(tree):
+            if not isinstance(node, ALLOWED_NODES):
+                raise FormulaError(f'Unsupported expression in formula: {formula}')
+            if isinstance(node, ast.Name) and node.id not in names:
+                raise FormulaError(f'Unknown name in formula: {formula}')
+            if isinstance(node, ast.Constant) and (
+                isinstance(node.value, bool) or not isinstance(node.value, (int, float))
+            ):
+                raise FormulaError(f'Only numbers are allowed in formula: {formula}')
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Constant):
+                node.value = float(node.value)
+        self.code = compile(tree, '<formula>', 'eval')
+
+    def evaluate(self, values: Dict[str, Any]):
+        """Evaluate with field values given by field name (floats or arrays)"""
+        variables = {
+            f'_f{index}': float(values[name]) if isinstance(values[name], int) else values[name]
+            for index, name in enumerate(self.fields)
+        }
+        return eval(self.code, {'__builtins__': {}}, variables)
+
+
+@dataclass
+class CompiledRule:
+    output_field: str
+    input_fields: List[str]
+    formula: CompiledFormula
+
+    def evaluate(self, values: Dict[str, Any]) -> Optional[float]:
+        """Evaluate the rule for one item, returning None on any arithmetic error"""
+        try:
+            result = float(self.formula.evaluate(values))
+        except (ArithmeticError, TypeError, ValueError):
+            return None
+        return result if math.isfinite(result) else None
+
+
+def compile_rules(rules: Iterable[Dict]) -> List[CompiledRule]:
+    """Compile the enabled rules, skipping any whose formula is invalid"""
+    compiled = []
+    for rule in rules:
+        if not rule.get('enabled', False) or not rule.get('formula') or not rule.get('output_field'):
+            continue
+        try:
+            formula = CompiledFormula(rule['formula'])
+        except FormulaError:
+            continue
+        input_fields = list(rule.get('input_fields', []))
+        # Placeholders that are not declared inputs are never substituted
+        if any(name not in input_fields for name in formula.fields):
+            continue
+        compiled.append(CompiledRule(rule['output_field'], input_fields, formula))
+    return compiled
+
+
+def get_layout_rules(layout) -> List[CompiledRule]:
+    """Compiled calculation rules of a layout, cached by layout id and updated_at"""
+    rules = layout.calculation_rules.get('rules', []) if isinstance(layout.calculation_rules, dict) else []
+    if layout.pk is None:
+        return compile_rules(rules)
+
+    key = (layout.pk, layout.updated_at)
+    compiled = _layout_rules_cache.get(key)
+    if compiled is None:
+        if len(_layout_rules_cache) >= LAYOUT_RULES_CACHE_SIZE:
+            _layout_rules_cache.clear()
+        compiled = _layout_rules_cache[key] = compile_rules(rules)
+    return compiled
+
+
+def compute_totals_bulk(items, layout) -> List[Dict[str, Any]]:
+    """
+    Calculate totals for many items of one layout at once.
+
+    Returns one calculated_data dict per item, in order, identical to
+    what InventoryItem.compute_totals() produces for each item.
+    """
+    items = list(items)
+    if not items:
+        return []
+    if not layout.supports_calculations():
+        return [{} for _ in items]
+
+    rules = get_layout_rules(layout)
+    fields = {name for rule in rules for name in rule.input_fields}
+
+    def column(values):
+        return pd.Series([parse_number(value) for value in values], dtype='float64')
+
+    quantity = column(item.get_value('quantity') or item.get_value('Quantity') for item in items)
+    unit_price = column(item.get_value('unit_price') or item.get_value('Unit Price') for item in items)
+    frame = pd.DataFrame({
+        name: column(item.get_value(name) for item in items).fillna(0) for name in fields
+    })
+
+    totals = quantity * unit_price
+    rule_results = []
+    with np.errstate(all='ignore'):
+        for rule in rules:
+            try:
+                values = rule.formula.evaluate({name: frame[name].to_numpy() for name in rule.formula.fields})
+            except (ArithmeticError, TypeError, ValueError):
+                continue
+            values = np.broadcast_to(np.asarray(values, dtype='float64'), len(items))
+            rule_results.append((rule.output_field, values))
+
+    calculated = []
+    for index in range(len(items)):
+        data = {}
+        total = totals.iat[index]
+        if not pd.isna(total):
+            data['total'] = float(total)
+            data['Total'] = float(total)
+        for output_field, values in rule_results:
+            if np.isfinite(values[index]):
+                data[output_field] = float(values[index])
+        calculated.append(data)
+    return calculated
@@ -0,0 +1,228 @@
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import InventoryItem, InventoryStatus, InventoryLog, ImportedInventoryFile
+from .registry import status_registry
+
+
+IMPORT_FIELDS = ['product_name', 'sku_code', 'quantity', 'unit_price', 'status']
+
+
+@dataclass
+class ImportResult:
+    """Outcome of an inventory import"""
+    total_rows: int = 0
+    created: int = 0
+    updated: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def imported(self) -> int:
+        return self.created + self.updated
+
+    @property
+    def failed(self) -> int:
+        return len(self.errors)
+
+
+class InventoryImporter:
+    """
+    Set-based import engine for inventory spreadsheets.
+
+    Columns are normalized with pandas, statuses and existing SKUs are
+    resolved with one query each, and items are upserted in chunks with
+    bulk_create/bulk_update instead of one save cascade per row.
+    """
+
+    def __init__(self, user, layout, chunk_size: Optional[int] = None):
+        self.user = user
+        self.layout = layout
+        self.chunk_size = chunk_size or getattr(settings, 'INVENTORY_IMPORT_CHUNK_SIZE', 1000)
+
+    @staticmethod
+    def read_file(uploaded_file, file_type: str) -> pd.DataFrame:
+        """Read an uploaded Excel/CSV file with every cell as text"""
+        if file_type == 'excel':
+            return pd.read_excel(uploaded_file, dtype=str)
+        return pd.read_csv(uploaded_file, dtype=str)
+
+    @staticmethod
+    def detect_column_mapping(columns) -> Dict[str, str]:
+        """Auto-detect columns and map file column -> inventory field"""
+        column_mapping = {}
+        for col in columns:
+            col_lower = str(col).lower().strip()
+            if any(keyword in col_lower for keyword in ['product', 'name', 'item']):
+                column_mapping[col] = 'product_name'
+            elif any(keyword in col_lower for keyword in ['sku', 'code', 'id']):
+                column_mapping[col] = 'sku_code'
+            elif any(keyword in col_lower for keyword in ['quantity', 'qty', 'stock']):
+                column_mapping[col] = 'quantity'
+            elif any(keyword in col_lower for keyword in ['price', 'cost', 'unit']):
+                column_mapping[col] = 'unit_price'
+            elif any(keyword in col_lower for keyword in ['status']):
+                column_mapping[col] = 'status'
+        return column_mapping
+
+    def normalize(self, df: pd.DataFrame, column_mapping: Dict[str, str]):
+        """Return a cleaned frame with one column per import field plus row errors"""
+        # First mapped column wins if several file columns map to the same field
+        field_columns = {}
+        for column, field_name in column_mapping.items():
+            field_columns.setdefault(field_name, column)
+
+        frame = pd.DataFrame(index=df.index)
+        for field_name in IMPORT_FIELDS:
+            column = field_columns.get(field_name)
+            if column is not None and column in df.columns:
+                frame[field_name] = df[column].astype('string').str.strip()
+            else:
+                frame[field_name] = pd.Series(pd.NA, index=df.index, dtype='string')
+
+        frame['row_number'] = df.index + 1
+
+        for field_name in ['quantity', 'unit_price']:
+            cleaned = frame[field_name].str.replace(r'[^\d.\-]', '', regex=True)
+            frame[field_name] = pd.to_numeric(cleaned, errors='coerce').fillna(0).astype(float)
+
+        frame['status'] = (
+            frame['status'].fillna('in_stock').str.lower().str.replace(r'\s+', '_', regex=True)
+        )
+        frame.loc[frame['status'] == '', 'status'] = 'in_stock'
+
+        errors = []
+        missing = frame['product_name'].isna() | (frame['product_name'] == '') | \
+            frame['sku_code'].isna() | (frame['sku_code'] == '')
+        for row_number in frame.loc[missing, 'row_number']:
+            errors.append(f"Row {row_number}: Missing product name or SKU")
+
+        too_long = ~missing & (frame['status'].str.len() > 20)
+        for row_number in frame.loc[too_long, 'row_number']:
+            errors.append(f"Row {row_number}: Invalid status")
+
+        frame = frame[~missing & ~too_long]
+        # The last occurrence of a SKU in the file wins
+        frame = frame.drop_duplicates(subset='sku_code', keep='last')
+        return frame, errors
+
+    def resolve_statuses(self, names) -> Dict[str, InventoryStatus]:
+        """Load all statuses used by the file, creating unknown ones in one insert"""
+        names = set(names)
+        statuses = status_registry.in_bulk(names)
+        missing = names - set(statuses)
+        if missing:
+            InventoryStatus.objects.bulk_create(
+                [InventoryStatus(name=name, display_name=name.replace('_', ' ').title()) for name in missing],
+                ignore_conflicts=True
+            )
+            # bulk_create sends no post_save signals, so refresh the registry here
+            status_registry.invalidate()
+            statuses = status_registry.in_bulk(names)
+        return statuses
+
+    def run(self, df: pd.DataFrame, column_mapping: Dict[str, str],
+            import_record: Optional[ImportedInventoryFile] = None,
+            progress: Optional[Callable[[int, int], None]] = None) -> ImportResult:
+        """Import a DataFrame and record the outcome on import_record"""
+        result = ImportResult(total_rows=len(df))
+        frame, result.errors = self.normalize(df, column_mapping)
+
+        statuses = self.resolve_statuses(frame['status'].unique())
+        existing = {
+            item.sku_code: item
+            for item in InventoryItem.objects.filter(
+                user=self.user, sku_code__in=list(frame['sku_code'])
+            ).select_related('layout')
+        }
+
+        records = frame.to_dict('records')
+        for start in range(0, len(records), self.chunk_size):
+            chunk = records[start:start + self.chunk_size]
+            try:
+                with transaction.atomic():
+                    created, updated = self._upsert_chunk(chunk, statuses, existing)
+                result.created += created
+                result.updated += updated
+            except Exception as e:
+                result.errors.extend(f"Row {row['row_number']}: {str(e)}" for row in chunk)
+            if progress is not None:
+                progress(start + len(chunk), len(records))
+
+        InventoryLog.objects.create(
+            user=self.user,
+            layout=self.layout,
+            log_type='import',
+            description=f'Imported {result.imported} items'
+                        + (f' from {import_record.file_name}' if import_record else ''),
+            details={
+                'file_name': import_record.file_name if import_record else '',
+                'imported_count': result.imported,
+                'created_count': result.created,
+                'updated_count': result.updated,
+                'failed_count': result.failed,
+                'total_rows': result.total_rows,
+                'chunk_size': self.chunk_size,
+            }
+        )
+
+        if import_record is not None:
+            import_record.total_rows = result.total_rows
+            import_record.imported_rows = result.imported
+            import_record.failed_rows = result.failed
+            import_record.error_log = '\n'.join(result.errors)
+            import_record.status = 'completed'
+            import_record.completed_at = timezone.now()
+            import_record.save()
+
+        return result
+
+    def _upsert_chunk(self, chunk, statuses, existing):
+        fields = ['product_name', 'status', 'data', 'calculated_data', 'updated_at'] + InventoryItem.TYPED_FIELDS
+        now = timezone.now()
+        to_create = []
+        to_update = []
+
+        for row in chunk:
+            values = {'quantity': row['quantity'], 'unit_price': row['unit_price']}
+            item = existing.get(row['sku_code'])
+            if item is not None:
+                item.product_name = row['product_name']
+                item.status = statuses[row['status']]
+                item.data = {**item.data, **values}
+                item.calculated_data = item.compute_totals()
+                item.sync_typed_fields()
+                item.updated_at = now
+                to_update.append(item)
+            else:
+                item = InventoryItem(
+                    user=self.user,
+                    layout=self.layout,
+                    product_name=row['product_name'],
+                    sku_code=row['sku_code'],
+                    status=statuses[row['status']],
+                    data=values,
+                )
+                item.calculated_data = item.compute_totals()
+                item.sync_typed_fields()
+                to_create.append(item)
+
+        if to_create:
+            InventoryItem.objects.bulk_create(
+                to_create,
+                batch_size=self.chunk_size,
+                update_conflicts=True,
+                unique_fields=['user', 'sku_code'],
+                update_fields=fields,
+            )
+        if to_update:
+            InventoryItem.objects.bulk_update(
+                to_update,
+                fields,
+                batch_size=self.chunk_size,
+            )
+        return len(to_create), len(to_update)
@@ -1,44 +1,57 @@
 from django.core.management.base import BaseCommand
-from apps.inventory.models import InventoryItem
+from apps.inventory.managers import recalculate_items
+from apps.inventory.models import InventoryItem, InventoryExport
 
 
 class Command(BaseCommand):
     help = 'Update all inventory items with latest calculations and ensure all documents are up to date'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of items recalculated and saved per batch'
+        )
+
     def handle(self, *args, **options):
         self.stdout.write('Starting to update all inventory calculations...')
         
+        batch_size = options['batch_size']
         updated_count = 0
         total_count = InventoryItem.objects.count()
+        changed_layouts = set()
+        
+        batch = []
+        items = InventoryItem.objects.select_related('layout').order_by('pk').iterator(chunk_size=batch_size)
+        for item in items:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                updated_count += self._recalculate(batch, changed_layouts)
+                batch = []
+        if batch:
+            updated_count += self._recalculate(batch, changed_layouts)
         
-        for item in InventoryItem.objects.all():
-            try:
-                # Force recalculation
-                item.calculate_totals()
-                item.save()
-                
-                # Update all documents
-                item.update_all_documents()
-                
-                updated_count += 1
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f'Updated item {item.id}: {item.product_name} - '
-                        f'Qty: {item.get_value("quantity")}, '
-                        f'Price: ₦{item.get_value("unit_price")}, '
-                        f'Total: ₦{item.total_value}'
-                    )
-                )
-                
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(
-                        f'Error updating item {item.id}: {str(e)}'
-                    )
-                )
+        # Flag exports of layouts whose items changed so they are regenerated
+        refreshed = 0
+        for export in InventoryExport.objects.filter(layout_id__in=changed_layouts):
+            if not export.export_settings.get('needs_refresh'):
+                export.export_settings['needs_refresh'] = True
+                export.save(update_fields=['export_settings'])
+                refreshed += 1
         
         self.stdout.write(
             self.style.SUCCESS(
-                f'Successfully updated {updated_count} out of {total_count} inventory items'
+                f'Successfully updated {updated_count} out of {total_count} inventory items '
+                f'({refreshed} exports flagged for refresh)'
             )
-        ) 
\ No newline at end of file
+        )
+
+    def _recalculate(self, batch, changed_layouts):
+        before = {item.pk: item.calculated_data for item in batch}
+        try:
+            updated = recalculate_items(batch)
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'Error updating items {batch[0].pk}-{batch[-1].pk}: {str(e)}'))
+            return 0
+        changed_layouts.update(item.layout_id for item in batch if item.calculated_data != before[item.pk])
+        self.stdout.write(f'Processed items {batch[0].pk}-{batch[-1].pk}: {updated} updated')
+        return updated
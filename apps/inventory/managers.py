@@ -0,0 +1,351 @@
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import (
+    InventoryItem, InventoryTransaction, InventoryLog, InventoryExport,
+    InventoryTemplate,
+)
+from .registry import status_registry
+from .signals import bulk_operation
+from .formulas import compute_totals_bulk
+
+LOW_STOCK_QUANTITY = 5
+
+
+def json_safe(value: Any) -> Any:
+    """Convert Decimal and date values so they can be stored in a JSONField"""
+    if hasattr(value, 'as_tuple'):  # Check if it's a Decimal
+        return float(value)
+    if hasattr(value, 'isoformat'):  # Check if it's a date/datetime
+        return value.isoformat()
+    if hasattr(value, 'pk'):  # Check if it's a model instance
+        return str(value)
+    return value
+
+
+class InventoryItemUpdate:
+    """
+    Unit of work for changing an inventory item.
+
+    Field changes are collected in memory, derived data (totals and status)
+    is recalculated once, and the item, the related exports and templates
+    and any transaction/log rows are written in a single database
+    transaction when commit() is called.
+
+    Usage:
+        update = InventoryItemUpdate(item, user=request.user)
+        update.set('quantity', 10)
+        update.add_log('field_update', 'Updated quantity: 10')
+        update.commit()
+    """
+
+    def __init__(self, item: InventoryItem, user=None, skip_status_update: bool = False):
+        self.item = item
+        self.user = user or item.user
+        self.skip_status_update = skip_status_update
+        self.changes: Dict[str, Dict[str, Any]] = {}
+        self.transactions = []
+        self.logs = []
+
+    def set(self, field_name: str, value: Any) -> 'InventoryItemUpdate':
+        """Queue a field change; the old value of the first change is kept"""
+        old_value = json_safe(self.item.get_value(field_name))
+        self.item.apply_value(field_name, value)
+
+        if field_name in self.changes:
+            self.changes[field_name]['new'] = json_safe(value)
+        else:
+            self.changes[field_name] = {'old': old_value, 'new': json_safe(value)}
+        return self
+
+    def set_status(self, status) -> 'InventoryItemUpdate':
+        """Queue an explicit status change (disables the automatic status update)"""
+        self.item.status = status
+        self.skip_status_update = True
+        return self
+
+    def add_transaction(self, **kwargs) -> 'InventoryItemUpdate':
+        """Queue an InventoryTransaction row for this item"""
+        self.transactions.append(InventoryTransaction(user=self.user, item=self.item, **kwargs))
+        return self
+
+    def add_log(self, log_type: str, description: str, details: Optional[Dict] = None) -> 'InventoryItemUpdate':
+        """Queue an InventoryLog row for this item"""
+        self.logs.append(InventoryLog(
+            user=self.user,
+            item=self.item,
+            log_type=log_type,
+            description=description,
+            details=details or {},
+        ))
+        return self
+
+    def commit(self) -> InventoryItem:
+        """Recalculate derived data once and flush everything in one transaction"""
+        item = self.item
+
+        with transaction.atomic():
+            if not self.skip_status_update:
+                item._update_status_based_on_quantity()
+
+            # save() recalculates calculated_data itself when the data has changed
+            if not item._data_changed():
+                item.calculated_data = item.compute_totals()
+            # Its post_save receiver clears the item's cache keys once committed
+            item.save()
+
+            self._mark_related_documents()
+
+            if not self.logs:
+                self.add_log('field_update', self._summary_description(), self._summary_details())
+
+            if self.transactions:
+                InventoryTransaction.objects.bulk_create(self.transactions)
+            InventoryLog.objects.bulk_create(self.logs)
+
+        self.transactions = []
+        self.logs = []
+        return item
+
+    def _mark_related_documents(self):
+        """Flag exports for refresh and touch templates that list items"""
+        item = self.item
+        mark_related_documents(item.user_id, [item.layout_id], item.updated_at)
+
+    def _summary_description(self) -> str:
+        item = self.item
+        return (
+            f'Updated item data - Quantity: {item.get_value("quantity")}, '
+            f'Unit Price: ₦{item.get_value("unit_price")}, Total: ₦{item.total_value}'
+        )
+
+    def _summary_details(self) -> Dict[str, Any]:
+        item = self.item
+        return {
+            'quantity': json_safe(item.get_value('quantity')),
+            'unit_price': json_safe(item.get_value('unit_price')),
+            'total_value': item.total_value,
+            'status': item.status.name,
+            'status_display': item.status.display_name,
+            'changes': self.changes,
+        }
+
+
+def mark_related_documents(user_id, layout_ids, touched_at):
+    """Flag a user's exports of the given layouts for refresh and touch templates that list items"""
+    exports = []
+    for export in InventoryExport.objects.filter(user_id=user_id, layout_id__in=set(layout_ids)):
+        if not export.export_settings.get('needs_refresh'):
+            export.export_settings['needs_refresh'] = True
+            exports.append(export)
+    if exports:
+        InventoryExport.objects.bulk_update(exports, ['export_settings'])
+
+    templates = []
+    for template in InventoryTemplate.objects.filter(user_id=user_id).only('id', 'field_config'):
+        if 'items' in template.field_config:
+            template.updated_at = touched_at
+            templates.append(template)
+    if templates:
+        InventoryTemplate.objects.bulk_update(templates, ['updated_at'])
+
+
+class InventoryBulkOperation:
+    """
+    Set-based operations on many of a user's inventory items.
+
+    Each operation loads the selected items once, changes them with a
+    single UPDATE or DELETE, and writes transaction/log rows with
+    bulk_create, all in one database transaction. The number of queries
+    does not depend on how many items are selected.
+
+    Usage:
+        results = InventoryBulkOperation(request.user, item_ids).update_status(status)
+    """
+
+    def __init__(self, user, item_ids):
+        self.user = user
+        self.item_ids = []
+        for item_id in item_ids:
+            try:
+                item_id = int(item_id)
+            except (TypeError, ValueError):
+                continue
+            if item_id not in self.item_ids:
+                self.item_ids.append(item_id)
+
+    def _load(self, *fields):
+        items = InventoryItem.objects.filter(pk__in=self.item_ids, user=self.user)
+        if fields:
+            items = items.only(*fields)
+        return {item.pk: item for item in items}
+
+    def _results(self, items, result):
+        """One result per requested id, in request order"""
+        results = []
+        for item_id in self.item_ids:
+            item = items.get(item_id)
+            if item is None:
+                results.append({'id': item_id, 'success': False, 'error': 'Item not found'})
+            else:
+                results.append({'id': item_id, 'success': True, **result(item)})
+        return results
+
+    def update_status(self, status) -> List[Dict[str, Any]]:
+        """Set the status of every selected item, recording a transaction and log for each"""
+        items = self._load('id', 'user_id', 'layout_id', 'status_id', 'product_name', 'sku_code', 'data')
+        old_statuses = status_registry.in_bulk_by_id({item.status_id for item in items.values()})
+        now = timezone.now()
+
+        with transaction.atomic():
+            if items:
+                InventoryItem.objects.filter(pk__in=list(items)).update(status=status, updated_at=now)
+
+            transactions = []
+            logs = []
+            for item in items.values():
+                old_status = old_statuses[item.status_id]
+                transactions.append(InventoryTransaction(
+                    user=self.user,
+                    item=item,
+                    transaction_type='status_change',
+                    status_before=old_status,
+                    status_after=status,
+                    notes=f'Bulk status update to {status.display_name}'
+                ))
+                logs.append(InventoryLog(
+                    user=self.user,
+                    item=item,
+                    log_type='status_change',
+                    description=f'Bulk status change: {old_status.display_name} → {status.display_name}',
+                    details={
+                        'old_status': old_status.name,
+                        'new_status': status.name,
+                        'bulk_operation': True
+                    }
+                ))
+            InventoryTransaction.objects.bulk_create(transactions)
+            InventoryLog.objects.bulk_create(logs)
+
+            if items:
+                mark_related_documents(self.user.pk, {item.layout_id for item in items.values()}, now)
+                transaction.on_commit(lambda: self._clear_cache(items.values(), f'inventory_status_{status.pk}'))
+
+        return self._results(items, lambda item: {
+            'old_status': old_statuses[item.status_id].name,
+            'new_status': status.name,
+        })
+
+    def delete(self) -> List[Dict[str, Any]]:
+        """Delete every selected item, keeping one delete log per item"""
+        items = self._load('id', 'user_id', 'layout_id', 'status_id', 'product_name', 'sku_code', 'data')
+
+        with transaction.atomic():
+            # Logs are not linked to the item, otherwise they would be deleted with it
+            InventoryLog.objects.bulk_create([
+                InventoryLog(
+                    user=self.user,
+                    layout_id=item.layout_id,
+                    log_type='delete',
+                    description=f'Bulk deleted: {item.product_name} ({item.sku_code})',
+                    details={
+                        'item_id': item.pk,
+                        'product_name': item.product_name,
+                        'sku_code': item.sku_code,
+                        'bulk_operation': True
+                    }
+                )
+                for item in items.values()
+            ])
+            if items:
+                # The cache of all items is cleared below in one call, not per deleted row
+                with bulk_operation():
+                    InventoryItem.objects.filter(pk__in=list(items)).delete()
+                mark_related_documents(self.user.pk, {item.layout_id for item in items.values()}, timezone.now())
+                transaction.on_commit(lambda: self._clear_cache(items.values()))
+
+        return self._results(items, lambda item: {'sku_code': item.sku_code})
+
+    def _clear_cache(self, items, *extra_keys):
+        keys = set(extra_keys)
+        for item in items:
+            keys.update(item.cache_keys())
+        cache.delete_many(list(keys))
+
+
+def recalculate_items(items, batch_size: int = 500) -> int:
+    """
+    Recalculate calculated_data for many items at once.
+
+    Items are grouped by layout and evaluated with the vectorized formula
+    engine; only items whose totals changed are written, with bulk_update.
+    Returns the number of items that were updated.
+    """
+    by_layout = defaultdict(list)
+    for item in items:
+        by_layout[item.layout_id].append(item)
+
+    now = timezone.now()
+    changed = []
+    for layout_items in by_layout.values():
+        layout = layout_items[0].layout
+        for item, calculated in zip(layout_items, compute_totals_bulk(layout_items, layout)):
+            if calculated != item.calculated_data:
+                item.calculated_data = calculated
+                item.sync_typed_fields()
+                item.updated_at = now
+                changed.append(item)
+
+    if changed:
+        InventoryItem.objects.bulk_update(
+            changed, ['calculated_data', 'updated_at'] + InventoryItem.TYPED_FIELDS, batch_size=batch_size
+        )
+    return len(changed)
+
+
+def inventory_stats(user) -> Dict[str, Any]:
+    """
+    Dashboard statistics for a user's inventory.
+
+    Item counts, low-stock counts and values are computed in a single
+    query grouped by status, so the cost does not grow with the number
+    of items.
+    """
+    rows = (
+        InventoryItem.objects.filter(user=user)
+        .order_by()
+        .values('status_id')
+        .annotate(
+            count=Count('id'),
+            active=Count('id', filter=Q(is_active=True)),
+            low_stock=Count('id', filter=Q(is_active=True, quantity_amount__lte=LOW_STOCK_QUANTITY)),
+            value=Sum('total_amount'),
+        )
+    )
+    by_status = {row['status_id']: row for row in rows}
+
+    status_stats = {}
+    out_of_stock_count = 0
+    for status in status_registry.active():
+        count = by_status.get(status.pk, {}).get('count', 0)
+        status_stats[status.name] = {
+            'count': count,
+            'color': status.color,
+            'display_name': status.display_name
+        }
+        if status.name == 'out_of_stock':
+            out_of_stock_count = count
+
+    return {
+        'total_items': sum(row['count'] for row in by_status.values()),
+        'active_items': sum(row['active'] for row in by_status.values()),
+        'low_stock_count': sum(row['low_stock'] for row in by_status.values()),
+        'out_of_stock_count': out_of_stock_count,
+        'total_value': float(sum(row['value'] or 0 for row in by_status.values())),
+        'status_stats': status_stats,
+    }
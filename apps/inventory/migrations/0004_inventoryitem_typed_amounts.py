@@ -0,0 +1,100 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:05
+
+import re
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+# A frozen copy of the number parsing in apps/inventory/formulas.py, so later
+# changes there do not change what this migration does
+CURRENCY_RE = re.compile(r"[₦$€£¥₹₿₤₩₪₫₭₮₯₰₱₲₳₴₵₶₷₸₹₺₻₼₽₾₿]")
+UNIT_WORDS_RE = re.compile(r"\b(each|pcs|pieces|units|items|nos|qty|quantity)\b", re.IGNORECASE)
+PRICE_WORDS_RE = re.compile(r"\b(price|cost|amount|value|total)\b", re.IGNORECASE)
+PARENTHESES_RE = re.compile(r"\([^)]*\)")
+NON_NUMERIC_RE = re.compile(r"[^\d.-]")
+
+
+def extract_number(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float, Decimal)):
+        return float(value)
+
+    value_str = str(value).strip()
+    value_str = CURRENCY_RE.sub("", value_str)
+    value_str = UNIT_WORDS_RE.sub("", value_str)
+    value_str = PRICE_WORDS_RE.sub("", value_str)
+    value_str = PARENTHESES_RE.sub("", value_str)
+    value_str = NON_NUMERIC_RE.sub("", value_str)
+
+    parts = value_str.split(".")
+    if len(parts) > 2:
+        value_str = parts[0] + "." + "".join(parts[1:])
+
+    try:
+        result = float(value_str) if value_str else None
+    except ValueError:
+        return None
+    if result is not None and (result < -999999999 or result > 999999999):
+        return None
+    return result
+
+
+def to_decimal(value):
+    return Decimal(str(round(float(value or 0), 2)))
+
+
+def to_optional_decimal(value):
+    return None if value is None else to_decimal(value)
+
+
+def backfill_typed_amounts(apps, schema_editor):
+    """Copy quantity, unit price and total from the JSON data into the new columns"""
+    InventoryItem = apps.get_model("inventory", "InventoryItem")
+    batch = []
+    for item in InventoryItem.objects.only("id", "data", "calculated_data").iterator(chunk_size=1000):
+        data = item.data or {}
+        item.quantity_amount = to_optional_decimal(extract_number(data.get("quantity") or data.get("Quantity")))
+        item.unit_price_amount = to_optional_decimal(extract_number(data.get("unit_price") or data.get("Unit Price")))
+        item.total_amount = to_decimal((item.calculated_data or {}).get("total", 0))
+        batch.append(item)
+        if len(batch) >= 1000:
+            InventoryItem.objects.bulk_update(batch, ["quantity_amount", "unit_price_amount", "total_amount"])
+            batch = []
+    if batch:
+        InventoryItem.objects.bulk_update(batch, ["quantity_amount", "unit_price_amount", "total_amount"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0003_inventorycategory_is_active"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="inventoryitem",
+            name="quantity_amount",
+            field=models.DecimalField(blank=True, db_column="quantity", decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name="inventoryitem",
+            name="unit_price_amount",
+            field=models.DecimalField(blank=True, db_column="unit_price", decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name="inventoryitem",
+            name="total_amount",
+            field=models.DecimalField(db_column="total_value", decimal_places=2, default=0, max_digits=20),
+        ),
+        migrations.AddIndex(
+            model_name="inventoryitem",
+            index=models.Index(fields=["user", "quantity_amount"], name="inventory_i_user_id_8f3b1c_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="inventoryitem",
+            index=models.Index(fields=["user", "unit_price_amount"], name="inventory_i_user_id_5d2e7a_idx"),
+        ),
+        migrations.RunPython(backfill_typed_amounts, migrations.RunPython.noop),
+    ]
@@ -4,12 +4,15 @@ from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from decimal import Decimal
+import copy
 import json
 import uuid
 import re
 from typing import Dict, Any, List, Optional
 from django.db.models import JSONField
 
+from .formulas import get_layout_rules, parse_number
+
 User = get_user_model()
 
 class InventoryStatus(models.Model):
@@ -343,11 +346,21 @@ class InventoryItem(models.Model):
     data = JSONField(default=dict, help_text="Dynamic field values")
     calculated_data = JSONField(default=dict, help_text="Auto-calculated values")
     
+    # Typed copies of quantity, unit price and total, synced from data on save
+    # so they can be filtered, indexed and aggregated in the database.
+    # Quantity and unit price are NULL when data has no value for them, so
+    # such items do not match range filters such as low stock
+    quantity_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, db_column='quantity')
+    unit_price_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, db_column='unit_price')
+    total_amount = models.DecimalField(max_digits=20, decimal_places=2, default=0, db_column='total_value')
+    
     # Metadata
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    TYPED_FIELDS = ['quantity_amount', 'unit_price_amount', 'total_amount']
+    
     class Meta:
         ordering = ['-created_at']
         indexes = [
@@ -355,6 +368,8 @@ class InventoryItem(models.Model):
             models.Index(fields=['sku_code']),
             models.Index(fields=['status']),
             models.Index(fields=['is_active']),
+            models.Index(fields=['user', 'quantity_amount'], name='inventory_i_user_id_8f3b1c_idx'),
+            models.Index(fields=['user', 'unit_price_amount'], name='inventory_i_user_id_5d2e7a_idx'),
         ]
         unique_together = ['user', 'sku_code']
         verbose_name = 'Inventory Item'
@@ -363,6 +378,59 @@ class InventoryItem(models.Model):
     def __str__(self):
         return f"{self.product_name} ({self.sku_code})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored data so save() only recalculates when it changes
+        if 'data' in instance.__dict__:
+            instance._saved_data = copy.deepcopy(instance.data)
+        return instance
+    
+    def save(self, *args, **kwargs):
+        """Save the item, refreshing calculated_data whenever data has changed"""
+        if self._data_changed():
+            self.calculated_data = self.compute_totals()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'calculated_data' not in update_fields:
+                kwargs['update_fields'] = list(update_fields) + ['calculated_data']
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'data', 'calculated_data'} & set(update_fields):
+            if 'data' in self.__dict__ and 'calculated_data' in self.__dict__:
+                self.sync_typed_fields()
+                if update_fields is not None:
+                    kwargs['update_fields'] = list(update_fields) + [
+                        name for name in self.TYPED_FIELDS if name not in update_fields
+                    ]
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if 'data' in self.__dict__ and (update_fields is None or 'data' in update_fields):
+            self._saved_data = copy.deepcopy(self.data)
+    
+    def sync_typed_fields(self) -> None:
+        """Copy quantity, unit price and total from the JSON data into their typed columns"""
+        quantity = self._extract_number(self.data.get('quantity') or self.data.get('Quantity'))
+        unit_price = self._extract_number(self.data.get('unit_price') or self.data.get('Unit Price'))
+        self.quantity_amount = None if quantity is None else self._to_decimal(quantity)
+        self.unit_price_amount = None if unit_price is None else self._to_decimal(unit_price)
+        self.total_amount = self._to_decimal(self.total_value)
+    
+    @staticmethod
+    def _to_decimal(value) -> Decimal:
+        """Round a float to a two-place Decimal for the typed columns"""
+        try:
+            return Decimal(str(round(float(value or 0), 2)))
+        except (TypeError, ValueError):
+            return Decimal('0')
+    
+    def _data_changed(self) -> bool:
+        """Check whether the dynamic data differs from what was last stored"""
+        if 'data' not in self.__dict__:
+            # Deferred and never touched, so it cannot have changed
+            return False
+        if self._state.adding or not hasattr(self, '_saved_data'):
+            return True
+        return self._saved_data != self.data
+    
     def get_value(self, field_name: str) -> Any:
         """Get value for a specific field"""
         # Check core fields first
@@ -409,6 +477,11 @@ class InventoryItem(models.Model):
     
     def set_value(self, field_name: str, value: Any) -> None:
         """Set value for a specific field and trigger calculations"""
+        from .managers import InventoryItemUpdate
+        InventoryItemUpdate(self).set(field_name, value).commit()
+    
+    def apply_value(self, field_name: str, value: Any) -> None:
+        """Set value for a specific field in memory without saving"""
         # Handle core fields (but not properties)
         if hasattr(self, field_name) and not hasattr(type(self), field_name):
             setattr(self, field_name, value)
@@ -427,69 +500,12 @@ class InventoryItem(models.Model):
                 self.data[field_name] = value.isoformat()
             else:
                 self.data[field_name] = value
-        
-        self.save()
-        self.calculate_totals()
-        
-        # Trigger updates across all inventory documents and templates
-        self.update_all_documents()
 
     def update_all_documents(self, skip_status_update=False):
         """Update all inventory documents and templates when data changes"""
+        from .managers import InventoryItemUpdate
         try:
-            # Force recalculation of totals
-            calculated_data = self.calculate_totals()
-            
-            # Update calculated data in the model
-            self.calculated_data = calculated_data
-            
-            # Update status based on quantity (only if not explicitly setting status)
-            if not skip_status_update:
-                self._update_status_based_on_quantity()
-            
-            # Save the model to persist changes
-            self.save(update_fields=['calculated_data', 'status', 'updated_at'])
-            
-            # Update any cached data
-            self.refresh_from_db()
-            
-            # Update related documents and templates
-            self._update_related_documents()
-            
-            # Clear Django's cache for this item
-            from django.core.cache import cache
-            cache_keys_to_clear = [
-                f'inventory_item_{self.id}',
-                f'inventory_user_{self.user.id}',
-                f'inventory_layout_{self.layout.id}',
-                f'inventory_status_{self.status.id}',
-            ]
-            for key in cache_keys_to_clear:
-                cache.delete(key)
-            
-            # Log the update for tracking
-            from .models import InventoryLog
-            InventoryLog.objects.create(
-                user=self.user,
-                item=self,
-                log_type='field_update',
-                description=f'Updated item data - Quantity: {self.get_value("quantity")}, Unit Price: ₦{self.get_value("unit_price")}, Total: ₦{self.total_value}',
-                details={
-                    'quantity': self.get_value("quantity"),
-                    'unit_price': self.get_value("unit_price"),
-                    'total_value': self.total_value,
-                    'status': self.status.name,
-                    'status_display': self.status.display_name,
-                    'updated_at': self.updated_at.isoformat()
-                }
-            )
-            
-            print(f"✅ Updated all documents for item {self.id}: {self.product_name}")
-            print(f"   Quantity: {self.get_value('quantity')}")
-            print(f"   Unit Price: ₦{self.get_value('unit_price')}")
-            print(f"   Total: ₦{self.total_value}")
-            print(f"   Status: {self.status.display_name}")
-            
+            InventoryItemUpdate(self, skip_status_update=skip_status_update).commit()
         except Exception as e:
             print(f"❌ Error updating documents for item {self.id}: {str(e)}")
     
@@ -497,78 +513,63 @@ class InventoryItem(models.Model):
         """Update item status based on current quantity"""
         try:
             quantity = self.quantity
-            minimum_threshold = self.get_value('minimum_threshold') or 0
+            minimum_threshold = self._extract_number(self.get_value('minimum_threshold')) or 0
             
-            # Get status objects
-            from .models import InventoryStatus
-            in_stock_status = InventoryStatus.objects.get(name='in_stock')
-            low_stock_status = InventoryStatus.objects.get(name='low_stock')
-            out_of_stock_status = InventoryStatus.objects.get(name='out_of_stock')
+            # Statuses come from the in-memory registry
+            from .registry import status_registry
+            statuses = status_registry.in_bulk(['in_stock', 'low_stock', 'out_of_stock'])
             
             # Update status based on quantity
             if quantity <= 0:
-                self.status = out_of_stock_status
+                new_status = statuses.get('out_of_stock')
             elif minimum_threshold > 0 and quantity <= minimum_threshold:
-                self.status = low_stock_status
+                new_status = statuses.get('low_stock')
             else:
-                self.status = in_stock_status
+                new_status = statuses.get('in_stock')
+            
+            if new_status is not None:
+                self.status = new_status
                 
         except Exception as e:
             print(f"⚠️ Warning: Error updating status for item {self.id}: {str(e)}")
     
-    def _update_related_documents(self):
-        """Update related documents, templates, and exports"""
-        try:
-            # Update any cached exports that include this item
-            from .models import InventoryExport
-            exports = InventoryExport.objects.filter(
-                user=self.user,
-                layout=self.layout
-            )
-            
-            for export in exports:
-                # Mark export as needing refresh
-                export.export_settings['needs_refresh'] = True
-                export.save(update_fields=['export_settings'])
-            
-            # Update any templates that reference this item
-            from .models import InventoryTemplate
-            templates = InventoryTemplate.objects.filter(
-                user=self.user
-            )
-            
-            for template in templates:
-                # Update template if it contains this item's data
-                if 'items' in template.field_config:
-                    template.updated_at = self.updated_at
-                    template.save(update_fields=['updated_at'])
-            
-            # Clear any cached data for this item
-            self._clear_cached_data()
-            
-        except Exception as e:
-            print(f"⚠️ Warning: Error updating related documents: {str(e)}")
-    
+    def cache_keys(self) -> List[str]:
+        """Cache keys that hold data about this item, cleared when it is saved or deleted"""
+        return [
+            f'inventory_item_{self.id}',
+            f'inventory_detail_{self.id}',
+            f'inventory_print_{self.id}',
+            f'inventory_user_{self.user_id}',
+            f'inventory_layout_{self.layout_id}',
+            f'inventory_export_{self.user_id}_{self.layout_id}',
+            f'inventory_status_{self.status_id}',
+            f'inventory_category_{self.data.get("category", "")}',
+            'inventory_list_cache',
+            'inventory_dashboard_cache',
+            'inventory_export_cache',
+        ]
+
     def _clear_cached_data(self):
         """Clear any cached data for this item"""
         try:
             # Clear any Django cache entries for this item
             from django.core.cache import cache
-            cache_keys = [
-                f'inventory_item_{self.id}',
-                f'inventory_detail_{self.id}',
-                f'inventory_export_{self.user.id}_{self.layout.id}',
-                f'inventory_print_{self.id}',
-            ]
-            
-            for key in cache_keys:
-                cache.delete(key)
+            cache.delete_many(self.cache_keys())
                 
         except Exception as e:
             print(f"⚠️ Warning: Error clearing cache: {str(e)}")
     
     def calculate_totals(self) -> Dict[str, Any]:
-        """Calculate totals based on layout configuration"""
+        """Recalculate totals and persist them if they have changed"""
+        calculated = self.compute_totals()
+        if calculated != self.calculated_data:
+            self.calculated_data = calculated
+            if self.pk:
+                self.save(update_fields=['calculated_data', 'updated_at'])
+        return calculated
+    
+    def compute_totals(self) -> Dict[str, Any]:
+        """Calculate totals based on layout configuration without saving"""
         if not self.layout.supports_calculations():
             return {}
         
@@ -586,78 +587,22 @@ class InventoryItem(models.Model):
             calculated['total'] = total
             calculated['Total'] = total
         
-        # Apply custom calculation rules
-        for rule in self.layout.calculation_rules.get('rules', []):
-            if rule.get('enabled', False):
-                result = self._apply_calculation_rule(rule)
-                if result is not None:
-                    calculated[rule['output_field']] = result
+        # Apply custom calculation rules (compiled once per layout revision)
+        for rule in get_layout_rules(self.layout):
+            values = {
+                field_name: self._extract_number(self.get_value(field_name)) or 0
+                for field_name in rule.formula.fields
+            }
+            result = rule.evaluate(values)
+            if result is not None:
+                calculated[rule.output_field] = result
         
-        self.calculated_data = calculated
-        self.save()
         return calculated
     
-    def _extract_number(self, value) -> Optional[float]:
+    @staticmethod
+    def _extract_number(value) -> Optional[float]:
         """Extract numeric value from mixed input with enhanced sanitization"""
-        if value is None or value == '':
-            return None
-        
-        if isinstance(value, (int, float, Decimal)):
-            return float(value)
-        
-        # Convert to string and clean
-        value_str = str(value).strip()
-        
-        # Remove common currency symbols
-        value_str = re.sub(r'[₦$€£¥₹₿₤₩₪₫₭₮₯₰₱₲₳₴₵₶₷₸₹₺₻₼₽₾₿]', '', value_str)
-        
-        # Remove common text patterns like "each", "pcs", "units", etc.
-        value_str = re.sub(r'\b(each|pcs|pieces|units|items|nos|qty|quantity)\b', '', value_str, flags=re.IGNORECASE)
-        
-        # Remove other common text patterns
-        value_str = re.sub(r'\b(price|cost|amount|value|total)\b', '', value_str, flags=re.IGNORECASE)
-        
-        # Remove parentheses and their contents
-        value_str = re.sub(r'\([^)]*\)', '', value_str)
-        
-        # Remove extra spaces and keep only numbers, decimals, and minus signs
-        value_str = re.sub(r'[^\d.-]', '', value_str)
-        
-        # Handle multiple decimal points (keep only the first one)
-        parts = value_str.split('.')
-        if len(parts) > 2:
-            value_str = parts[0] + '.' + ''.join(parts[1:])
-        
-        try:
-            result = float(value_str) if value_str else None
-            # Validate reasonable range
-            if result is not None and (result < -999999999 or result > 999999999):
-                return None
-            return result
-        except ValueError:
-            return None
-    
-    def _apply_calculation_rule(self, rule: Dict) -> Optional[float]:
-        """Apply a custom calculation rule"""
-        try:
-            formula = rule.get('formula', '')
-            if not formula:
-                return None
-            
-            # Replace field names with actual values
-            for field_name in rule.get('input_fields', []):
-                field_value = self._extract_number(self.get_value(field_name)) or 0
-                formula = formula.replace(f'{{{field_name}}}', str(field_value))
-            
-            # Safe evaluation (only basic math operations)
-            allowed_chars = set('0123456789+-*/(). ')
-            if all(c in allowed_chars for c in formula):
-                return eval(formula)
-            
-        except Exception:
-            pass
-        
-        return None
+        return parse_number(value)
     
     @property
     def total_value(self) -> float:
@@ -0,0 +1,108 @@
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional
+
+from django.core.cache import cache
+
+from .models import InventoryStatus
+
+
+class StatusRegistry:
+    """
+    In-memory registry of InventoryStatus rows keyed by name and id.
+
+    Statuses are loaded once per process and reused for every lookup.
+    Saving or deleting a status clears the local copy and changes a
+    version key in the shared Django cache, so other worker processes
+    notice the change and reload. The version is read once per request
+    (see expire(), connected to request_started) and at most every
+    CHECK_INTERVAL seconds outside requests, never per lookup.
+
+    Usage:
+        status = status_registry.get('in_stock')
+        statuses = status_registry.active()
+    """
+
+    VERSION_KEY = 'inventory_status_registry_version'
+    CHECK_INTERVAL = 30
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = None
+        self._by_name: Dict[str, InventoryStatus] = {}
+        self._by_id: Dict[int, InventoryStatus] = {}
+
+    def _current_version(self) -> str:
+        version = cache.get(self.VERSION_KEY)
+        if version is None:
+            # Cold or evicted cache entry: start a new version everyone agrees on
+            cache.add(self.VERSION_KEY, uuid.uuid4().hex, timeout=None)
+            version = cache.get(self.VERSION_KEY)
+        return version
+
+    def _ensure_loaded(self):
+        checked_at = self._checked_at
+        if checked_at is not None and time.monotonic() - checked_at < self.CHECK_INTERVAL:
+            return
+        version = self._current_version()
+        if version is None or version != self._version:
+            with self._lock:
+                statuses = list(InventoryStatus.objects.all())
+                self._by_name = {status.name: status for status in statuses}
+                self._by_id = {status.pk: status for status in statuses}
+                self._version = version
+        self._checked_at = time.monotonic()
+
+    def expire(self, **kwargs):
+        """Compare with the shared version again on the next lookup"""
+        self._checked_at = None
+
+    def invalidate(self):
+        """Drop the local copy and tell other processes to reload"""
+        with self._lock:
+            self._version = None
+            self._checked_at = None
+        cache.set(self.VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+    def get(self, name: str) -> Optional[InventoryStatus]:
+        """Status with the given name, or None"""
+        self._ensure_loaded()
+        return self._by_name.get(name)
+
+    def get_by_id(self, pk) -> Optional[InventoryStatus]:
+        """Status with the given primary key, or None"""
+        self._ensure_loaded()
+        try:
+            return self._by_id.get(int(pk))
+        except (TypeError, ValueError):
+            return None
+
+    def resolve(self, value) -> Optional[InventoryStatus]:
+        """Status from a primary key or a name, as sent by forms and AJAX calls"""
+        if isinstance(value, int) or (isinstance(value, str) and value.isdigit()):
+            return self.get_by_id(value)
+        return self.get(value)
+
+    def in_bulk(self, names: Iterable[str]) -> Dict[str, InventoryStatus]:
+        """Statuses for the given names that exist, keyed by name"""
+        self._ensure_loaded()
+        return {name: self._by_name[name] for name in names if name in self._by_name}
+
+    def in_bulk_by_id(self, pks: Iterable[int]) -> Dict[int, InventoryStatus]:
+        """Statuses for the given primary keys that exist, keyed by primary key"""
+        self._ensure_loaded()
+        return {pk: self._by_id[pk] for pk in pks if pk in self._by_id}
+
+    def all(self) -> List[InventoryStatus]:
+        """All statuses in display order"""
+        self._ensure_loaded()
+        return sorted(self._by_id.values(), key=lambda status: (status.sort_order, status.name))
+
+    def active(self) -> List[InventoryStatus]:
+        """Active statuses in display order"""
+        return [status for status in self.all() if status.is_active]
+
+
+status_registry = StatusRegistry()
@@ -1,7 +1,43 @@
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.signals import request_started
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.core.cache import cache
-from .models import InventoryItem, InventoryCategory
+from .models import InventoryItem, InventoryCategory, InventoryStatus
+from .registry import status_registry
+
+logger = logging.getLogger(__name__)
+
+# Set while InventoryBulkOperation works on many items, it clears their cache in one call
+_in_bulk_operation = ContextVar('inventory_bulk_operation', default=False)
+
+
+@contextmanager
+def bulk_operation():
+    """Skip the per-item cache receivers while the caller clears the cache itself"""
+    token = _in_bulk_operation.set(True)
+    try:
+        yield
+    finally:
+        _in_bulk_operation.reset(token)
+
+
+@receiver(post_save, sender=InventoryStatus)
+@receiver(post_delete, sender=InventoryStatus)
+def invalidate_status_registry(sender, instance, **kwargs):
+    """
+    Reload the status registry in every process when a status changes
+    """
+    status_registry.invalidate()
+    # Invalidate again once committed, in case another process reloaded in between
+    transaction.on_commit(status_registry.invalidate)
+
+# Check the registry version once per request instead of on every lookup
+request_started.connect(status_registry.expire, dispatch_uid='inventory_status_registry_expire')
 
 @receiver(post_save, sender=InventoryItem)
 def auto_assign_category(sender, instance, created, **kwargs):
@@ -52,46 +88,25 @@ def clear_inventory_cache(sender, instance, **kwargs):
     """
     Clear cache when inventory items are updated to ensure fresh data across all views
     """
-    try:
-        # Clear various cache keys that might be used across different views
-        cache_keys_to_clear = [
-            f'inventory_item_{instance.id}',
-            f'inventory_user_{instance.user.id}',
-            f'inventory_layout_{instance.layout.id}',
-            f'inventory_status_{instance.status.id}',
-            f'inventory_category_{instance.data.get("category", "")}',
-            'inventory_list_cache',
-            'inventory_dashboard_cache',
-            'inventory_export_cache',
-        ]
-        
-        for key in cache_keys_to_clear:
-            cache.delete(key)
-        
-        print(f"🧹 Cleared cache for inventory item {instance.id}: {instance.product_name}")
-        
-    except Exception as e:
-        print(f"⚠️ Error clearing cache for item {instance.id}: {str(e)}")
+    keys = instance.cache_keys()
+
+    def clear():
+        try:
+            cache.delete_many(keys)
+        except Exception:
+            logger.exception('Error clearing cache for inventory item %s', instance.id)
+
+    # Once committed, so no other worker caches the old row again in between
+    transaction.on_commit(clear)
 
 @receiver(post_delete, sender=InventoryItem)
 def clear_cache_on_delete(sender, instance, **kwargs):
     """
     Clear cache when inventory items are deleted
     """
+    if _in_bulk_operation.get():
+        return
     try:
-        # Clear cache for the deleted item
-        cache_keys_to_clear = [
-            f'inventory_item_{instance.id}',
-            f'inventory_user_{instance.user.id}',
-            f'inventory_layout_{instance.layout.id}',
-            f'inventory_status_{instance.status.id}',
-            f'inventory_category_{instance.data.get("category", "")}',
-        ]
-        
-        for key in cache_keys_to_clear:
-            cache.delete(key)
-        
-        print(f"🧹 Cleared cache for deleted inventory item {instance.id}")
-        
-    except Exception as e:
-        print(f"⚠️ Error clearing cache for deleted item {instance.id}: {str(e)}") 
\ No newline at end of file
+        cache.delete_many(instance.cache_keys())
+    except Exception:
+        logger.exception('Error clearing cache for deleted inventory item %s', instance.id)
@@ -0,0 +1,449 @@
+import io
+from decimal import Decimal
+
+import pandas as pd
+from openpyxl import load_workbook
+from django.core.cache import cache
+from django.core.signals import request_started
+from django.test import TestCase, Client, override_settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from apps.accounts.models import User
+from apps.core.models import CompanyProfile
+
+from .forms import InventoryItemForm
+from .formulas import CompiledFormula, FormulaError, compile_rules, compute_totals_bulk
+from .importers import InventoryImporter
+from .views import export_to_csv, export_to_excel
+from .managers import InventoryBulkOperation, InventoryItemUpdate, inventory_stats
+from .registry import StatusRegistry, status_registry
+from .models import (
+    InventoryItem, InventoryLayout, InventoryStatus, InventoryTransaction,
+    InventoryLog, InventoryExport,
+)
+
+
+class InventoryTestMixin:
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='inventory@example.com',
+            password='testpass123'
+        )
+        CompanyProfile.objects.create(
+            user=self.user,
+            company_name='Inventory Co',
+            email='company@example.com',
+            phone='+1234567890',
+            address='123 Test Street'
+        )
+        InventoryStatus.get_default_statuses()
+        self.in_stock = InventoryStatus.objects.get(name='in_stock')
+        self.layout = InventoryLayout.objects.create(
+            user=self.user,
+            name='Default Layout',
+            is_default=True,
+            columns=InventoryLayout().get_default_columns()
+        )
+
+    def create_item(self, sku, quantity=10, unit_price=2.5, **kwargs):
+        return InventoryItem.objects.create(
+            user=self.user,
+            layout=self.layout,
+            product_name=kwargs.pop('product_name', f'Product {sku}'),
+            sku_code=sku,
+            status=kwargs.pop('status', self.in_stock),
+            data={'quantity': quantity, 'unit_price': unit_price, **kwargs.pop('data', {})},
+            **kwargs
+        )
+
+
+class InventoryItemTotalsTest(InventoryTestMixin, TestCase):
+    def test_totals_calculated_on_create(self):
+        """Test calculated_data is filled in when the item is first saved"""
+        item = self.create_item('SKU-1', quantity=4, unit_price=2.5)
+        item.refresh_from_db()
+        self.assertEqual(item.calculated_data['total'], 10.0)
+
+    def test_totals_recalculated_when_data_changes(self):
+        """Test calculated_data follows changes to data"""
+        item = self.create_item('SKU-1', quantity=4, unit_price=2.5)
+        item = InventoryItem.objects.get(pk=item.pk)
+        item.data['quantity'] = 6
+        item.save(update_fields=['data'])
+        item.refresh_from_db()
+        self.assertEqual(item.calculated_data['total'], 15.0)
+
+    def test_save_clears_cache_in_one_call(self):
+        """Test saving an item clears all of its cache keys with one shared-cache query"""
+        item = self.create_item('SKU-1')
+        cache.set(f'inventory_item_{item.pk}', 'stale')
+        with CaptureQueriesContext(connection) as ctx:
+            with self.captureOnCommitCallbacks(execute=True):
+                item.save()
+        cache_queries = [q for q in ctx.captured_queries if 'django_cache' in q['sql']]
+        self.assertEqual(len(cache_queries), 1)
+        self.assertIsNone(cache.get(f'inventory_item_{item.pk}'))
+
+    def test_typed_columns_follow_data(self):
+        """Test quantity, unit price and total columns are synced from data"""
+        item = self.create_item('SKU-1', data={'quantity': None, 'Quantity': '4 pcs', 'unit_price': '₦2.50'})
+        item.refresh_from_db()
+        self.assertEqual(item.quantity_amount, Decimal('4.00'))
+        self.assertEqual(item.unit_price_amount, Decimal('2.50'))
+        self.assertEqual(item.total_amount, Decimal('10.00'))
+
+        item.data['Quantity'] = 6
+        item.save(update_fields=['data'])
+        self.assertEqual(
+            InventoryItem.objects.filter(quantity_amount__gte=5, total_amount=15).count(), 1
+        )
+
+    def test_items_without_quantity_are_not_low_stock(self):
+        """Test items with no quantity in data have no typed quantity and are not counted as low stock"""
+        item = self.create_item('SKU-1', data={'quantity': '', 'unit_price': 'n/a'})
+        self.create_item('SKU-2', quantity=2)
+        item.refresh_from_db()
+        self.assertIsNone(item.quantity_amount)
+        self.assertIsNone(item.unit_price_amount)
+        self.assertEqual(inventory_stats(self.user)['low_stock_count'], 1)
+
+
+
+class FormulaEngineTest(InventoryTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.layout.calculation_rules = {'rules': [
+            {
+                'enabled': True,
+                'output_field': 'total_with_tax',
+                'input_fields': ['quantity', 'unit_price', 'tax_rate'],
+                'formula': '{quantity} * {unit_price} * (1 + {tax_rate} / 100)',
+            },
+            {
+                'enabled': True,
+                'output_field': 'per_unit',
+                'input_fields': ['unit_price', 'pack_size'],
+                'formula': '{unit_price} / {pack_size}',
+            },
+        ]}
+        self.layout.save()
+
+    def test_formula_rejects_non_arithmetic(self):
+        """Test only numbers, placeholders and arithmetic operators compile"""
+        self.assertEqual(CompiledFormula('{a} * 2 + {b}').evaluate({'a': 3, 'b': 1}), 7)
+        for formula in ['__import__("os")', '{a}.real', 'abs({a})', '"x" * 3', '']:
+            with self.assertRaises(FormulaError):
+                CompiledFormula(formula)
+
+    def test_huge_power_is_refused(self):
+        """Test an oversized power fails at once instead of hanging the worker"""
+        formula = CompiledFormula('{a} + 9 ** 9 ** 9')
+        with self.assertRaises(OverflowError):
+            formula.evaluate({'a': 1.0})
+        with self.assertRaises(OverflowError):
+            CompiledFormula('{a} ** {a} ** {a}').evaluate({'a': 9})
+
+        rule = compile_rules([{
+            'enabled': True, 'output_field': 'x', 'input_fields': ['a'], 'formula': '{a} + 9 ** 9 ** 9',
+        }])[0]
+        self.assertIsNone(rule.evaluate({'a': 1.0}))
+
+    def test_rules_applied_on_save(self):
+        """Test compiled rules fill calculated_data and division by zero is skipped"""
+        item = self.create_item('SKU-1', quantity=4, unit_price=2.5, data={'tax_rate': '10%', 'pack_size': 0})
+        self.assertAlmostEqual(item.calculated_data['total_with_tax'], 11.0)
+        self.assertNotIn('per_unit', item.calculated_data)
+
+    def test_bulk_matches_single_item(self):
+        """Test the vectorized calculation gives the same result as compute_totals"""
+        items = [
+            self.create_item('SKU-1', quantity=4, unit_price=2.5, data={'tax_rate': 10, 'pack_size': 2}),
+            self.create_item('SKU-2', quantity='3 pcs', unit_price='₦1,000', data={'pack_size': 0}),
+            self.create_item('SKU-3', data={'quantity': '', 'unit_price': 'n/a'}),
+        ]
+        bulk = compute_totals_bulk(items, self.layout)
+        self.assertEqual(bulk, [item.compute_totals() for item in items])
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class InventoryListViewTest(InventoryTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = Client()
+        self.client.login(email='inventory@example.com', password='testpass123')
+
+    def test_list_is_read_only(self):
+        """Test the inventory list never writes to the database"""
+        for i in range(30):
+            self.create_item(f'SKU-{i}')
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('inventory:list'))
+
+        self.assertEqual(response.status_code, 200)
+        writes = [
+            q['sql'] for q in ctx.captured_queries
+            if q['sql'].lstrip().upper().startswith(('UPDATE', 'INSERT', 'DELETE'))
+            and 'inventory_' in q['sql']
+        ]
+        self.assertEqual(writes, [])
+        self.assertEqual(len(response.context['items']), 20)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class InventoryDashboardTest(InventoryTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = Client()
+        self.client.login(email='inventory@example.com', password='testpass123')
+
+    def test_dashboard_query_count_is_fixed(self):
+        """Test the dashboard runs the same number of queries whatever the inventory size"""
+        self.create_item('SKU-0')
+        # The first request loads the status registry and permission snapshot
+        self.client.get(reverse('inventory:dashboard'))
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(reverse('inventory:dashboard'))
+
+        for i in range(1, 20):
+            self.create_item(f'SKU-{i}', quantity=i)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(reverse('inventory:dashboard'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+        self.assertEqual(response.context['total_items'], 20)
+
+    def test_stats_endpoint(self):
+        """Test the JSON stats endpoint returns the aggregated statistics"""
+        self.create_item('SKU-1', quantity=4, unit_price=2.5)
+        self.create_item('SKU-2', quantity=10, unit_price=1, is_active=False)
+
+        response = self.client.get(reverse('inventory:ajax_dashboard_stats'))
+        stats = response.json()['stats']
+        self.assertEqual(stats['total_items'], 2)
+        self.assertEqual(stats['active_items'], 1)
+        self.assertEqual(stats['low_stock_count'], 1)
+        self.assertEqual(stats['total_value'], 20.0)
+        self.assertEqual(stats['status_stats']['in_stock']['count'], 2)
+
+class InventoryItemUpdateTest(InventoryTestMixin, TestCase):
+    def test_commit_updates_totals_status_and_logs(self):
+        """Test a unit of work flushes the item, transaction and log together"""
+        item = self.create_item('SKU-1', quantity=4, unit_price=2.5, data={'minimum_threshold': 2})
+
+        update = InventoryItemUpdate(item)
+        update.set('quantity', 1)
+        update.add_transaction(transaction_type='adjustment', quantity_change=-3)
+        update.add_log('stock_adjustment', 'Stock adjustment: set 1')
+        update.commit()
+
+        item.refresh_from_db()
+        self.assertEqual(item.calculated_data['total'], 2.5)
+        self.assertEqual(item.status.name, 'low_stock')
+        self.assertEqual(update.changes['quantity'], {'old': 4, 'new': 1})
+        self.assertEqual(InventoryTransaction.objects.filter(item=item).count(), 1)
+        self.assertEqual(InventoryLog.objects.filter(item=item, log_type='stock_adjustment').count(), 1)
+
+    def test_form_edit_writes_item_once(self):
+        """Test saving the item form goes through one unit of work with a single item UPDATE and log"""
+        item = self.create_item('SKU-1', quantity=4, unit_price=2.5)
+        form = InventoryItemForm({
+            'product_name': 'Renamed',
+            'sku_code': 'SKU-1',
+            'status': self.in_stock.pk,
+            'is_active': True,
+            'quantity_in_stock': '8',
+            'unit_price': '2.50',
+        }, instance=item, user=self.user, layout=self.layout)
+        self.assertTrue(form.is_valid(), form.errors)
+
+        with CaptureQueriesContext(connection) as ctx:
+            item = form.save()
+
+        item_updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "inventory_inventoryitem"')]
+        self.assertEqual(len(item_updates), 1)
+        item.refresh_from_db()
+        self.assertEqual(item.calculated_data['total'], 20.0)
+        log = InventoryLog.objects.get(item=item)
+        self.assertEqual(log.log_type, 'update')
+        self.assertIn('Product name: Product SKU-1 → Renamed', log.description)
+
+    def test_form_create_logs_creation(self):
+        """Test a new item saved through the form is logged as created"""
+        form = InventoryItemForm({
+            'product_name': 'New',
+            'sku_code': 'SKU-NEW',
+            'status': self.in_stock.pk,
+            'is_active': True,
+            'quantity_in_stock': '3',
+            'unit_price': '2',
+        }, user=self.user, layout=self.layout)
+        self.assertTrue(form.is_valid(), form.errors)
+        item = form.save()
+
+        self.assertEqual(item.calculated_data['total'], 6.0)
+        self.assertEqual(list(InventoryLog.objects.filter(item=item).values_list('log_type', flat=True)), ['create'])
+
+    def test_related_documents_marked_in_bulk(self):
+        """Test exports are flagged for refresh without a save per export"""
+        item = self.create_item('SKU-1')
+        for _ in range(5):
+            InventoryExport.objects.create(user=self.user, layout=self.layout, format='csv')
+
+        update = InventoryItemUpdate(item).set('unit_price', 3)
+        with CaptureQueriesContext(connection) as ctx:
+            update.commit()
+
+        export_updates = [
+            q for q in ctx.captured_queries
+            if q['sql'].startswith('UPDATE "inventory_inventoryexport"')
+        ]
+        self.assertEqual(len(export_updates), 1)
+        self.assertTrue(all(
+            export.export_settings.get('needs_refresh')
+            for export in InventoryExport.objects.filter(layout=self.layout)
+        ))
+
+
+
+class StatusRegistryTest(InventoryTestMixin, TestCase):
+    def test_lookups_do_not_query(self):
+        """Test statuses are served from memory once loaded"""
+        status_registry.get('in_stock')
+        with self.assertNumQueries(0):
+            self.assertEqual(status_registry.get('in_stock'), self.in_stock)
+            self.assertEqual(status_registry.resolve(str(self.in_stock.pk)), self.in_stock)
+            self.assertIn(self.in_stock, status_registry.active())
+
+    def test_saving_a_status_invalidates(self):
+        """Test changes to a status are picked up on the next lookup"""
+        status_registry.get('in_stock')
+        self.in_stock.display_name = 'Available'
+        self.in_stock.save()
+        self.assertEqual(status_registry.get('in_stock').display_name, 'Available')
+
+        self.in_stock.is_active = False
+        self.in_stock.save()
+        self.assertNotIn('in_stock', [status.name for status in status_registry.active()])
+
+    def test_other_process_changes_seen_next_request(self):
+        """Test the shared version is read once per request, not per lookup"""
+        status_registry.get('in_stock')
+        InventoryStatus.objects.filter(pk=self.in_stock.pk).update(display_name='Available')
+        # Another process saved the status and bumped the version
+        cache.set(StatusRegistry.VERSION_KEY, 'changed-elsewhere', timeout=None)
+        self.assertEqual(status_registry.get('in_stock').display_name, self.in_stock.display_name)
+
+        request_started.send(sender=self.__class__)
+        self.assertEqual(status_registry.get('in_stock').display_name, 'Available')
+
+class InventoryBulkOperationTest(InventoryTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.damaged = InventoryStatus.objects.get(name='damaged')
+        # Saving the statuses in setUp invalidated the registry, reload it once
+        status_registry.all()
+
+    def bulk_update_queries(self, count, offset):
+        items = [self.create_item(f'SKU-{offset + i}') for i in range(count)]
+        with CaptureQueriesContext(connection) as ctx:
+            InventoryBulkOperation(self.user, [item.pk for item in items]).update_status(self.damaged)
+        return len(ctx.captured_queries)
+
+    def test_status_update_query_count_is_constant(self):
+        """Test bulk status changes use the same number of queries for 2 or 25 items"""
+        self.assertEqual(self.bulk_update_queries(2, 0), self.bulk_update_queries(25, 100))
+        self.assertEqual(InventoryItem.objects.filter(status=self.damaged).count(), 27)
+        self.assertEqual(InventoryTransaction.objects.filter(transaction_type='status_change').count(), 27)
+
+    def test_results_per_item(self):
+        """Test every requested id gets a result, including missing ones"""
+        item = self.create_item('SKU-1')
+        results = InventoryBulkOperation(self.user, [item.pk, 999999]).update_status(self.damaged)
+        self.assertEqual(results[0], {
+            'id': item.pk, 'success': True, 'old_status': 'in_stock', 'new_status': 'damaged'
+        })
+        self.assertFalse(results[1]['success'])
+
+    def bulk_delete_queries(self, count, offset):
+        items = [self.create_item(f'SKU-{offset + i}') for i in range(count)]
+        with CaptureQueriesContext(connection) as ctx:
+            with self.captureOnCommitCallbacks(execute=True):
+                InventoryBulkOperation(self.user, [item.pk for item in items]).delete()
+        cache_deletes = [q for q in ctx.captured_queries if q['sql'].startswith('DELETE FROM "django_cache"')]
+        self.assertEqual(len(cache_deletes), 1)
+        return len(ctx.captured_queries)
+
+    def test_delete_query_count_is_constant(self):
+        """Test bulk delete uses the same number of queries for 2 or 20 items"""
+        self.assertEqual(self.bulk_delete_queries(2, 0), self.bulk_delete_queries(20, 100))
+        self.assertFalse(InventoryItem.objects.filter(user=self.user).exists())
+
+    def test_delete_keeps_logs(self):
+        """Test bulk delete removes the items but keeps one delete log per item"""
+        items = [self.create_item(f'SKU-{i}') for i in range(3)]
+        results = InventoryBulkOperation(self.user, [item.pk for item in items]).delete()
+        self.assertTrue(all(result['success'] for result in results))
+        self.assertFalse(InventoryItem.objects.filter(user=self.user).exists())
+        self.assertEqual(InventoryLog.objects.filter(log_type='delete').count(), 3)
+
+class InventoryImporterTest(InventoryTestMixin, TestCase):
+    def test_import_creates_and_updates_in_bulk(self):
+        """Test new SKUs are created, existing SKUs updated and bad rows reported"""
+        existing = self.create_item('SKU-1', quantity=1, unit_price=1, data={'supplier': 'Acme'})
+        df = pd.DataFrame({
+            'Product Name': ['Widget', 'Gadget', ''],
+            'SKU': ['SKU-1', 'SKU-2', 'SKU-3'],
+            'Quantity': ['5', '2 pcs', '1'],
+            'Price': ['₦10.50', '4', '1'],
+            'Status': ['In Stock', 'low_stock', 'in_stock'],
+        })
+        importer = InventoryImporter(self.user, self.layout, chunk_size=1)
+        mapping = importer.detect_column_mapping(df.columns)
+
+        result = importer.run(df, mapping)
+
+        self.assertEqual((result.created, result.updated, result.failed), (1, 1, 1))
+        self.assertIn('Row 3', result.errors[0])
+        existing.refresh_from_db()
+        self.assertEqual(existing.product_name, 'Widget')
+        self.assertEqual(existing.data['supplier'], 'Acme')
+        self.assertEqual(existing.calculated_data['total'], 52.5)
+        created = InventoryItem.objects.get(user=self.user, sku_code='SKU-2')
+        self.assertEqual(created.status.name, 'low_stock')
+        self.assertEqual(created.calculated_data['total'], 8.0)
+        self.assertEqual(InventoryLog.objects.filter(log_type='import').count(), 1)
+
+
+class InventoryExportTest(InventoryTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_item('SKU-1', quantity=4, unit_price=2.5)
+        self.create_item('SKU-2', quantity=1, unit_price=10)
+        self.items = InventoryItem.objects.filter(user=self.user, layout=self.layout)
+
+    def test_csv_export_streams_rows(self):
+        """Test the CSV export is streamed and does not touch the items"""
+        with CaptureQueriesContext(connection) as ctx:
+            response = export_to_csv(self.items, self.layout, 'inventory')
+            self.assertTrue(response.streaming)
+            content = b''.join(response.streaming_content).decode()
+
+        self.assertFalse(any(q['sql'].startswith('UPDATE') for q in ctx.captured_queries))
+        lines = content.strip().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertIn('Product Name', lines[0])
+        self.assertIn('SKU-2', lines[1])
+        self.assertIn('10.0', lines[2])
+
+    def test_excel_export_includes_totals(self):
+        """Test the write-only Excel export contains every row and the grand total"""
+        response = export_to_excel(self.items, self.layout, 'inventory', include_branding=False)
+        self.assertIn('inventory.xlsx', response['Content-Disposition'])
+
+        sheet = load_workbook(io.BytesIO(b''.join(response.streaming_content))).active
+        rows = list(sheet.values)
+        self.assertEqual(rows[1][2], 'SKU-2')
+        self.assertEqual(rows[3][0], 'Grand Total')
+        self.assertEqual(rows[3][-1], 20.0)
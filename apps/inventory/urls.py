@@ -30,6 +30,7 @@ urlpatterns = [
     path('templates/detail/<int:pk>/', views.template_detail, name='template_detail'),
     
     # AJAX endpoints for real-time updates
+    path('ajax/dashboard-stats/', views.ajax_dashboard_stats, name='ajax_dashboard_stats'),
     path('ajax/update-field/', views.ajax_update_field, name='ajax_update_field'),
     path('ajax/update-status/', views.ajax_update_status, name='ajax_update_status'),
     path('ajax/stock-adjustment/', views.ajax_stock_adjustment, name='ajax_stock_adjustment'),
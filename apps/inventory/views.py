@@ -36,6 +36,12 @@ from .forms import (
     # Legacy forms
     InventoryProductForm, InventoryCategoryForm
 )
+from .managers import InventoryItemUpdate, InventoryBulkOperation, LOW_STOCK_QUANTITY, inventory_stats, recalculate_items
+from .registry import status_registry
+from .formulas import CompiledFormula, FormulaError, parse_number
+from .importers import InventoryImporter
+from apps.core.exports import XlsxStream, csv_response, iter_values
+from apps.core.jobs import background_job
 
 
 @login_required
@@ -51,33 +57,17 @@ def inventory_dashboard(request):
         }
     )
     
-    # Get comprehensive statistics
-    total_items = InventoryItem.objects.filter(user=request.user).count()
-    active_items = InventoryItem.objects.filter(user=request.user, is_active=True).count()
-    
-    # Calculate total value
-    total_value = 0
-    if layout.supports_calculations():
-        items_with_totals = InventoryItem.objects.filter(user=request.user)
-        total_value = sum(item.total_value for item in items_with_totals)
-    
-    # Status statistics
-    status_stats = {}
-    for status in InventoryStatus.objects.filter(is_active=True):
-        count = InventoryItem.objects.filter(user=request.user, status=status).count()
-        status_stats[status.name] = {
-            'count': count,
-            'color': status.color,
-            'display_name': status.display_name
-        }
+    # All counts and totals come from one aggregation query
+    stats = inventory_stats(request.user)
+    if not layout.supports_calculations():
+        stats['total_value'] = 0
     
     # Low stock alerts (items with quantity <= 5)
     low_stock_items = InventoryItem.objects.filter(
         user=request.user,
-        is_active=True
-    ).filter(
-        Q(data__quantity__lte=5) | Q(data__Quantity__lte=5)
-    )[:10]
+        is_active=True,
+        quantity_amount__lte=LOW_STOCK_QUANTITY
+    ).select_related('status')[:10]
     
     # Recent activity
     recent_logs = InventoryLog.objects.filter(user=request.user)[:10]
@@ -86,11 +76,9 @@ def inventory_dashboard(request):
     user_layouts = InventoryLayout.objects.filter(user=request.user)
     
     context = {
+        **stats,
         'layout': layout,
-        'total_items': total_items,
-        'active_items': active_items,
-        'total_value': total_value,
-        'status_stats': status_stats,
+        'total_products': stats['total_items'],
         'low_stock_items': low_stock_items,
         'recent_logs': recent_logs,
         'user_layouts': user_layouts,
@@ -99,20 +87,19 @@ def inventory_dashboard(request):
     return render(request, 'inventory/dashboard.html', context)
 
 
+@login_required
+def ajax_dashboard_stats(request):
+    """Dashboard statistics as JSON for polling widgets"""
+    stats = inventory_stats(request.user)
+    layout = InventoryLayout.objects.filter(user=request.user, is_default=True).first()
+    if layout and not layout.supports_calculations():
+        stats['total_value'] = 0
+    return JsonResponse({'success': True, 'stats': stats})
+
+
 @login_required
 def inventory_list(request):
-    """List inventory items with filtering and search"""
-    # Clear any cached data to ensure fresh results
-    from django.core.cache import cache
-    # Clear specific cache keys instead of using delete_pattern
-    cache_keys_to_clear = [
-        'inventory_list_cache',
-        'inventory_dashboard_cache',
-        'inventory_export_cache',
-    ]
-    for key in cache_keys_to_clear:
-        cache.delete(key)
-    
+    """List inventory items with filtering and search (read-only)"""
     # Get layout
     layout_id = request.GET.get('layout')
     if layout_id:
@@ -164,9 +151,8 @@ def inventory_list(request):
             items = layout_items
         # If no items found with layout, show all items for the category regardless of layout
     
-    # Force recalculation for all items to ensure latest data
-    for item in items:
-        item.calculate_totals()
+    # Totals are kept up to date in calculated_data whenever an item's data
+    # changes, so the list only reads the current page and never writes.
     
     # Handle search and filtering
     search_form = InventorySearchForm(request.GET, user=request.user)
@@ -190,30 +176,22 @@ def inventory_list(request):
             items = items.filter(status=status)
         
         if min_quantity is not None:
-            items = items.filter(
-                Q(data__quantity__gte=min_quantity) | Q(data__Quantity__gte=min_quantity)
-            )
+            items = items.filter(quantity_amount__gte=min_quantity)
         
         if max_quantity is not None:
-            items = items.filter(
-                Q(data__quantity__lte=max_quantity) | Q(data__Quantity__lte=max_quantity)
-            )
+            items = items.filter(quantity_amount__lte=max_quantity)
         
         if min_price is not None:
-            items = items.filter(
-                Q(data__unit_price__gte=min_price) | Q(data__Unit_Price__gte=min_price)
-            )
+            items = items.filter(unit_price_amount__gte=min_price)
         
         if max_price is not None:
-            items = items.filter(
-                Q(data__unit_price__lte=max_price) | Q(data__Unit_Price__lte=max_price)
-            )
+            items = items.filter(unit_price_amount__lte=max_price)
         
         if is_active:
             items = items.filter(is_active=(is_active == 'true'))
     
     # Pagination
-    paginator = Paginator(items, 20)
+    paginator = Paginator(items.select_related('status'), 20)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
@@ -256,13 +234,11 @@ def inventory_list(request):
         'items': page_obj,
         'search_form': search_form,
         'grand_total': grand_total,
-        'statuses': InventoryStatus.objects.filter(is_active=True),
+        'statuses': status_registry.active(),
         'user_layouts': InventoryLayout.objects.filter(user=request.user),
         'total_items': items.count(),
         'active_items': items.filter(is_active=True).count(),
-        'low_stock_items': items.filter(
-            Q(data__quantity__lte=5) | Q(data__Quantity__lte=5)
-        ).count(),
+        'low_stock_items': items.filter(quantity_amount__lte=LOW_STOCK_QUANTITY).count(),
         'supports_calculations': layout.supports_calculations(),
         'calculation_fields': layout.get_calculation_fields(),
         'current_category': category if category_id else None,
@@ -294,21 +270,8 @@ def inventory_create(request):
         form = InventoryItemForm(request.POST, user=request.user, layout=layout)
         
         if form.is_valid():
-            item = form.save(commit=False)
-            item.user = request.user
-            item.layout = layout
-            item.save()
-            
-            # Trigger updates across all documents and templates
-            item.update_all_documents()
-            
-            # Log the creation
-            InventoryLog.objects.create(
-                user=request.user,
-                item=item,
-                log_type='create',
-                description=f'Created item: {item.product_name}'
-            )
+            # Saves the item, updates related documents and logs the creation
+            item = form.save()
             
             messages.success(request, f'Inventory item "{item.product_name}" created successfully! Quantity: {item.get_value("quantity")}, Unit Price: ₦{item.get_value("unit_price")}, Total: ₦{item.total_value}. You can now edit quantity and price directly in the table with real-time calculations.')
             
@@ -333,35 +296,9 @@ def inventory_update(request, pk):
     if request.method == 'POST':
         form = InventoryItemForm(request.POST, instance=item, user=request.user, layout=item.layout)
         if form.is_valid():
-            old_data = {
-                'product_name': item.product_name,
-                'data': item.data.copy(),
-            }
-            
+            # Saves the item, updates related documents and logs the changes
             item = form.save()
             
-            # Trigger updates across all documents and templates
-            item.update_all_documents()
-            
-            # Log the update
-            changes = []
-            if old_data['product_name'] != item.product_name:
-                changes.append(f'Product name: {old_data["product_name"]} → {item.product_name}')
-            
-            # Check for data changes
-            for key, new_value in item.data.items():
-                old_value = old_data['data'].get(key)
-                if old_value != new_value:
-                    changes.append(f'{key}: {old_value} → {new_value}')
-            
-            if changes:
-                InventoryLog.objects.create(
-                    user=request.user,
-                    item=item,
-                    log_type='update',
-                    description=f'Updated: {", ".join(changes)}'
-                )
-            
             messages.success(request, 'Inventory item updated successfully!')
             return redirect('inventory:list')
     else:
@@ -468,7 +405,10 @@ def ajax_update_field(request):
         value = data.get('value')
         field_type = data.get('field_type', 'text')
         
-        item = get_object_or_404(InventoryItem, pk=item_id, user=request.user)
+        item = get_object_or_404(
+            InventoryItem.objects.select_related('layout', 'status'),
+            pk=item_id, user=request.user
+        )
         
         # Sanitize and validate the value
         if field_type in ['number', 'decimal']:
@@ -480,58 +420,25 @@ def ajax_update_field(request):
                 })
             value = sanitized_value
         
-        # Update the field
-        item.set_value(field_name, value)
+        # Queue the change, its transaction record and log, then flush once
+        update = InventoryItemUpdate(item, user=request.user)
+        update.set(field_name, value)
+        change = update.changes[field_name]
+        value = change['new']
         
-        # Force recalculation of totals if this is a calculation-related field
-        calculated_data = {}
-        if item.layout.supports_calculations():
-            # Always recalculate when quantity or price fields change
-            if field_name.lower() in ['quantity', 'quantity_in_stock', 'unit_price', 'price']:
-                calculated_data = item.calculate_totals()
-            else:
-                calculated_data = item.calculate_totals()
-        
-        # Trigger updates across all documents and templates
-        item.update_all_documents()
-        
-        # Create transaction record - handle serialization
-        old_value = item.get_value(field_name)
-        # Convert various types for JSON serialization
-        if hasattr(old_value, 'as_tuple'):  # Check if it's a Decimal
-            old_value = float(old_value)
-        elif hasattr(old_value, 'isoformat'):  # Check if it's a date/datetime
-            old_value = old_value.isoformat()
-        if hasattr(value, 'as_tuple'):  # Check if it's a Decimal
-            value = float(value)
-        elif hasattr(value, 'isoformat'):  # Check if it's a date/datetime
-            value = value.isoformat()
-            
-        InventoryTransaction.objects.create(
-            user=request.user,
-            item=item,
+        update.add_transaction(
             transaction_type='field_update',
-            field_changes={field_name: {'old': old_value, 'new': value}},
+            field_changes={field_name: change},
             notes=f'Field {field_name} updated via inline editing'
         )
-        
-        # Log the field update - handle Decimal serialization
-        old_log_value = item.get_value(field_name)
-        new_log_value = value
-        
-        # Convert Decimal objects to float for JSON serialization
-        if hasattr(old_log_value, 'as_tuple'):  # Check if it's a Decimal
-            old_log_value = float(old_log_value)
-        if hasattr(new_log_value, 'as_tuple'):  # Check if it's a Decimal
-            new_log_value = float(new_log_value)
-            
-        InventoryLog.objects.create(
-            user=request.user,
-            item=item,
-            log_type='field_update',
-            description=f'Updated {field_name}: {value}',
-            details={'field_name': field_name, 'old_value': old_log_value, 'new_value': new_log_value}
+        update.add_log(
+            'field_update',
+            f'Updated {field_name}: {value}',
+            {'field_name': field_name, 'old_value': change['old'], 'new_value': value}
         )
+        update.commit()
+        
+        calculated_data = item.calculated_data if item.layout.supports_calculations() else {}
         
         return JsonResponse({
             'success': True,
@@ -564,7 +471,9 @@ def ajax_update_status(request):
         item = get_object_or_404(InventoryItem, pk=item_id, user=request.user)
         
         # Get status by ID
-        status = get_object_or_404(InventoryStatus, pk=status_id)
+        status = status_registry.get_by_id(status_id)
+        if status is None:
+            raise Http404('Status not found')
         
         old_status = item.status
         print(f"DEBUG: Old status - {old_status.name} ({old_status.display_name})")
@@ -576,22 +485,9 @@ def ajax_update_status(request):
         # Trigger updates across all documents and templates (skip automatic status update)
         item.update_all_documents(skip_status_update=True)
         
-        # Force refresh of all related data
+        # Saving cleared the item's cache keys, the old status changed as well
         from django.core.cache import cache
-        cache_keys_to_clear = [
-            f'inventory_item_{item.id}',
-            f'inventory_user_{item.user.id}',
-            f'inventory_layout_{item.layout.id}',
-            f'inventory_status_{item.status.id}',
-            f'inventory_status_{old_status.id}',
-            f'inventory_category_{item.data.get("category", "")}',
-            'inventory_list_cache',
-            'inventory_dashboard_cache',
-            'inventory_export_cache',
-        ]
-        
-        for key in cache_keys_to_clear:
-            cache.delete(key)
+        cache.delete(f'inventory_status_{old_status.id}')
         
         print(f"DEBUG: Status saved successfully for item {item_id}")
         print(f"DEBUG: Cleared cache keys for fresh data across all views")
@@ -648,7 +544,10 @@ def ajax_stock_adjustment(request):
         quantity = extract_numeric_value(data.get('quantity', 0))
         reason = data.get('reason', '')
         
-        item = get_object_or_404(InventoryItem, pk=item_id, user=request.user)
+        item = get_object_or_404(
+            InventoryItem.objects.select_related('layout', 'status'),
+            pk=item_id, user=request.user
+        )
         
         old_quantity = item.quantity
         
@@ -661,30 +560,21 @@ def ajax_stock_adjustment(request):
         else:
             raise ValueError('Invalid adjustment type')
         
-        # Update quantity
-        item.set_value('quantity', new_quantity)
-        
-        # Update all related documents and calculations
-        item.update_all_documents()
-        
-        # Create transaction log
-        InventoryTransaction.objects.create(
-            user=request.user,
-            item=item,
+        # Update quantity, related documents and logs in one transaction
+        update = InventoryItemUpdate(item, user=request.user)
+        update.set('quantity', new_quantity)
+        update.add_transaction(
             transaction_type='adjustment',
             quantity_change=new_quantity - old_quantity,
             quantity_before=old_quantity,
             quantity_after=new_quantity,
             notes=reason
         )
-        
-        # Log the adjustment
-        InventoryLog.objects.create(
-            user=request.user,
-            item=item,
-            log_type='stock_adjustment',
-            description=f'Stock adjustment: {adjustment_type} {quantity} ({reason})'
+        update.add_log(
+            'stock_adjustment',
+            f'Stock adjustment: {adjustment_type} {quantity} ({reason})'
         )
+        update.commit()
         
         return JsonResponse({
             'success': True,
@@ -845,6 +735,7 @@ def layout_detail(request, pk):
 
 # Import/Export views
 @login_required
+@background_job('Inventory import', methods=('POST',))
 def inventory_import(request):
     """Import inventory from Excel/CSV with smart column detection"""
     if request.method == 'POST':
@@ -864,33 +755,9 @@ def inventory_import(request):
                     messages.error(request, 'Unsupported file format. Please use Excel (.xlsx, .xls) or CSV files.')
                     return redirect('inventory:import')
                 
-                # Read the file
-                if file_type == 'excel':
-                    df = pd.read_excel(uploaded_file)
-                else:
-                    df = pd.read_csv(uploaded_file)
-                
-                # Auto-detect columns and create mapping
-                column_mapping = {}
-                detected_columns = []
-                
-                for col in df.columns:
-                    col_lower = col.lower().strip()
-                    if any(keyword in col_lower for keyword in ['product', 'name', 'item']):
-                        column_mapping[col] = 'product_name'
-                        detected_columns.append(col)
-                    elif any(keyword in col_lower for keyword in ['sku', 'code', 'id']):
-                        column_mapping[col] = 'sku_code'
-                        detected_columns.append(col)
-                    elif any(keyword in col_lower for keyword in ['quantity', 'qty', 'stock']):
-                        column_mapping[col] = 'quantity'
-                        detected_columns.append(col)
-                    elif any(keyword in col_lower for keyword in ['price', 'cost', 'unit']):
-                        column_mapping[col] = 'unit_price'
-                        detected_columns.append(col)
-                    elif any(keyword in col_lower for keyword in ['status']):
-                        column_mapping[col] = 'status'
-                        detected_columns.append(col)
+                # Read the file and auto-detect the column mapping
+                df = InventoryImporter.read_file(uploaded_file, file_type)
+                column_mapping = InventoryImporter.detect_column_mapping(df.columns)
                 
                 # Create import record
                 import_record = ImportedInventoryFile.objects.create(
@@ -905,86 +772,14 @@ def inventory_import(request):
                     status='processing'
                 )
                 
-                # Process the data
-                imported_count = 0
-                failed_count = 0
-                errors = []
-                
-                for index, row in df.iterrows():
-                    try:
-                        # Extract values using mapping
-                        product_name = row.get(column_mapping.get('product_name', ''), '')
-                        sku_code = row.get(column_mapping.get('sku_code', ''), '')
-                        quantity = row.get(column_mapping.get('quantity', ''), 0)
-                        unit_price = row.get(column_mapping.get('unit_price', ''), 0)
-                        status_name = row.get(column_mapping.get('status', ''), 'in_stock')
-                        
-                        # Validate required fields
-                        if not product_name or not sku_code:
-                            failed_count += 1
-                            errors.append(f"Row {index + 1}: Missing product name or SKU")
-                            continue
-                        
-                        # Get or create status
-                        status, _ = InventoryStatus.objects.get_or_create(
-                            name=status_name,
-                            defaults={'display_name': status_name.replace('_', ' ').title()}
-                        )
-                        
-                        # Check if item already exists
-                        existing_item = InventoryItem.objects.filter(
-                            user=request.user,
-                            sku_code=sku_code
-                        ).first()
-                        
-                        if existing_item:
-                            # Update existing item
-                            existing_item.product_name = product_name
-                            existing_item.set_value('quantity', quantity)
-                            existing_item.set_value('unit_price', unit_price)
-                            existing_item.status = status
-                            existing_item.save()
-                        else:
-                            # Create new item
-                            item = InventoryItem.objects.create(
-                                user=request.user,
-                                layout=layout,
-                                product_name=product_name,
-                                sku_code=sku_code,
-                                status=status,
-                                data={
-                                    'quantity': quantity,
-                                    'unit_price': unit_price
-                                }
-                            )
-                        
-                        imported_count += 1
-                        
-                    except Exception as e:
-                        failed_count += 1
-                        errors.append(f"Row {index + 1}: {str(e)}")
-                
-                # Update import record
-                import_record.imported_rows = imported_count
-                import_record.failed_rows = failed_count
-                import_record.error_log = '\n'.join(errors)
-                import_record.status = 'completed'
-                import_record.completed_at = timezone.now()
-                import_record.save()
-                
-                # Log the import
-                InventoryLog.objects.create(
-                    user=request.user,
-                    layout=layout,
-                    log_type='import',
-                    description=f'Imported {imported_count} items from {uploaded_file.name}',
-                    details={
-                        'file_name': uploaded_file.name,
-                        'imported_count': imported_count,
-                        'failed_count': failed_count,
-                        'total_rows': len(df)
-                    }
+                # Upsert all rows in chunks; per-row errors go to the import record
+                job = getattr(request, 'background_job', None)
+                progress = (lambda done, total: job.set_progress(done * 100 // max(total, 1))) if job else None
+                result = InventoryImporter(request.user, layout).run(
+                    df, column_mapping, import_record, progress=progress
                 )
+                imported_count = result.imported
+                failed_count = result.failed
                 
                 if imported_count > 0:
                     messages.success(request, f'Successfully imported {imported_count} items!')
@@ -1012,6 +807,7 @@ def inventory_import(request):
 
 
 @login_required
+@background_job('Inventory export', methods=('POST',))
 def inventory_export(request):
     """Export inventory to Excel/PDF with branding and calculations"""
     if request.method == 'POST':
@@ -1048,10 +844,10 @@ def inventory_export(request):
                     items = items.filter(data__quantity_in_stock__lte=form.cleaned_data['max_quantity'])
                 
                 if form.cleaned_data.get('min_price'):
-                    items = items.filter(data__unit_price__gte=form.cleaned_data['min_price'])
+                    items = items.filter(unit_price_amount__gte=form.cleaned_data['min_price'])
                 
                 if form.cleaned_data.get('max_price'):
-                    items = items.filter(data__unit_price__lte=form.cleaned_data['max_price'])
+                    items = items.filter(unit_price_amount__lte=form.cleaned_data['max_price'])
                 
                 if form.cleaned_data.get('date_from'):
                     items = items.filter(created_at__gte=form.cleaned_data['date_from'])
@@ -1094,7 +890,9 @@ def inventory_export(request):
     # Calculate initial summary statistics
     if default_layout:
         total_items = InventoryItem.objects.filter(user=request.user, layout=default_layout).count()
-        total_value = sum(item.total_value for item in InventoryItem.objects.filter(user=request.user, layout=default_layout))
+        total_value = InventoryItem.objects.filter(user=request.user, layout=default_layout).aggregate(
+            total=Sum('total_amount')
+        )['total'] or 0
         
         # Count unique categories from data field
         categories = 0
@@ -1132,23 +930,68 @@ def inventory_export(request):
     return render(request, 'inventory/inventory_export.html', context)
 
 
+EXPORT_VALUE_FIELDS = [
+    'product_name', 'sku_code', 'status__display_name', 'data', 'calculated_data',
+    'is_active', 'created_at', 'updated_at',
+]
+
+EXPORT_COLUMN_WIDTHS = {
+    'serial_number': 12,
+    'product_name': 30,
+    'sku_code': 18,
+    'status': 18,
+}
+
+
+def get_export_columns(layout, include_calculations=True):
+    """Visible layout columns that are written to exports"""
+    columns = []
+    for column in layout.get_visible_columns():
+        if column.get('name') == 'actions':
+            continue
+        if not include_calculations and column.get('name') == 'total':
+            continue
+        columns.append(column)
+    return columns
+
+
+def get_export_value(row, field_name):
+    """Value of a field for an exported values() row, mirroring InventoryItem.get_value"""
+    data = row['data'] or {}
+    if field_name == 'status':
+        return row['status__display_name']
+    if field_name == 'total':
+        return (row['calculated_data'] or {}).get('total', 0)
+    if field_name == 'quantity':
+        return InventoryItem._extract_number(data.get('quantity') or data.get('Quantity')) or 0
+    if field_name == 'unit_price':
+        return InventoryItem._extract_number(data.get('unit_price') or data.get('Unit Price')) or 0
+    if field_name in ['created_at', 'updated_at']:
+        # Spreadsheets cannot store timezone-aware datetimes
+        return timezone.localtime(row[field_name]).replace(tzinfo=None)
+    if field_name in row:
+        return row[field_name]
+
+    value = data.get(field_name, '')
+    if isinstance(value, dict) and 'id' in value and 'name' in value:
+        return value['name']
+    if isinstance(value, str) and field_name in ['expiry_date', 'created_date', 'updated_date']:
+        try:
+            from datetime import datetime
+            return datetime.fromisoformat(value).date()
+        except (ValueError, TypeError):
+            return value
+    return value
+
+
 def export_to_excel(items, layout, filename, include_calculations=True, include_branding=True):
     """Export inventory to Excel with formatting and company branding"""
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-    from openpyxl.utils import get_column_letter
-    from openpyxl.drawing.image import Image as XLImage
     import os
-    
-    # Force recalculation for all items to ensure latest data
-    for item in items:
-        item.calculate_totals()
-        item.refresh_from_db()
-    
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Inventory"
-    
+
+    columns = get_export_columns(layout, include_calculations)
+    headers = [column.get('display_name', column.get('name')) for column in columns]
+    field_names = [column.get('name') for column in columns]
+
     # Get company profile for branding
     company_profile = None
     if include_branding:
@@ -1156,32 +999,38 @@ def export_to_excel(items, layout, filename, include_calculations=True, include_
             company_profile = layout.user.company_profile
         except:
             pass
-    
+    currency_symbol = company_profile.currency_symbol if company_profile else '₦'
+    currency_format = f'"{currency_symbol}"#,##0.00'
+
+    # Write-only sheets cannot be auto-sized afterwards, so widths are fixed up front
+    workbook = XlsxStream('Inventory', widths=[
+        EXPORT_COLUMN_WIDTHS.get(name, 18) for name in field_names
+    ])
+    ws = workbook.sheet
+
     # Add branding header if requested
     if include_branding and company_profile:
-        # Add company logo if available
-        logo_path = None
+        prefix = []
         if company_profile.logo and os.path.exists(company_profile.logo.path):
             try:
-                logo_path = company_profile.logo.path
                 # Add logo to Excel (positioned at A1)
-                img = XLImage(logo_path)
+                img = XLImage(company_profile.logo.path)
                 img.width = 100
                 img.height = 60
                 ws.add_image(img, 'A1')
                 # Adjust row height to accommodate logo
                 ws.row_dimensions[1].height = 50
+                prefix = [None]
             except:
                 pass
-        
+
         # Company name and details
-        company_name_cell = ws['B1'] if logo_path else ws['A1']
-        company_name_cell.value = company_profile.company_name
-        company_name_cell.font = Font(size=18, bold=True, color="2E86AB")
-        company_name_cell.alignment = Alignment(horizontal='left', vertical='center')
-        
-        # Company details
-        details_row = 2
+        workbook.append(prefix + [workbook.cell(
+            company_profile.company_name,
+            font=Font(size=18, bold=True, color="2E86AB"),
+            alignment=Alignment(horizontal='left', vertical='center'),
+        )])
+
         company_details = []
         if company_profile.address:
             company_details.append(company_profile.address)
@@ -1191,276 +1040,112 @@ def export_to_excel(items, layout, filename, include_calculations=True, include_
             company_details.append(f"Email: {company_profile.email}")
         if company_profile.website:
             company_details.append(f"Website: {company_profile.website}")
-        
+
         if company_details:
-            details_cell = ws[f'B{details_row}'] if logo_path else ws[f'A{details_row}']
-            details_cell.value = " | ".join(company_details)
-            details_cell.font = Font(size=10, color="666666")
-            details_cell.alignment = Alignment(horizontal='left', vertical='center')
-            details_row += 1
-        
+            workbook.append(prefix + [workbook.cell(
+                " | ".join(company_details),
+                font=Font(size=10, color="666666"),
+                alignment=Alignment(horizontal='left', vertical='center'),
+            )])
+
         # Add export info
-        export_info_row = details_row + 1
-        export_info_cell = ws[f'B{export_info_row}'] if logo_path else ws[f'A{export_info_row}']
-        export_info_cell.value = f"Inventory Export Report - Generated on {timezone.now().strftime('%B %d, %Y at %H:%M')}"
-        export_info_cell.font = Font(size=12, bold=True, italic=True, color="2E86AB")
-        export_info_cell.alignment = Alignment(horizontal='left', vertical='center')
-        
-        row_offset = export_info_row + 2
-    else:
-        row_offset = 1
-    
+        workbook.append([])
+        workbook.append(prefix + [workbook.cell(
+            f"Inventory Export Report - Generated on {timezone.now().strftime('%B %d, %Y at %H:%M')}",
+            font=Font(size=12, bold=True, italic=True, color="2E86AB"),
+            alignment=Alignment(horizontal='left', vertical='center'),
+        )])
+        workbook.append([])
+
     # Add headers
-    headers = []
-    for column in layout.get_visible_columns():
-        if column.get('name') == 'actions':
-            continue
-        if not include_calculations and column.get('name') == 'total':
-            continue
-        headers.append(column.get('display_name', column.get('name')))
-    
-    # Style for headers
-    header_font = Font(bold=True, color="FFFFFF", size=11)
-    header_fill = PatternFill(start_color="2E86AB", end_color="2E86AB", fill_type="solid")
-    header_alignment = Alignment(horizontal='center', vertical='center')
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=row_offset, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-        cell.border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-    
-    # Add data with enhanced styling
-    currency_symbol = company_profile.currency_symbol if company_profile else '₦'
-    
-    for row, item in enumerate(items, row_offset + 1):
-        col = 1
-        for column in layout.get_visible_columns():
-            if column.get('name') == 'actions':
-                continue
-            if not include_calculations and column.get('name') == 'total':
-                continue
-            
-            field_name = column.get('name')
-            if field_name == 'serial_number':
-                value = row - row_offset  # Serial number based on row position
-            elif field_name == 'product_name':
-                value = item.product_name
-            elif field_name == 'sku_code':
-                value = item.sku_code
-            elif field_name == 'status':
-                value = item.status.display_name
-            elif field_name == 'total':
-                # Use company currency symbol if available
-                currency_symbol = company_profile.currency_symbol if company_profile else '₦'
-                # Only apply fallback for problematic symbols, otherwise use the actual symbol
-                if currency_symbol == '₦':
-                    # Try to use the actual Naira symbol, fallback to 'N' only if needed
-                    try:
-                        # Test if the symbol can be properly encoded
-                        test_str = f"{currency_symbol}1000.00"
-                        test_str.encode('utf-8')
-                        # If no error, use the actual symbol
-                        currency_symbol = '₦'
-                    except UnicodeEncodeError:
-                        currency_symbol = 'N'  # Fallback only if encoding fails
-                value = f"{currency_symbol}{item.total_value:,.2f}"
-            elif field_name == 'unit_price':
-                # Use company currency symbol if available
-                currency_symbol = company_profile.currency_symbol if company_profile else '₦'
-                # Only apply fallback for problematic symbols, otherwise use the actual symbol
-                if currency_symbol == '₦':
-                    # Try to use the actual Naira symbol, fallback to 'N' only if needed
-                    try:
-                        # Test if the symbol can be properly encoded
-                        test_str = f"{currency_symbol}1000.00"
-                        test_str.encode('utf-8')
-                        # If no error, use the actual symbol
-                        currency_symbol = '₦'
-                    except UnicodeEncodeError:
-                        currency_symbol = 'N'  # Fallback only if encoding fails
-                unit_price = item.data.get('unit_price', 0)
-                value = f"{currency_symbol}{unit_price:,.2f}"
-            else:
-                value = item.get_value(field_name)
-            
-            cell = ws.cell(row=row, column=col, value=value)
-            
-            # Apply alternating row colors
-            if (row - row_offset) % 2 == 0:
-                cell.fill = PatternFill(start_color="F8F9FA", end_color="F8F9FA", fill_type="solid")
-            
+    thin = Side(style='thin')
+    workbook.append_header(
+        headers,
+        font=Font(bold=True, color="FFFFFF", size=11),
+        fill=PatternFill(start_color="2E86AB", end_color="2E86AB", fill_type="solid"),
+        alignment=Alignment(horizontal='center', vertical='center'),
+        border=Border(left=thin, right=thin, top=thin, bottom=thin),
+    )
+
+    # Add data with enhanced styling; totals are accumulated while streaming
+    light = Side(style='thin', color="CCCCCC")
+    cell_border = Border(left=light, right=light, top=light, bottom=light)
+    stripe_fill = PatternFill(start_color="F8F9FA", end_color="F8F9FA", fill_type="solid")
+    center = Alignment(horizontal='center')
+    bold = Font(bold=True)
+
+    item_count = 0
+    total_value = 0
+    for index, row in enumerate(iter_values(items, *EXPORT_VALUE_FIELDS), 1):
+        item_count = index
+        total_value += get_export_value(row, 'total') or 0
+
+        cells = []
+        for field_name in field_names:
+            value = index if field_name == 'serial_number' else get_export_value(row, field_name)
+            cell = workbook.cell(
+                value,
+                fill=stripe_fill if index % 2 == 0 else None,
+                border=cell_border,
+            )
             # Format numbers and currency
-            if field_name in ['quantity']:
+            if field_name == 'quantity':
                 cell.number_format = '#,##0.00'
             elif field_name in ['unit_price', 'total']:
-                cell.number_format = f'"{currency_symbol}"#,##0.00'
+                cell.number_format = currency_format
             elif field_name == 'serial_number':
-                cell.alignment = Alignment(horizontal='center')
-                cell.font = Font(bold=True)
-            
-            # Add borders
-            cell.border = Border(
-                left=Side(style='thin', color="CCCCCC"),
-                right=Side(style='thin', color="CCCCCC"),
-                top=Side(style='thin', color="CCCCCC"),
-                bottom=Side(style='thin', color="CCCCCC")
-            )
-            
-            col += 1
-    
+                cell.alignment = center
+                cell.font = bold
+            cells.append(cell)
+        workbook.append(cells)
+
     # Add grand total if calculations are included
-    if include_calculations and layout.supports_calculations():
-        total_row = row_offset + len(items) + 1
-        
-        # Style for total row
+    show_totals = include_calculations and layout.supports_calculations()
+    if show_totals:
         total_font = Font(bold=True, size=11)
         total_fill = PatternFill(start_color="E9ECEF", end_color="E9ECEF", fill_type="solid")
-        
-        # Total label
-        total_label_cell = ws.cell(row=total_row, column=1, value="Grand Total")
-        total_label_cell.font = total_font
-        total_label_cell.fill = total_fill
-        
-        # Total value
-        total_value = sum(item.total_value for item in items)
-        total_value_cell = ws.cell(row=total_row, column=len(headers), value=total_value)
-        total_value_cell.font = total_font
-        total_value_cell.fill = total_fill
-        total_value_cell.number_format = f'"{currency_symbol}"#,##0.00'
-        
-        # Add borders to total row
-        for col in range(1, len(headers) + 1):
-            cell = ws.cell(row=total_row, column=col)
-            cell.border = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
-    
-    # Auto-adjust column widths with better logic
-    for column in ws.columns:
-        max_length = 0
-        column_letter = get_column_letter(column[0].column)
-        for cell in column:
-            try:
-                if cell.value:
-                    # Calculate length based on content type
-                    if isinstance(cell.value, (int, float)):
-                        length = len(f"{cell.value:,.2f}")
-                    else:
-                        length = len(str(cell.value))
-                    max_length = max(max_length, length)
-            except:
-                pass
-        
-        # Set reasonable column widths
-        if max_length < 10:
-            adjusted_width = 12
-        elif max_length < 20:
-            adjusted_width = 18
-        elif max_length < 30:
-            adjusted_width = 25
-        else:
-            adjusted_width = min(max_length + 5, 50)
-        
-        ws.column_dimensions[column_letter].width = adjusted_width
-    
+        total_border = Border(left=thin, right=thin, top=thin, bottom=thin)
+
+        total_cells = [workbook.cell(None, border=total_border) for _ in headers]
+        total_cells[0] = workbook.cell("Grand Total", font=total_font, fill=total_fill, border=total_border)
+        total_cells[-1] = workbook.cell(
+            total_value, font=total_font, fill=total_fill, border=total_border, number_format=currency_format
+        )
+        workbook.append(total_cells)
+
     # Add summary information at the bottom
-    summary_row = total_row + 3 if include_calculations and layout.supports_calculations() else row_offset + len(items) + 3
-    
-    # Summary section
-    ws.cell(row=summary_row, column=1, value="Summary Information").font = Font(bold=True, size=12, color="2E86AB")
-    summary_row += 1
-    
-    ws.cell(row=summary_row, column=1, value="Total Items:").font = Font(bold=True)
-    ws.cell(row=summary_row, column=2, value=len(items))
-    summary_row += 1
-    
-    ws.cell(row=summary_row, column=1, value="Report Generated:").font = Font(bold=True)
-    ws.cell(row=summary_row, column=2, value=timezone.now().strftime('%B %d, %Y at %H:%M'))
-    summary_row += 1
-    
-    ws.cell(row=summary_row, column=1, value="Layout:").font = Font(bold=True)
-    ws.cell(row=summary_row, column=2, value=layout.name)
-    
-    if include_calculations and layout.supports_calculations():
-        summary_row += 1
-        ws.cell(row=summary_row, column=1, value="Total Inventory Value:").font = Font(bold=True)
-        total_value = sum(item.total_value for item in items)
-        ws.cell(row=summary_row, column=2, value=total_value)
-        ws.cell(row=summary_row, column=2).number_format = f'"{currency_symbol}"#,##0.00'
-    
-    # Create response
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = f'attachment; filename="{filename}.xlsx"'
-    
-    wb.save(response)
-    return response
+    workbook.append([])
+    workbook.append([])
+    workbook.append([workbook.cell("Summary Information", font=Font(bold=True, size=12, color="2E86AB"))])
+    workbook.append([workbook.cell("Total Items:", font=bold), item_count])
+    workbook.append([workbook.cell("Report Generated:", font=bold), timezone.now().strftime('%B %d, %Y at %H:%M')])
+    workbook.append([workbook.cell("Layout:", font=bold), layout.name])
+    if show_totals:
+        workbook.append([
+            workbook.cell("Total Inventory Value:", font=bold),
+            workbook.cell(total_value, number_format=currency_format),
+        ])
+
+    return workbook.response(f'{filename}.xlsx')
 
 
 def export_to_csv(items, layout, filename, include_calculations=True):
-    """Export inventory to CSV"""
-    import csv
-    
-    # Force recalculation for all items to ensure latest data
-    for item in items:
-        item.calculate_totals()
-        item.refresh_from_db()
-    
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
-    
-    writer = csv.writer(response)
-    
-    # Write headers
-    headers = []
-    for column in layout.get_visible_columns():
-        if column.get('name') == 'actions':
-            continue
-        if not include_calculations and column.get('name') == 'total':
-            continue
-        headers.append(column.get('display_name', column.get('name')))
-    
-    writer.writerow(headers)
-    
-    # Write data
-    for index, item in enumerate(items, 1):
-        row = []
-        for column in layout.get_visible_columns():
-            if column.get('name') == 'actions':
-                continue
-            if not include_calculations and column.get('name') == 'total':
-                continue
-            
-            field_name = column.get('name')
-            if field_name == 'serial_number':
-                value = index  # Serial number based on position
-            elif field_name == 'product_name':
-                value = item.product_name
-            elif field_name == 'sku_code':
-                value = item.sku_code
-            elif field_name == 'status':
-                value = item.status.display_name
-            elif field_name == 'total':
-                value = item.total_value
-            else:
-                value = item.get_value(field_name)
-            
-            row.append(value)
-        
-        writer.writerow(row)
-    
-    return response
+    """Export inventory to CSV, streaming rows as they are read"""
+    columns = get_export_columns(layout, include_calculations)
+    field_names = [column.get('name') for column in columns]
+
+    def rows():
+        for index, row in enumerate(iter_values(items, *EXPORT_VALUE_FIELDS), 1):
+            yield [
+                index if field_name == 'serial_number' else get_export_value(row, field_name)
+                for field_name in field_names
+            ]
+
+    return csv_response(
+        rows(),
+        f'{filename}.csv',
+        header=[column.get('display_name', column.get('name')) for column in columns],
+    )
 
 
 def export_to_pdf(items, layout, filename, include_calculations=True, include_branding=True):
@@ -1562,10 +1247,9 @@ def export_to_pdf(items, layout, filename, include_calculations=True, include_br
         
         return "<br/>".join(lines)
     
-    # Force recalculation for all items to ensure latest data
-    for item in items:
-        item.calculate_totals()
-        item.refresh_from_db()
+    # Bring totals up to date for all items in one vectorized pass
+    items = items.select_related('layout', 'status')
+    recalculate_items(items)
     
     response = HttpResponse(content_type='application/pdf')
     response['Content-Disposition'] = f'attachment; filename="{filename}.pdf"'
@@ -1899,30 +1583,21 @@ def stock_adjustment(request, pk):
                     messages.error(request, 'Invalid adjustment type.')
                     return redirect('inventory:stock_adjustment', pk=pk)
                 
-                # Update the product quantity
-                product.set_value('quantity', new_quantity)
-                
-                # Update all related documents and calculations
-                product.update_all_documents()
-                
-                # Create transaction record
-                InventoryTransaction.objects.create(
-                    user=request.user,
-                    item=product,
+                # Update the quantity, related documents and logs in one transaction
+                update = InventoryItemUpdate(product, user=request.user)
+                update.set('quantity', new_quantity)
+                update.add_transaction(
                     transaction_type='adjustment',
                     quantity_change=new_quantity - old_quantity,
                     quantity_before=old_quantity,
                     quantity_after=new_quantity,
                     notes=f"{reason}\n{notes}".strip()
                 )
-                
-                # Log the adjustment
-                InventoryLog.objects.create(
-                    user=request.user,
-                    item=product,
-                    log_type='stock_adjustment',
-                    description=f'Stock adjustment: {adjustment_type} {quantity} units. {reason}'
+                update.add_log(
+                    'stock_adjustment',
+                    f'Stock adjustment: {adjustment_type} {quantity} units. {reason}'
                 )
+                update.commit()
                 
                 messages.success(request, f'Stock adjustment completed! Quantity updated from {old_quantity} to {new_quantity}.')
                 return redirect('inventory:detail', pk=pk)
@@ -2173,47 +1848,13 @@ def ajax_bulk_update_status(request):
             })
         
         # Get status by name or ID
-        if new_status.isdigit():
-            status = get_object_or_404(InventoryStatus, pk=new_status)
-        else:
-            status = get_object_or_404(InventoryStatus, name=new_status)
-        
-        # Update all selected items
-        items = InventoryItem.objects.filter(pk__in=item_ids, user=request.user)
-        updated_count = 0
+        status = status_registry.resolve(new_status)
+        if status is None:
+            raise Http404('Status not found')
         
-        for item in items:
-            old_status = item.status
-            item.status = status
-            item.save()
-            
-            # Trigger updates across all documents and templates
-            item.update_all_documents()
-            
-            # Create transaction record
-            InventoryTransaction.objects.create(
-                user=request.user,
-                item=item,
-                transaction_type='status_change',
-                status_before=old_status,
-                status_after=status,
-                notes=f'Bulk status update to {status.display_name}'
-            )
-            
-            # Log the status change
-            InventoryLog.objects.create(
-                user=request.user,
-                item=item,
-                log_type='status_change',
-                description=f'Bulk status change: {old_status.display_name} → {status.display_name}',
-                details={
-                    'old_status': old_status.name,
-                    'new_status': status.name,
-                    'bulk_operation': True
-                }
-            )
-            
-            updated_count += 1
+        # Update all selected items with one UPDATE and bulk-created records
+        results = InventoryBulkOperation(request.user, item_ids).update_status(status)
+        updated_count = sum(1 for result in results if result['success'])
         
         return JsonResponse({
             'success': True,
@@ -2221,6 +1862,7 @@ def ajax_bulk_update_status(request):
             'status_name': status.name,
             'status_display_name': status.display_name,
             'status_color': status.color,
+            'results': results,
             'message': f'Successfully updated {updated_count} items to {status.display_name}'
         })
         
@@ -2246,30 +1888,14 @@ def ajax_bulk_delete(request):
                 'error': 'No items selected'
             })
         
-        # Get items and delete them
-        items = InventoryItem.objects.filter(pk__in=item_ids, user=request.user)
-        deleted_count = 0
-        
-        for item in items:
-            # Log before deletion
-            InventoryLog.objects.create(
-                user=request.user,
-                item=item,
-                log_type='delete',
-                description=f'Bulk deleted: {item.product_name} ({item.sku_code})',
-                details={
-                    'product_name': item.product_name,
-                    'sku_code': item.sku_code,
-                    'bulk_operation': True
-                }
-            )
-            
-            item.delete()
-            deleted_count += 1
+        # Delete the items with one DELETE, keeping a log per item
+        results = InventoryBulkOperation(request.user, item_ids).delete()
+        deleted_count = sum(1 for result in results if result['success'])
         
         return JsonResponse({
             'success': True,
             'deleted_count': deleted_count,
+            'results': results,
             'message': f'Successfully deleted {deleted_count} items'
         })
         
@@ -2387,56 +2013,37 @@ def ajax_quick_edit(request):
         item_id = data.get('item_id')
         field_updates = data.get('field_updates', {})
         
-        item = get_object_or_404(InventoryItem, pk=item_id, user=request.user)
+        item = get_object_or_404(
+            InventoryItem.objects.select_related('layout', 'status'),
+            pk=item_id, user=request.user
+        )
         
-        # Track all changes
-        changes = {}
+        # Queue all changes so totals and related documents are updated once
+        update = InventoryItemUpdate(item, user=request.user)
         for field_name, new_value in field_updates.items():
-            old_value = item.get_value(field_name)
-            
             # Sanitize numeric values
             if field_name.lower() in ['quantity', 'unit_price', 'price', 'cost']:
                 sanitized_value = item._extract_number(new_value)
                 if sanitized_value is not None:
                     new_value = sanitized_value
             
-            # Update the field
-            item.set_value(field_name, new_value)
-            
-                    # Convert various types for JSON serialization
-        if hasattr(old_value, 'as_tuple'):  # Check if it's a Decimal
-            old_value = float(old_value)
-        elif hasattr(old_value, 'isoformat'):  # Check if it's a date/datetime
-            old_value = old_value.isoformat()
-        if hasattr(new_value, 'as_tuple'):  # Check if it's a Decimal
-            new_value = float(new_value)
-        elif hasattr(new_value, 'isoformat'):  # Check if it's a date/datetime
-            new_value = new_value.isoformat()
-                
-            changes[field_name] = {'old': old_value, 'new': new_value}
+            update.set(field_name, new_value)
         
-        # Recalculate totals if needed
-        calculated_data = {}
-        if item.layout.supports_calculations():
-            calculated_data = item.calculate_totals()
+        changes = update.changes
         
-        # Create transaction record
-        InventoryTransaction.objects.create(
-            user=request.user,
-            item=item,
+        update.add_transaction(
             transaction_type='field_update',
             field_changes=changes,
             notes=f'Quick edit: Updated {len(changes)} fields'
         )
-        
-        # Log the changes - changes dict already has Decimal objects converted to float
-        InventoryLog.objects.create(
-            user=request.user,
-            item=item,
-            log_type='field_update',
-            description=f'Quick edit: Updated {len(changes)} fields',
-            details={'changes': changes, 'quick_edit': True}
+        update.add_log(
+            'field_update',
+            f'Quick edit: Updated {len(changes)} fields',
+            {'changes': changes, 'quick_edit': True}
         )
+        update.commit()
+        
+        calculated_data = item.calculated_data if item.layout.supports_calculations() else {}
         
         return JsonResponse({
             'success': True,
@@ -2600,16 +2207,14 @@ def ajax_get_calculation_preview(request):
         # Safe evaluation of formula
         result = None
         try:
-            # Replace field names with values
-            for field_name, value in field_values.items():
-                formula = formula.replace(f'{{{field_name}}}', str(value))
-            
-            # Only allow basic math operations
-            allowed_chars = set('0123456789+-*/(). ')
-            if all(c in allowed_chars for c in formula):
-                result = eval(formula)
-            else:
+            compiled = CompiledFormula(formula)
+            values = {name: parse_number(field_values.get(name)) for name in compiled.fields}
+            if any(value is None for value in values.values()):
                 result = 'Invalid formula'
+            else:
+                result = compiled.evaluate(values)
+        except FormulaError:
+            result = 'Invalid formula'
         except Exception:
             result = 'Calculation error'
         
@@ -2637,16 +2242,13 @@ def ajax_export_selected(request):
         include_calculations = data.get('include_calculations', True)
         include_branding = data.get('include_branding', True)
         
-        # Get layout from first item
+        # Get items; the layout of the first item is loaded with it
+        items = InventoryItem.objects.filter(pk__in=item_ids, user=request.user)
         if item_ids:
-            first_item = InventoryItem.objects.get(pk=item_ids[0], user=request.user)
-            layout = first_item.layout
+            layout = InventoryItem.objects.select_related('layout').get(pk=item_ids[0], user=request.user).layout
         else:
             layout = InventoryLayout.objects.filter(user=request.user, is_default=True).first()
         
-        # Get items
-        items = InventoryItem.objects.filter(pk__in=item_ids, user=request.user)
-        
         # Generate filename
         timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
         filename = f"inventory_export_{timestamp}"
@@ -2884,13 +2486,11 @@ def update_inventory_currency(request):
         company_profile.save()
         
         # Update all inventory items to trigger recalculation
-        inventory_items = InventoryItem.objects.filter(user=request.user)
-        updated_count = 0
+        inventory_items = list(InventoryItem.objects.filter(user=request.user).select_related('layout'))
+        updated_count = len(inventory_items)
         
-        for item in inventory_items:
-            # Trigger recalculation to update currency displays
-            item.calculate_totals()
-            updated_count += 1
+        # Trigger recalculation to update currency displays
+        recalculate_items(inventory_items)
         
         # Update all inventory layouts
         layouts = InventoryLayout.objects.filter(user=request.user)
@@ -2971,10 +2571,10 @@ def ajax_export_preview(request):
             items = items.filter(data__quantity_in_stock__lte=data['max_quantity'])
         
         if data.get('min_price'):
-            items = items.filter(data__unit_price__gte=data['min_price'])
+            items = items.filter(unit_price_amount__gte=data['min_price'])
         
         if data.get('max_price'):
-            items = items.filter(data__unit_price__lte=data['max_price'])
+            items = items.filter(unit_price_amount__lte=data['max_price'])
         
         if data.get('date_from'):
             items = items.filter(created_at__gte=data['date_from'])
@@ -2991,7 +2591,7 @@ def ajax_export_preview(request):
         
         # Calculate summary statistics
         total_items = items.count()
-        total_value = sum(item.total_value for item in items)
+        total_value = items.aggregate(total=Sum('total_amount'))['total'] or 0
         
         # Get unique categories from data field
         category_names = set()
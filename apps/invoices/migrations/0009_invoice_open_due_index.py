@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0008_merge_20250709_1603'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(
+                condition=models.Q(('status__in', ['unpaid', 'partial'])),
+                fields=['user', 'due_date'],
+                name='invoices_open_due_idx',
+            ),
+        ),
+    ]
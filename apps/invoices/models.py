@@ -96,6 +96,12 @@ class Invoice(models.Model):
             models.Index(fields=['status']),
             models.Index(fields=['invoice_date']),
             models.Index(fields=['due_date']),
+            # Open invoices only: receivables rollup rebuilds and aging drill-downs
+            models.Index(
+                fields=['user', 'due_date'],
+                name='invoices_open_due_idx',
+                condition=models.Q(status__in=['unpaid', 'partial']),
+            ),
         ]
         
     def __str__(self):
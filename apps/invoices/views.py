@@ -8,12 +8,14 @@ from decimal import Decimal
 from .models import Invoice, InvoiceItem, InvoiceTemplate
 from .forms import InvoiceForm, InvoiceItemFormSet, InvoiceFilterForm, InvoiceTemplateForm
 # from apps.core.utils import generate_pdf_response
-import openpyxl
 from django.template.loader import render_to_string
 from xhtml2pdf import pisa
 from django.template.loader import render_to_string
 from django.http import HttpResponse
 from apps.core.models import CompanyProfile
+from apps.core.company_context import company_context_for
+from apps.core.exports import iter_values, xlsx_response
+from apps.core.jobs import background_job
 import os
 import urllib.parse
 import base64
@@ -80,35 +82,8 @@ def invoice_list(request):
 
 def get_invoice_context(invoice, user):
     """Get context data for invoice rendering"""
-    # Get company profile data for display
-    company_profile = None
-    company_logo = None
-    company_signature = None
-    default_bank_account = None
-    
-    try:
-        from apps.core.models import CompanyProfile, BankAccount
-        company_profile = CompanyProfile.objects.get(user=user)
-        
-        if company_profile.logo:
-            company_logo = company_profile.logo.url
-        if company_profile.signature:
-            company_signature = company_profile.signature.url
-            
-        # Get default bank account
-        default_bank_account = BankAccount.objects.filter(
-            company=company_profile, 
-            is_default=True
-        ).first()
-        
-        # If no default, get the first bank account
-        if not default_bank_account:
-            default_bank_account = BankAccount.objects.filter(
-                company=company_profile
-            ).first()
-            
-    except CompanyProfile.DoesNotExist:
-        pass
+    # Company profile data for display, shared with the context processors
+    company = company_context_for(user)
     
     # Get user account details for receipts
     user_profile = {
@@ -135,10 +110,10 @@ def get_invoice_context(invoice, user):
     
     return {
         'invoice': invoice,
-        'company_profile': company_profile,
-        'company_logo': company_logo,
-        'company_signature': company_signature,
-        'default_bank_account': default_bank_account,
+        'company_profile': company.company_profile,
+        'company_logo': company.logo_url,
+        'company_signature': company.signature_url,
+        'default_bank_account': company.default_bank_account,
         'user_profile': user_profile,
         'current_template': current_template,  # Use current template instead of invoice.template
     }
@@ -257,29 +232,10 @@ def invoice_create(request):
     
     # GET request - show the dynamic form
     # Get company profile data
-    company_profile = None
-    company_logo = None
-    
-    try:
-        from apps.core.models import CompanyProfile, BankAccount
-        company_profile = CompanyProfile.objects.get(user=request.user)
-        if company_profile.logo:
-            company_logo = company_profile.logo.url
-            
-        # Get default bank account
-        default_bank_account = BankAccount.objects.filter(
-            company=company_profile, 
-            is_default=True
-        ).first()
-        
-        # If no default, get the first bank account
-        if not default_bank_account:
-            default_bank_account = BankAccount.objects.filter(
-                company=company_profile
-            ).first()
-            
-    except CompanyProfile.DoesNotExist:
-        default_bank_account = None
+    company = company_context_for(request.user)
+    company_profile = company.company_profile
+    company_logo = company.logo_url
+    default_bank_account = company.default_bank_account
     
     # Get user's invoice templates
     templates = InvoiceTemplate.objects.filter(user=request.user)
@@ -840,26 +796,27 @@ def invoice_toggle_payment(request, pk):
 
 @login_required
 def export_excel(request):
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Invoices"
+    status_display = dict(Invoice.STATUS_CHOICES)
+    invoices = iter_values(
+        Invoice.objects.filter(user=request.user),
+        'invoice_number', 'client_name', 'invoice_date', 'due_date', 'grand_total', 'status',
+    )
+    rows = (
+        [
+            invoice['invoice_number'],
+            invoice['client_name'],
+            invoice['invoice_date'].strftime("%Y-%m-%d"),
+            invoice['due_date'].strftime("%Y-%m-%d") if invoice['due_date'] else "",
+            invoice['grand_total'],
+            status_display.get(invoice['status'], invoice['status']),
+        ]
+        for invoice in invoices
+    )
     headers = ["Invoice #", "Client", "Date", "Due Date", "Amount", "Status"]
-    ws.append(headers)
-    for invoice in Invoice.objects.filter(user=request.user):
-        ws.append([
-            invoice.invoice_number,
-            invoice.client_name,
-            invoice.invoice_date.strftime("%Y-%m-%d"),
-            invoice.due_date.strftime("%Y-%m-%d") if invoice.due_date else "",
-            invoice.grand_total,
-            invoice.get_status_display(),
-        ])
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename=invoices.xlsx'
-    wb.save(response)
-    return response
+    return xlsx_response(rows, 'invoices.xlsx', title="Invoices", header=headers)
 
 @login_required
+@background_job('Invoice list PDF')
 def export_pdf(request):
     invoices = get_filtered_invoices(request)
     company_logo_base64 = None
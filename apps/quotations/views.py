@@ -11,6 +11,7 @@ from .models import Quotation, QuotationItem, QuotationTemplate
 from .forms import QuotationForm, QuotationItemFormSet, QuotationFilterForm, QuotationTemplateForm
 from apps.clients.models import Client
 from apps.core.models import CompanyProfile, format_currency, number_to_words
+from apps.core.company_context import company_context_for
 from apps.core.utils import get_company_context
 import openpyxl
 from xhtml2pdf import pisa
@@ -128,41 +129,21 @@ def quotation_list(request):
 
 def get_quotation_context(quotation, user):
     """Get context data for quotation rendering"""
-    # Get company profile data for display
-    company_profile = None
-    company_logo = None
-    company_signature = None
-    default_bank_account = None
-    
-    try:
-        from apps.core.models import BankAccount
-        company_profile = CompanyProfile.objects.get(user=user)
-        
-        if company_profile.logo:
-            company_logo = company_profile.logo.url
-        if company_profile.signature:
-            company_signature = company_profile.signature.url
-            
-        # Get default bank account
-        default_bank_account = BankAccount.objects.filter(
-            company=company_profile, 
-            is_default=True
-        ).first()
-    except:
-        pass
+    # Company profile data for display, shared with the context processors
+    company = company_context_for(user)
     
     # Format currency and numbers
-    currency_symbol = getattr(company_profile, 'currency_symbol', '$') if company_profile else '$'
-    currency_code = getattr(company_profile, 'currency_code', 'USD') if company_profile else 'USD'
+    currency_symbol = company.currency_symbol
+    currency_code = company.currency_code
     total_words = number_to_words(quotation.grand_total, currency_name=currency_code)
     formatted_total = format_currency(quotation.grand_total, currency_symbol)
     
     return {
         'quotation': quotation,
-        'company_profile': company_profile,
-        'company_logo': company_logo,
-        'company_signature': company_signature,
-        'default_bank_account': default_bank_account,
+        'company_profile': company.company_profile,
+        'company_logo': company.logo_url,
+        'company_signature': company.signature_url,
+        'default_bank_account': company.default_bank_account,
         'currency_symbol': currency_symbol,
         'total_words': total_words,
         'formatted_total': formatted_total,
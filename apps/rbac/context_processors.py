@@ -1,105 +1,100 @@
+from functools import lru_cache
+
 from django.urls import reverse
 
 
+# (title, url name, icon, active condition, access rule)
+MENU_ITEMS = [
+    (
+        'Dashboard', 'core:dashboard', 'dashboard',
+        lambda match: match.view_name == 'core:dashboard',
+        {'permission': None},  # Everyone can see dashboard
+    ),
+    (
+        'Role Management', 'rbac:role_management', 'admin_panel_settings',
+        lambda match: match.app_name == 'rbac',
+        {'role': 'company_admin'},  # Only company admins
+    ),
+    (
+        'Invoices', 'invoices:list', 'receipt_long',
+        lambda match: 'invoices' in match.namespace and 'template' not in match.view_name,
+        {'any_role': ['company_admin', 'manager', 'accountant']},
+    ),
+    (
+        'Invoice Templates', 'invoices:template_list', 'palette',
+        lambda match: 'template' in match.view_name,
+        {'any_role': ['company_admin', 'manager']},
+    ),
+    (
+        'Receipts', 'receipts:list', 'receipt',
+        lambda match: match.app_name == 'receipts',
+        {'any_role': ['company_admin', 'manager', 'accountant']},
+    ),
+    (
+        'Waybills', 'waybills:list', 'local_shipping',
+        lambda match: match.app_name == 'waybills',
+        {'any_role': ['company_admin', 'manager', 'production_manager', 'store_keeper']},
+    ),
+    (
+        'Job Orders', 'job_orders:products', 'work',
+        lambda match: match.app_name == 'job_orders',
+        {'any_role': ['company_admin', 'manager', 'production_manager']},
+    ),
+    (
+        'Job Order Layouts', 'job_orders:layout_list', 'table_chart',
+        lambda match: match.app_name == 'job_orders' and match.url_name == 'layout_list',
+        {'any_role': ['company_admin', 'manager', 'production_manager']},
+    ),
+    (
+        'Quotations', 'quotations:quotation_list', 'request_quote',
+        lambda match: match.app_name == 'quotations',
+        {'any_role': ['company_admin', 'manager', 'marketer']},
+    ),
+    (
+        'Inventory', 'inventory:dashboard', 'inventory',
+        lambda match: match.app_name == 'inventory' and 'template' not in match.view_name,
+        {'any_role': ['company_admin', 'manager', 'production_manager', 'store_keeper']},
+    ),
+    (
+        'Inventory Templates', 'inventory:template_list', 'layers',
+        lambda match: 'inventory' in match.app_name and 'template' in match.view_name,
+        {'any_role': ['company_admin', 'manager', 'store_keeper']},
+    ),
+    (
+        'Clients', 'clients:client_list', 'people',
+        lambda match: match.app_name == 'clients',
+        {'any_role': ['company_admin', 'manager', 'marketer']},
+    ),
+    (
+        'Accounting', 'accounting:dashboard', 'bar_chart',
+        lambda match: match.app_name == 'accounting',
+        {'any_role': ['company_admin', 'manager', 'accountant']},
+    ),
+]
+
+
+@lru_cache(maxsize=None)
+def menu_urls():
+    """The menu URLs, reversed once per process on first use"""
+    return tuple(reverse(url_name) for _, url_name, _, _, _ in MENU_ITEMS)
+
+
 def rbac_menu_context(request):
     """Context processor to provide role-based menu configuration"""
     if not request.user.is_authenticated:
         return {}
-    
-    menu_config = [
-        {
-            'title': 'Dashboard',
-            'url': reverse('core:dashboard'),
-            'icon': 'dashboard',
-            'active_condition': request.resolver_match.view_name == 'core:dashboard',
-            'permission': None,  # Everyone can see dashboard
-        },
-        {
-            'title': 'Role Management',
-            'url': reverse('rbac:role_management'),
-            'icon': 'admin_panel_settings',
-            'active_condition': request.resolver_match.app_name == 'rbac',
-            'role': 'company_admin',  # Only company admins
-        },
-        {
-            'title': 'Invoices',
-            'url': reverse('invoices:list'),
-            'icon': 'receipt_long',
-            'active_condition': 'invoices' in request.resolver_match.namespace and 'template' not in request.resolver_match.view_name,
-            'any_role': ['company_admin', 'manager', 'accountant'],
-        },
-        {
-            'title': 'Invoice Templates',
-            'url': reverse('invoices:template_list'),
-            'icon': 'palette',
-            'active_condition': 'template' in request.resolver_match.view_name,
-            'any_role': ['company_admin', 'manager'],
-        },
-        {
-            'title': 'Receipts',
-            'url': reverse('receipts:list'),
-            'icon': 'receipt',
-            'active_condition': request.resolver_match.app_name == 'receipts',
-            'any_role': ['company_admin', 'manager', 'accountant'],
-        },
-        {
-            'title': 'Waybills',
-            'url': reverse('waybills:list'),
-            'icon': 'local_shipping',
-            'active_condition': request.resolver_match.app_name == 'waybills',
-            'any_role': ['company_admin', 'manager', 'production_manager', 'store_keeper'],
-        },
-        {
-            'title': 'Job Orders',
-            'url': reverse('job_orders:products'),
-            'icon': 'work',
-            'active_condition': request.resolver_match.app_name == 'job_orders',
-            'any_role': ['company_admin', 'manager', 'production_manager'],
-        },
-        {
-            'title': 'Job Order Layouts',
-            'url': reverse('job_orders:layout_list'),
-            'icon': 'table_chart',
-            'active_condition': request.resolver_match.app_name == 'job_orders' and request.resolver_match.url_name == 'layout_list',
-            'any_role': ['company_admin', 'manager', 'production_manager'],
-        },
-        {
-            'title': 'Quotations',
-            'url': reverse('quotations:quotation_list'),
-            'icon': 'request_quote',
-            'active_condition': request.resolver_match.app_name == 'quotations',
-            'any_role': ['company_admin', 'manager', 'marketer'],
-        },
-        {
-            'title': 'Inventory',
-            'url': reverse('inventory:dashboard'),
-            'icon': 'inventory',
-            'active_condition': request.resolver_match.app_name == 'inventory' and 'template' not in request.resolver_match.view_name,
-            'any_role': ['company_admin', 'manager', 'production_manager', 'store_keeper'],
-        },
-        {
-            'title': 'Inventory Templates',
-            'url': reverse('inventory:template_list'),
-            'icon': 'layers',
-            'active_condition': 'inventory' in request.resolver_match.app_name and 'template' in request.resolver_match.view_name,
-            'any_role': ['company_admin', 'manager', 'store_keeper'],
-        },
-        {
-            'title': 'Clients',
-            'url': reverse('clients:client_list'),
-            'icon': 'people',
-            'active_condition': request.resolver_match.app_name == 'clients',
-            'any_role': ['company_admin', 'manager', 'marketer'],
-        },
-        {
-            'title': 'Accounting',
-            'url': reverse('accounting:dashboard'),
-            'icon': 'bar_chart',
-            'active_condition': request.resolver_match.app_name == 'accounting',
-            'any_role': ['company_admin', 'manager', 'accountant'],
-        },
-    ]
-    
+
+    match = request.resolver_match
+    menu_config = []
+    for (title, _, icon, is_active, access), url in zip(MENU_ITEMS, menu_urls()):
+        menu_config.append({
+            'title': title,
+            'url': url,
+            'icon': icon,
+            'active_condition': bool(match) and is_active(match),
+            **access,
+        })
+
     return {
         'rbac_menu_config': menu_config,
     }
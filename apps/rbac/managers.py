@@ -1,6 +1,8 @@
 from django.contrib.auth.models import Permission
 from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ObjectDoesNotExist
 from .models import Role, UserRole
+from .snapshot import get_snapshot
 
 
 class RoleManager:
@@ -230,6 +232,19 @@ class UserRoleManager:
         return queryset.select_related('user', 'role', 'company')
 
 
+def get_user_company(user):
+    """
+    The user's company profile, or None.
+
+    Django caches the profile (or its absence) on the user object, so
+    the middleware, decorators and template tags share one lookup.
+    """
+    try:
+        return user.company_profile
+    except ObjectDoesNotExist:
+        return None
+
+
 class PermissionChecker:
     """
     Utility class for checking user permissions
@@ -242,34 +257,9 @@ class PermissionChecker:
         if user.is_superuser:
             return True
         
-        # Check Django's built-in permissions
-        if user.has_perm(permission):
-            return True
-        
-        # Check company-specific permissions via RBAC
-        if company:
-            user_roles = UserRoleManager.get_user_roles(user, company)
-            for user_role in user_roles:
-                if user_role.is_expired():
-                    continue
-                
-                # Special handling for company_admin role - grant all permissions
-                if user_role.role.role_type == 'company_admin':
-                    return True
-                
-                # Check if role has this specific permission
-                if user_role.role.permissions.filter(codename=permission.split('.')[-1]).exists():
-                    return True
-                
-                # Check for app-level wildcard permissions (e.g., 'job_orders.*')
-                app_label = permission.split('.')[0]
-                
-                # Check if role has any permissions for this app (indicating wildcard access)
-                app_permissions = user_role.role.permissions.filter(content_type__app_label=app_label)
-                if app_permissions.exists():
-                    return True
-        
-        return False
+        # Django's built-in permissions and, with a company, its roles
+        # (company_admin, exact codenames and app wildcards)
+        return get_snapshot(user, company).has_permission(permission)
     
     @staticmethod
     def get_custom_permissions_for_app(app_label):
@@ -331,8 +321,7 @@ class PermissionChecker:
         if user.is_superuser:
             return True
         
-        user_roles = UserRoleManager.get_user_roles(user, company)
-        return user_roles.filter(role__role_type=role_type).exists()
+        return get_snapshot(user, company).has_role(role_type)
     
     @staticmethod
     def get_user_permissions(user, company=None):
@@ -345,14 +334,6 @@ class PermissionChecker:
             permissions.update(Permission.objects.values_list('codename', flat=True))
             return permissions
         
-        # Add Django built-in permissions
-        permissions.update(user.get_all_permissions())
-        
-        # Add role-based permissions
-        if company:
-            user_roles = UserRoleManager.get_user_roles(user, company)
-            for user_role in user_roles:
-                if not user_role.is_expired():
-                    permissions.update(user_role.role.permissions.values_list('codename', flat=True))
-        
+        # Django built-in permissions plus role-based permissions
+        permissions.update(get_snapshot(user, company).permission_names())
         return permissions
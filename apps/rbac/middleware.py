@@ -1,100 +1,89 @@
+from django.conf import settings
 from django.shortcuts import redirect
 from django.contrib import messages
-from django.urls import reverse
 from django.utils.deprecation import MiddlewareMixin
-from .managers import PermissionChecker, UserRoleManager
+from django.utils.functional import SimpleLazyObject
+from .managers import PermissionChecker, UserRoleManager, get_user_company
+from .snapshot import get_snapshot
+
+
+def exempt_prefixes():
+    """Paths that never need RBAC context: static and media files"""
+    prefixes = ['/static/', '/media/']
+    for url in (settings.STATIC_URL, settings.MEDIA_URL):
+        if url and url.startswith('/') and url not in prefixes:
+            prefixes.append(url)
+    return tuple(prefixes)
+
+
+def is_api_token_request(request):
+    # DRF authenticates these in the view, the session user is not involved
+    return request.META.get('HTTP_AUTHORIZATION', '').startswith('Token ')
 
 
 class RBACMiddleware(MiddlewareMixin):
     """
-    Middleware to automatically check permissions and add user context
+    Resolve the user's company and attach lazy RBAC context to the request.
+
+    Nothing is queried until a view, decorator or template asks for it:
+    request.user_company, request.user_roles and request.user_role_objects
+    are lazy, and the company and permission snapshot are memoized on the
+    user object, where PermissionChecker and the template tags find them.
+    Requests for static or media files and API token requests are left
+    alone entirely.
+
+    Users without a company profile are sent to the company setup page.
     """
-    
+
+    # Pages a user without a company profile can still open
+    company_optional_urls = [
+        '/admin/',
+        '/auth/',
+        '/api/auth/',
+        '/dashboard/landing/',
+        '/dashboard/company-profile/',  # Allow company profile page
+    ]
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.exempt_prefixes = exempt_prefixes()
+
     def process_request(self, request):
-        """Add user role information to request context"""
-        if request.user.is_authenticated:
-            # Get user's company and roles
-            company = None
-            if hasattr(request.user, 'company_profile'):
-                company = request.user.company_profile
-                request.user_company = company
-            
-            # Get user's active roles
-            user_roles = UserRoleManager.get_user_roles(request.user, company)
-            request.user_roles = [role.role.role_type for role in user_roles]
-            request.user_role_objects = user_roles
-            
-            # Add permission checking method to user
-            def has_permission(permission):
-                return PermissionChecker.has_permission(request.user, permission, company)
-            
-            def has_role(role_type):
-                return PermissionChecker.has_role(request.user, role_type, company)
-            
-            request.user.has_rbac_permission = has_permission
-            request.user.has_rbac_role = has_role
-    
-    def process_view(self, request, view_func, view_args, view_kwargs):
-        """
-        Check permissions for views that require specific access
-        This is a basic implementation - you can extend it based on your needs
-        """
-        if not request.user.is_authenticated:
+        if request.path.startswith(self.exempt_prefixes) or is_api_token_request(request):
             return None
-        
-        # Skip permission checks for certain URLs
-        skip_urls = [
-            '/admin/',
-            '/auth/',
-            '/api/auth/',
-            '/static/',
-            '/media/',
-        ]
-        
-        if any(request.path.startswith(url) for url in skip_urls):
+        if not request.user.is_authenticated:
             return None
-        
-        # Note: We don't add company to view_kwargs as it can cause conflicts
-        # Views should access company via request.user_company instead
-        
-        return None
 
+        user = request.user
+        request.user_company = SimpleLazyObject(lambda: get_user_company(user))
+        request.user_roles = SimpleLazyObject(
+            lambda: sorted(get_snapshot(user, get_user_company(user)).role_types)
+        )
+        request.user_role_objects = SimpleLazyObject(
+            lambda: UserRoleManager.get_user_roles(user, get_user_company(user))
+        )
 
-class CompanyContextMiddleware(MiddlewareMixin):
-    """
-    Middleware to ensure users have proper company context
-    """
-    
-    def process_request(self, request):
-        """Ensure authenticated users have company context"""
-        if request.user.is_authenticated and not request.user.is_superuser:
-            # Skip for certain URLs
-            skip_urls = [
-                '/admin/',
-                '/auth/',
-                '/api/auth/',
-                '/static/',
-                '/media/',
-                '/dashboard/landing/',
-                '/dashboard/company-profile/',  # Allow company profile page
-            ]
-            
-            if any(request.path.startswith(url) for url in skip_urls):
-                return None
-            
-            # Check if user has a company profile
+        def has_permission(permission):
+            return PermissionChecker.has_permission(user, permission, get_user_company(user))
+
+        def has_role(role_type):
+            return PermissionChecker.has_role(user, role_type, get_user_company(user))
+
+        user.has_rbac_permission = has_permission
+        user.has_rbac_role = has_role
+
+        if user.is_superuser or any(request.path.startswith(url) for url in self.company_optional_urls):
+            return None
+
+        if get_user_company(user) is None:
             try:
-                company_profile = request.user.company_profile
+                messages.warning(
+                    request,
+                    'You need to set up your company profile to access this application.'
+                )
             except Exception:
-                # Redirect to company setup if no company profile
-                try:
-                    messages.warning(
-                        request, 
-                        'You need to set up your company profile to access this application.'
-                    )
-                except Exception:
-                    # Fallback if messages middleware is not available
-                    pass
-                return redirect('core:company_profile')
-        
+                # Fallback if messages middleware is not available
+                pass
+            return redirect('core:company_profile')
+
         return None
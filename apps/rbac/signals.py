@@ -1,9 +1,10 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import m2m_changed, post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from django.contrib.auth.models import Permission
-from .models import Role, UserRole
+from django.contrib.auth.models import Group, Permission
+from .models import CompanyPermission, Role, UserRole
 from .managers import RoleManager
+from .snapshot import GLOBAL_SCOPE, bump_versions, company_scope, user_scope
 
 User = get_user_model()
 
@@ -29,3 +30,39 @@ def log_role_revocation(sender, instance, **kwargs):
     """Log role revocations for audit purposes"""
     # You can add logging or notifications here
     pass
+
+
+@receiver(post_save, sender=UserRole)
+@receiver(post_delete, sender=UserRole)
+def invalidate_user_role_snapshots(sender, instance, **kwargs):
+    """Role assignments change what the user can do in that company"""
+    bump_versions(user_scope(instance.user_id), company_scope(instance.company_id))
+
+
+@receiver(post_save, sender=CompanyPermission)
+@receiver(post_delete, sender=CompanyPermission)
+def invalidate_company_permission_snapshots(sender, instance, **kwargs):
+    bump_versions(company_scope(instance.company_id))
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+@receiver(m2m_changed, sender=Role.permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_role_snapshots(sender, action=None, **kwargs):
+    """Roles and groups are shared, so every snapshot is rebuilt"""
+    if action is None or action.startswith('post_'):
+        bump_versions(GLOBAL_SCOPE)
+
+
+@receiver(m2m_changed, sender=User.user_permissions.through)
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_user_permission_snapshots(sender, instance, action, reverse, **kwargs):
+    """A user's own permissions or groups changed"""
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        # Changed from the permission or group side, which may touch many users
+        bump_versions(GLOBAL_SCOPE)
+    else:
+        bump_versions(user_scope(instance.pk))
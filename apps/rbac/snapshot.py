@@ -0,0 +1,196 @@
+"""
+Compiled permission snapshots.
+
+A PermissionSnapshot holds everything PermissionChecker needs to answer
+has_permission/has_role for one user in one company: the role types,
+the role permission codenames, the apps those roles have permissions in
+and the user's Django permissions. Checks are then set lookups.
+
+Snapshots are cached in-process and in the shared cache under a key made
+of RBAC versions:
+
+- the global version, bumped when roles, role permissions or group
+  permissions change
+- the user's version, bumped when their role assignments, groups or
+  permissions change
+- the company's version, bumped when its role assignments or company
+  permissions change
+
+A bump makes every older key unreachable, so nothing is ever deleted
+explicitly. Each version is a fresh random token rather than a counter,
+so an evicted version can never come back and match an old snapshot.
+"""
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from threading import Lock
+from typing import FrozenSet, Optional
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import UserRole
+
+
+SNAPSHOT_CACHE_TIMEOUT = 3600
+LOCAL_SNAPSHOT_LIMIT = 1024
+
+GLOBAL_SCOPE = 'global'
+
+_local_snapshots = OrderedDict()
+_local_lock = Lock()
+
+
+@dataclass(frozen=True)
+class PermissionSnapshot:
+    role_types: FrozenSet[str]
+    codenames: FrozenSet[str]
+    app_labels: FrozenSet[str]
+    django_permissions: FrozenSet[str]
+    # Earliest expiry among the roles included, after which it is rebuilt
+    expires_at: Optional[datetime] = None
+    # Built for one company; only then do roles grant permissions
+    for_company: bool = False
+
+    def is_expired(self):
+        return self.expires_at is not None and timezone.now() > self.expires_at
+
+    def has_role(self, role_type):
+        return role_type in self.role_types
+
+    def has_permission(self, permission):
+        """Same rules as the role walk it replaces, evaluated against sets"""
+        if permission in self.django_permissions:
+            return True
+        # Without a company only Django's permissions count, roles held in
+        # other companies do not
+        if not self.for_company:
+            return False
+        if 'company_admin' in self.role_types:
+            return True
+        app_label = permission.split('.')[0]
+        codename = permission.split('.')[-1]
+        # A role with any permission in an app counts as an app wildcard
+        return codename in self.codenames or app_label in self.app_labels
+
+    def permission_names(self):
+        return set(self.django_permissions) | set(self.codenames)
+
+
+def version_key(scope):
+    return f'rbac:version:{scope}'
+
+
+def user_scope(user_id):
+    return f'user:{user_id}'
+
+
+def company_scope(company_id):
+    return f'company:{company_id}'
+
+
+def bump_versions(*scopes):
+    """Invalidate every snapshot that depends on one of the scopes"""
+    cache.set_many({version_key(scope): uuid.uuid4().hex for scope in scopes}, None)
+
+
+def current_versions(scopes):
+    keys = [version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in versions}
+    for key, version in missing.items():
+        # Another process may have set the version first
+        if not cache.add(key, version, None):
+            version = cache.get(key) or version
+        versions[key] = version
+    return [versions[key] for key in keys]
+
+
+def snapshot_key(user, company=None):
+    scopes = [GLOBAL_SCOPE, user_scope(user.pk)]
+    if company is not None:
+        scopes.append(company_scope(company.pk))
+    versions = current_versions(scopes)
+    company_part = company.pk if company is not None else 'all'
+    return f"rbac:snapshot:{user.pk}:{company_part}:{':'.join(versions)}"
+
+
+def build_snapshot(user, company=None):
+    """
+    Compile a user's roles and permissions.
+
+    The role assignments and their permissions come from one query.
+    Without a company, role types of every company are included for
+    has_role, but roles grant no permissions, as before.
+    """
+    roles = UserRole.objects.filter(user=user, is_active=True)
+    if company is not None:
+        roles = roles.filter(company=company)
+    rows = roles.values_list(
+        'role__role_type', 'expires_at', 'role__permissions__codename', 'role__permissions__content_type__app_label'
+    )
+
+    now = timezone.now()
+    role_types, codenames, app_labels = set(), set(), set()
+    expires_at = None
+    for role_type, role_expires_at, codename, app_label in rows:
+        if role_expires_at is not None:
+            if role_expires_at < now:
+                continue
+            expires_at = role_expires_at if expires_at is None else min(expires_at, role_expires_at)
+        role_types.add(role_type)
+        if company is not None and codename is not None:
+            codenames.add(codename)
+            app_labels.add(app_label)
+
+    return PermissionSnapshot(
+        role_types=frozenset(role_types),
+        codenames=frozenset(codenames),
+        app_labels=frozenset(app_labels),
+        django_permissions=frozenset(user.get_all_permissions()),
+        expires_at=expires_at,
+        for_company=company is not None,
+    )
+
+
+def _local_get(key):
+    with _local_lock:
+        snapshot = _local_snapshots.get(key)
+        if snapshot is not None:
+            _local_snapshots.move_to_end(key)
+        return snapshot
+
+
+def _local_set(key, snapshot):
+    with _local_lock:
+        _local_snapshots[key] = snapshot
+        _local_snapshots.move_to_end(key)
+        while len(_local_snapshots) > LOCAL_SNAPSHOT_LIMIT:
+            _local_snapshots.popitem(last=False)
+
+
+def get_snapshot(user, company=None):
+    """
+    The user's snapshot for a company (or for all companies).
+
+    It is memoized on the user object, which lives for one request, so
+    repeated checks while rendering a page do not even read the versions.
+    Role changes made during a request show up from the next request.
+    """
+    memo = user.__dict__.setdefault('_rbac_snapshots', {})
+    memo_key = company.pk if company is not None else None
+    snapshot = memo.get(memo_key)
+    if snapshot is not None and not snapshot.is_expired():
+        return snapshot
+
+    key = snapshot_key(user, company)
+    snapshot = _local_get(key)
+    if snapshot is None or snapshot.is_expired():
+        snapshot = cache.get(key)
+        if snapshot is None or snapshot.is_expired():
+            snapshot = build_snapshot(user, company)
+            cache.set(key, snapshot, SNAPSHOT_CACHE_TIMEOUT)
+        _local_set(key, snapshot)
+    memo[memo_key] = snapshot
+    return snapshot
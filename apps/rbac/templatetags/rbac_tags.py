@@ -1,6 +1,7 @@
 from django import template
 from django.contrib.auth import get_user_model
-from apps.rbac.managers import PermissionChecker
+from apps.rbac.managers import PermissionChecker, get_user_company
+from apps.rbac.snapshot import get_snapshot
 
 User = get_user_model()
 register = template.Library()
@@ -17,9 +18,7 @@ def has_permission(context, permission):
     if request.user.is_superuser:
         return True
     
-    company = None
-    if hasattr(request.user, 'company_profile'):
-        company = request.user.company_profile
+    company = get_user_company(request.user)
     
     return PermissionChecker.has_permission(request.user, permission, company)
 
@@ -35,9 +34,7 @@ def has_role(context, role_type):
     if request.user.is_superuser:
         return True
     
-    company = None
-    if hasattr(request.user, 'company_profile'):
-        company = request.user.company_profile
+    company = get_user_company(request.user)
     
     return PermissionChecker.has_role(request.user, role_type, company)
 
@@ -53,9 +50,7 @@ def has_any_role(context, *role_types):
     if request.user.is_superuser:
         return True
     
-    company = None
-    if hasattr(request.user, 'company_profile'):
-        company = request.user.company_profile
+    company = get_user_company(request.user)
     
     for role_type in role_types:
         if PermissionChecker.has_role(request.user, role_type, company):
@@ -71,13 +66,9 @@ def user_roles(context):
     if not request.user.is_authenticated:
         return []
     
-    company = None
-    if hasattr(request.user, 'company_profile'):
-        company = request.user.company_profile
+    company = get_user_company(request.user)
     
-    from apps.rbac.managers import UserRoleManager
-    user_roles = UserRoleManager.get_user_roles(request.user, company)
-    return [role.role.role_type for role in user_roles]
+    return sorted(get_snapshot(request.user, company).role_types)
 
 
 @register.inclusion_tag('rbac/role_based_menu.html', takes_context=True)
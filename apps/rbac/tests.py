@@ -1,3 +1,149 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import Permission
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+
+from apps.accounts.models import User
+from apps.core.models import CompanyProfile
+
+from .managers import PermissionChecker, UserRoleManager
+from .middleware import RBACMiddleware
+from .models import Role
+
+
+class PermissionSnapshotTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(
+            email='owner@example.com',
+            password='testpass123'
+        )
+        self.company = CompanyProfile.objects.create(
+            user=self.owner,
+            company_name='Test Company',
+            email='company@test.com',
+            phone='+1234567890',
+            address='123 Test Street'
+        )
+        self.user = User.objects.create_user(
+            email='staff@example.com',
+            password='testpass123'
+        )
+        # The default roles are created with the first user
+        self.role = Role.objects.get(role_type='accountant')
+        self.role.permissions.set([Permission.objects.get(codename='view_transaction')])
+
+    def fresh_user(self):
+        # A new object per check, like a new request
+        return User.objects.get(pk=self.user.pk)
+
+    def test_repeated_checks_use_snapshot(self):
+        """Test that checks after the first do not query the database"""
+        UserRoleManager.assign_role(self.user, self.company, 'accountant')
+        user = self.fresh_user()
+
+        self.assertTrue(PermissionChecker.has_role(user, 'accountant', self.company))
+        with self.assertNumQueries(0):
+            self.assertTrue(PermissionChecker.has_permission(user, 'accounting.view_transaction', self.company))
+            self.assertTrue(PermissionChecker.has_permission(user, 'accounting.add_account', self.company))
+            self.assertFalse(PermissionChecker.has_permission(user, 'invoices.view_invoice', self.company))
+            self.assertFalse(PermissionChecker.has_role(user, 'company_admin', self.company))
+
+        # A new request reuses the cached snapshot
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(PermissionChecker.has_role(user, 'accountant', self.company))
+
+    def test_role_changes_invalidate_snapshot(self):
+        """Test that assigning, revoking and editing roles are picked up"""
+        self.assertFalse(PermissionChecker.has_role(self.fresh_user(), 'accountant', self.company))
+
+        UserRoleManager.assign_role(self.user, self.company, 'accountant')
+        self.assertTrue(PermissionChecker.has_role(self.fresh_user(), 'accountant', self.company))
+        self.assertFalse(
+            PermissionChecker.has_permission(self.fresh_user(), 'invoices.view_invoice', self.company)
+        )
+
+        self.role.permissions.add(Permission.objects.get(content_type__app_label='invoices', codename='view_invoice'))
+        self.assertTrue(
+            PermissionChecker.has_permission(self.fresh_user(), 'invoices.view_invoice', self.company)
+        )
+
+        UserRoleManager.revoke_role(self.user, self.company, 'accountant')
+        self.assertFalse(PermissionChecker.has_role(self.fresh_user(), 'accountant', self.company))
+
+    def test_roles_grant_no_permissions_without_company(self):
+        """Test that an admin role elsewhere does not grant permissions company-less checks"""
+        UserRoleManager.assign_role(self.user, self.company, 'company_admin')
+        user = self.fresh_user()
+
+        self.assertTrue(PermissionChecker.has_permission(user, 'invoices.view_invoice', self.company))
+        self.assertFalse(PermissionChecker.has_permission(user, 'invoices.view_invoice'))
+        self.assertTrue(PermissionChecker.has_role(user, 'company_admin'))
+
+        self.user.user_permissions.add(Permission.objects.get(content_type__app_label='invoices', codename='view_invoice'))
+        self.assertTrue(PermissionChecker.has_permission(self.fresh_user(), 'invoices.view_invoice'))
+
+    def test_expired_roles_are_ignored(self):
+        """Test that a role past its expiry no longer counts"""
+        UserRoleManager.assign_role(
+            self.user, self.company, 'accountant', expires_at=timezone.now() - timedelta(days=1)
+        )
+        self.assertFalse(PermissionChecker.has_role(self.fresh_user(), 'accountant', self.company))
+
+
+class RBACMiddlewareTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='owner@example.com',
+            password='testpass123'
+        )
+        self.company = CompanyProfile.objects.create(
+            user=self.user,
+            company_name='Test Company',
+            email='company@test.com',
+            phone='+1234567890',
+            address='123 Test Street'
+        )
+        UserRoleManager.assign_role(self.user, self.company, 'manager')
+        self.middleware = RBACMiddleware(lambda request: HttpResponse())
+
+    def make_request(self, path, **extra):
+        request = RequestFactory().get(path, **extra)
+        # Loaded on first use, like the user AuthenticationMiddleware sets
+        request.user = SimpleLazyObject(lambda: User.objects.get(pk=self.user.pk))
+        return request
+
+    def test_context_is_lazy(self):
+        """Test that RBAC context costs nothing until it is used"""
+        request = self.make_request('/dashboard/')
+        # Only the user and the company lookup needed to decide on the setup redirect
+        with self.assertNumQueries(2):
+            self.assertIsNone(self.middleware.process_request(request))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(request.user_company.pk, self.company.pk)
+        self.assertEqual(list(request.user_roles), ['manager'])
+        with self.assertNumQueries(0):
+            self.assertTrue(request.user.has_rbac_role('manager'))
+
+    def test_static_and_token_requests_are_skipped(self):
+        """Test that static files and API token requests get no RBAC context and run no queries"""
+        request = self.make_request('/static/css/style.css')
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.middleware.process_request(request))
+        self.assertFalse(hasattr(request, 'user_roles'))
+
+        request = self.make_request('/api/invoices/', HTTP_AUTHORIZATION='Token abc')
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.middleware.process_request(request))
+        self.assertFalse(hasattr(request, 'user_company'))
+
+    def test_user_without_company_is_redirected(self):
+        """Test that users without a company profile are sent to set one up"""
+        self.company.delete()
+        response = self.middleware.process_request(self.make_request('/dashboard/'))
+        self.assertEqual(response.status_code, 302)
+        self.assertIsNone(self.middleware.process_request(self.make_request('/dashboard/company-profile/')))
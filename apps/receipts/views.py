@@ -8,7 +8,6 @@ from .forms import ReceiptForm
 from apps.invoices.models import Invoice
 from django.db.models import Sum, Count
 from django.utils import timezone
-import openpyxl
 from django.template.loader import render_to_string
 from xhtml2pdf import pisa
 from django.template.loader import render_to_string
@@ -17,6 +16,8 @@ import os
 import urllib.parse
 from apps.core.models import CompanyProfile
 from apps.core.utils import get_company_context
+from apps.core.exports import iter_values, xlsx_response
+from apps.core.jobs import background_job
 import base64
 
 # Staff check
@@ -247,30 +248,28 @@ def receipt_email_view(request, receipt_id):
 
 @login_required
 def export_excel(request):
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Receipts"
-    headers = ["Receipt #", "Client", "Date", "Amount", "Invoice Status"]
-    ws.append(headers)
-    
-    # Filter receipts by the user who created them
-    receipts = Receipt.objects.all().select_related('invoice')
-    
-    for receipt in receipts:
-        ws.append([
-            receipt.receipt_no,
-            receipt.client_name,
-            receipt.date_received.strftime("%Y-%m-%d"),
-            receipt.amount_received,
-            receipt.invoice.get_status_display(),
-        ])
+    status_display = dict(Invoice.STATUS_CHOICES)
     
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename=receipts.xlsx'
-    wb.save(response)
-    return response
+    # All users can see all receipts
+    receipts = iter_values(
+        Receipt.objects.all(),
+        'receipt_no', 'client_name', 'date_received', 'amount_received', 'invoice__status',
+    )
+    rows = (
+        [
+            receipt['receipt_no'],
+            receipt['client_name'],
+            receipt['date_received'].strftime("%Y-%m-%d"),
+            receipt['amount_received'],
+            status_display.get(receipt['invoice__status'], receipt['invoice__status']),
+        ]
+        for receipt in receipts
+    )
+    headers = ["Receipt #", "Client", "Date", "Amount", "Invoice Status"]
+    return xlsx_response(rows, 'receipts.xlsx', title="Receipts", header=headers)
 
 @login_required
+@background_job('Receipt list PDF')
 def export_pdf(request):
     receipts = get_filtered_receipts(request)
     company_logo_base64 = None
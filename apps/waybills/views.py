@@ -14,7 +14,6 @@ from .forms import (
     WaybillFieldTemplateForm, create_dynamic_item_form, BaseWaybillItemFormSet
 )
 import json
-import openpyxl
 from django.http import HttpResponse
 from django.template.loader import render_to_string
 # from weasyprint import HTML
@@ -22,6 +21,9 @@ from xhtml2pdf import pisa
 import os
 import urllib.parse
 from apps.core.models import CompanyProfile
+from apps.core.company_context import company_context_for
+from apps.core.exports import iter_values, xlsx_response
+from apps.core.jobs import background_job
 import base64
 
 
@@ -81,47 +83,8 @@ def waybill_list(request):
 
 def get_waybill_context(waybill, user):
     """Get context data for waybill rendering"""
-    # Use cache for company profile data to avoid repeated queries
-    cache_key = f'company_profile_{user.id}'
-    cached_profile_data = cache.get(cache_key)
-    
-    if cached_profile_data:
-        company_profile, company_logo, company_signature, default_bank_account = cached_profile_data
-    else:
-        # Get company profile data for display
-        company_profile = None
-        company_logo = None
-        company_signature = None
-        default_bank_account = None
-        
-        try:
-            from apps.core.models import CompanyProfile, BankAccount
-            
-            # Optimize: Get company profile with prefetched bank accounts in one query
-            company_profile = CompanyProfile.objects.select_related().get(user=user)
-            
-            if company_profile.logo:
-                company_logo = company_profile.logo.url
-            if company_profile.signature:
-                company_signature = company_profile.signature.url
-                
-            # Get default bank account
-            default_bank_account = BankAccount.objects.filter(
-                company=company_profile, 
-                is_default=True
-            ).first()
-            
-            # If no default, get the first bank account
-            if not default_bank_account:
-                default_bank_account = BankAccount.objects.filter(
-                    company=company_profile
-                ).first()
-            
-            # Cache the profile data for 5 minutes
-            cache.set(cache_key, (company_profile, company_logo, company_signature, default_bank_account), 300)
-                
-        except Exception as e:
-            pass
+    # Company profile data for display, shared with the context processors
+    company = company_context_for(user)
     
     # Get user account details
     user_profile = {
@@ -134,10 +97,10 @@ def get_waybill_context(waybill, user):
     
     return {
         'waybill': waybill,
-        'company_profile': company_profile,
-        'company_logo': company_logo,
-        'company_signature': company_signature,
-        'default_bank_account': default_bank_account,
+        'company_profile': company.company_profile,
+        'company_logo': company.logo_url,
+        'company_signature': company.signature_url,
+        'default_bank_account': company.default_bank_account,
         'user_profile': user_profile,
     }
 
@@ -662,29 +625,10 @@ def waybill_create(request):
     
     # GET request - show the dynamic form
     # Load company profile and bank account data for the template
-    company_profile = None
+    company = company_context_for(request.user)
+    company_profile = company.company_profile
     company_logo = None
-    default_bank_account = None
-    
-    try:
-        from apps.core.models import CompanyProfile, BankAccount
-        
-        # Get company profile
-        company_profile = CompanyProfile.objects.get(user=request.user)
-        
-        # Get default bank account
-        default_bank_account = BankAccount.objects.filter(
-            company=company_profile,
-            is_default=True
-        ).first()
-        
-        if not default_bank_account:
-            default_bank_account = BankAccount.objects.filter(company=company_profile).first()
-            
-    except CompanyProfile.DoesNotExist:
-        pass
-    except Exception as e:
-        print(f"Error loading company data: {e}")
+    default_bank_account = company.default_bank_account
     
     context = {
         'title': 'Create Waybill',
@@ -1294,25 +1238,26 @@ def waybill_update_status(request, pk):
 
 @login_required
 def export_excel(request):
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Waybills"
+    status_display = dict(Waybill.STATUS_CHOICES)
+    waybills = iter_values(
+        Waybill.objects.filter(user=request.user),
+        'waybill_number', 'custom_data', 'waybill_date', 'status',
+    )
+    rows = (
+        [
+            waybill['waybill_number'],
+            waybill['custom_data'].get('sender_info', {}).get('sender_name', ''),
+            waybill['custom_data'].get('receiver_info', {}).get('receiver_name', ''),
+            waybill['waybill_date'].strftime("%Y-%m-%d"),
+            status_display.get(waybill['status'], waybill['status']),
+        ]
+        for waybill in waybills
+    )
     headers = ["Waybill #", "Sender", "Receiver", "Date", "Status"]
-    ws.append(headers)
-    for waybill in Waybill.objects.filter(user=request.user):
-        ws.append([
-            waybill.waybill_number,
-            waybill.custom_data.get('sender_info', {}).get('sender_name', ''),
-            waybill.custom_data.get('receiver_info', {}).get('receiver_name', ''),
-            waybill.waybill_date.strftime("%Y-%m-%d"),
-            waybill.get_status_display(),
-        ])
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename=waybills.xlsx'
-    wb.save(response)
-    return response
+    return xlsx_response(rows, 'waybills.xlsx', title="Waybills", header=headers)
 
 @login_required
+@background_job('Waybill list PDF')
 def export_pdf(request):
     waybills = Waybill.objects.filter(user=request.user)
     company_logo_base64 = None
@@ -79,7 +79,6 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'apps.rbac.middleware.RBACMiddleware',
-    'apps.rbac.middleware.CompanyContextMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -125,16 +124,29 @@ else:
     }
 
 # Caching for better performance
+# Every worker reads through a small in-process LRU backed by the shared
+# database cache table (python manage.py createcachetable), so deletes and
+# updates reach all gunicorn workers. See apps/core/cache.py.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+        'BACKEND': 'apps.core.cache.TwoTierCache',
         'TIMEOUT': 300,  # 5 minutes
         'OPTIONS': {
-            'MAX_ENTRIES': 1000,
+            'SHARED_ALIAS': 'shared',
+            'L1_MAX_ENTRIES': 1000,
+            # Seconds a worker serves its own copy before reading the shared one again
+            'L1_TTL': 1,
+        },
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
             'CULL_FREQUENCY': 3,
         },
-    }
+    },
 }
 
 # Custom User Model
@@ -177,7 +189,8 @@ if RAILWAY_STATIC_URL:
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 # Session optimization
-SESSION_CACHE_ALIAS = 'default'
+# Sessions skip the in-process tier, a logout must be seen by every worker at once
+SESSION_CACHE_ALIAS = 'shared'
 SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
 
 # Media files
@@ -293,6 +306,20 @@ SUPPORTED_CURRENCIES = {
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5 * 1024 * 1024  # 5MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5 * 1024 * 1024  # 5MB
 
+# Background jobs (run with `python manage.py run_jobs`)
+BACKGROUND_JOBS_ENABLED = config('BACKGROUND_JOBS_ENABLED', default=True, cast=bool)
+
+# Accounting outbox (drain with `python manage.py drain_accounting_outbox`).
+# When disabled, or while no drainer is running, documents are booked into
+# accounting right after they are saved.
+ACCOUNTING_OUTBOX_ENABLED = config('ACCOUNTING_OUTBOX_ENABLED', default=True, cast=bool)
+
+# Inventory import settings
+INVENTORY_IMPORT_CHUNK_SIZE = config('INVENTORY_IMPORT_CHUNK_SIZE', default=1000, cast=int)
+
+# Rows fetched per database round trip by the streaming CSV/Excel exports
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
 # Email settings
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = config('EMAIL_HOST', default='smtp.gmail.com')
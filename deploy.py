@@ -31,6 +31,7 @@ def run_deployment_commands():
         # Run migrations
         print("🗄️ Running database migrations...")
         execute_from_command_line(['manage.py', 'migrate'])
+        execute_from_command_line(['manage.py', 'createcachetable'])
         
         # Create superuser if needed (optional)
         print("✅ Deployment preparation completed!")